@@ -1,13 +1,14 @@
 from fastapi import HTTPException
-from connect import supabase
+import repository
+from utils import progress
 
 
 async def signin(email: str, password: str):
     try:
-        response = supabase.auth.sign_in_with_password({"email": email, "password": password})
+        response = await repository.sign_in(email, password)
 
         if response.user:
-            profile_response = supabase.table("profiles").select("*").eq("id", response.user.id).single().execute()
+            profile = progress.apply_daily_rules(await repository.get_profile(response.user.id))
 
             return {
                 "session": {
@@ -18,7 +19,7 @@ async def signin(email: str, password: str):
                     "id": response.user.id,
                     "email": response.user.email
                 },
-                "profile": profile_response.data if profile_response.data else None
+                "profile": profile if profile else None
             }
         
         return response
@@ -1,6 +1,7 @@
 import re
 from fastapi import HTTPException
-from connect import supabase
+import repository
+from utils import leaderboard, progress
 
 
 def validate_email(email: str) -> bool:
@@ -22,15 +23,17 @@ def validate_password(password: str) -> tuple[bool, str]:
 
 async def check_username_exists(username: str) -> bool:
     try:
-        response = supabase.table("profiles").select("username").eq("username", username).execute()
-        return len(response.data) > 0
+        return await repository.username_exists(username)
     except Exception:
         return False
 
 
-async def signup(email: str, password: str, username: str, handicap: int):
+async def signup(email: str, password: str, username: str, handicap: int, timezone: str = progress.DEFAULT_TIMEZONE):
     if not validate_email(email):
         raise HTTPException(status_code=400, detail="Invalid email format")
+
+    if not progress.is_valid_timezone(timezone):
+        raise HTTPException(status_code=400, detail="Invalid time zone")
     
     is_valid, error_msg = validate_password(password)
     if not is_valid:
@@ -40,7 +43,7 @@ async def signup(email: str, password: str, username: str, handicap: int):
         raise HTTPException(status_code=400, detail="Username already exists")
     
     try:
-        response = supabase.auth.sign_up({"email": email, "password": password})
+        response = await repository.sign_up(email, password)
         
         if response.user:
             profile_data = {
@@ -50,9 +53,11 @@ async def signup(email: str, password: str, username: str, handicap: int):
                 "xp": 0,
                 "streak": 0,
                 "hearts": 5,
-                "streak_freezes_used": 0
+                "streak_freezes_used": 0,
+                "timezone": timezone
             }
-            supabase.table("profiles").insert(profile_data).execute()
+            await repository.insert_profile(profile_data)
+            leaderboard.upsert(profile_data)
         
         return {"status_code": 200, "data": response}
     except HTTPException:
@@ -0,0 +1,128 @@
+"""
+Local verification of Supabase access tokens.
+
+Tokens signed with the project's JWT secret (HS256) or with one of the
+project's published signing keys (RS256/ES256 via JWKS) are verified here
+without contacting the auth server. Only when a token can't be checked
+locally (no secret configured, unknown key id, JWKS unavailable) do we fall
+back to supabase.auth.get_user.
+"""
+import os
+import time
+
+import httpx
+import jwt
+from fastapi import HTTPException, Request
+
+import repository
+from connect import url, jwt_secret
+from utils import queryLog
+
+
+JWT_AUDIENCE = os.getenv("SUPABASE_JWT_AUDIENCE", "authenticated")
+JWKS_URL = f"{url}/auth/v1/.well-known/jwks.json" if url else None
+JWKS_TTL_SECONDS = 600
+JWKS_MIN_REFRESH_SECONDS = 30
+
+ASYMMETRIC_ALGORITHMS = {"RS256", "ES256"}
+
+
+class SigningKeyCache:
+    def __init__(self, jwks_url: str):
+        self.jwks_url = jwks_url
+        self.keys = {}
+        self.fetched_at = 0.0
+
+    async def refresh(self):
+        self.fetched_at = time.monotonic()
+        async with httpx.AsyncClient(timeout=5) as client:
+            response = await client.get(self.jwks_url)
+            response.raise_for_status()
+
+        keys = {}
+        for jwk in response.json().get("keys", []):
+            try:
+                keys[jwk["kid"]] = jwt.PyJWK(jwk)
+            except (KeyError, jwt.PyJWKError):
+                continue
+        self.keys = keys
+
+    async def get(self, kid: str):
+        age = time.monotonic() - self.fetched_at
+        stale = age > JWKS_TTL_SECONDS
+        unknown = kid not in self.keys and age > JWKS_MIN_REFRESH_SECONDS
+
+        if stale or unknown:
+            try:
+                await self.refresh()
+            except (httpx.HTTPError, ValueError):
+                pass
+
+        key = self.keys.get(kid)
+        return key.key if key else None
+
+
+signing_keys = SigningKeyCache(JWKS_URL) if JWKS_URL else None
+
+
+def bearer_token(request: Request) -> str:
+    auth_header = request.headers.get("Authorization")
+    if not auth_header or " " not in auth_header:
+        raise HTTPException(status_code=401, detail="Authorization token required")
+
+    return auth_header.split(" ")[1]
+
+
+async def verify_token(token: str):
+    """Return the token's claims, or None if it can't be verified locally."""
+    try:
+        header = jwt.get_unverified_header(token)
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid access token")
+
+    algorithm = header.get("alg")
+
+    if algorithm == "HS256":
+        if not jwt_secret:
+            return None
+        key = jwt_secret
+    elif algorithm in ASYMMETRIC_ALGORITHMS:
+        if not signing_keys or not header.get("kid"):
+            return None
+        key = await signing_keys.get(header["kid"])
+        if key is None:
+            return None
+    else:
+        raise HTTPException(status_code=401, detail="Invalid access token")
+
+    try:
+        return jwt.decode(
+            token,
+            key,
+            algorithms=[algorithm],
+            audience=JWT_AUDIENCE,
+            options={"require": ["exp", "sub"]}
+        )
+    except jwt.ExpiredSignatureError:
+        raise HTTPException(status_code=401, detail="Access token expired")
+    except jwt.InvalidTokenError:
+        raise HTTPException(status_code=401, detail="Invalid access token")
+
+
+async def current_user_id(request: Request) -> str:
+    token = bearer_token(request)
+
+    claims = await verify_token(token)
+    if claims is not None:
+        return claims["sub"]
+
+    try:
+        with queryLog.outside_budget():
+            user_response = await repository.get_user(token)
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not user_response or not user_response.user:
+        raise HTTPException(status_code=401, detail="Invalid access token")
+
+    return user_response.user.id
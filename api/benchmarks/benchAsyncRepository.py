@@ -0,0 +1,60 @@
+"""
+Concurrent-request throughput with blocking vs offloaded database calls.
+
+Each simulated request performs the same number of PostgREST round trips as
+getDashboard. A round trip is modelled as a blocking sleep, which is what the
+synchronous supabase client does to the event loop.
+
+Run from the api directory:
+    python -m benchmarks.benchAsyncRepository --requests 200 --latency 0.02
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+import repository
+
+
+ROUND_TRIPS_PER_REQUEST = 6
+
+
+def round_trip(latency: float):
+    time.sleep(latency)
+
+
+async def blocking_request(latency: float):
+    for _ in range(ROUND_TRIPS_PER_REQUEST):
+        round_trip(latency)
+
+
+async def offloaded_request(latency: float):
+    for _ in range(ROUND_TRIPS_PER_REQUEST):
+        await repository.run_sync(round_trip, latency)
+
+
+async def run(handler, requests: int, latency: float) -> float:
+    start = time.perf_counter()
+    await asyncio.gather(*(handler(latency) for _ in range(requests)))
+    return time.perf_counter() - start
+
+
+async def main(requests: int, latency: float):
+    print(f"{requests} concurrent requests, {ROUND_TRIPS_PER_REQUEST} round trips each, "
+          f"{latency * 1000:.0f} ms per round trip, pool size {repository.MAX_WORKERS}")
+    print("-" * 50)
+
+    for name, handler in [("blocking (before)", blocking_request), ("offloaded (after)", offloaded_request)]:
+        elapsed = await run(handler, requests, latency)
+        print(f"{name:<20} {elapsed:8.2f} s  {requests / elapsed:8.1f} req/s")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--latency", type=float, default=0.02)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.latency))
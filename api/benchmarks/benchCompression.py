@@ -0,0 +1,114 @@
+"""
+Bandwidth and CPU cost of response compression.
+
+Lesson bodies are the seeded lessons from seed_data.py, loaded through the
+in-memory fake Supabase and serialized the way getLessonById sends them.
+Leaderboard pages are synthetic pages of --per-page rows. For each payload
+and encoding this reports the bytes on the wire and the time to compress
+one response. The last table compares the lesson route's CPU per request
+when every response is compressed by the middleware with serving the bytes
+lessonCache compressed once.
+
+Run from the api directory:
+    python -m benchmarks.benchCompression --per-page 20
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import time
+
+import orjson
+
+
+def time_call(fn, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count * 1_000_000
+
+
+async def lesson_bodies():
+    import repository
+    import seed_data
+    from utils import lessonCache
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        lessons = seed_data.seed_lessons()
+        seed_data.seed_options(seed_data.seed_questions(lessons))
+    cached = [lessonCache.CachedLesson(1, await repository.get_lesson_content(lesson["id"])) for lesson in lessons]
+    return cached
+
+
+def leaderboard_body(per_page: int, rng: random.Random) -> bytes:
+    rows = [
+        {"username": f"golfer{rng.randint(1, 10**6)}", "xp": 50_000 - i * rng.randint(1, 40), "streak": rng.randint(0, 60), "handicap": rng.randint(0, 36)}
+        for i in range(per_page)
+    ]
+    return orjson.dumps({
+        "leaderboard": rows, "page": 1, "per_page": per_page, "total": 250_000,
+        "total_pages": 250_000 // per_page, "total_is_exact": False, "next_cursor": "WzQ5OTgwLCAiYWJjIl0"
+    })
+
+
+def report_sizes(name: str, bodies: list, count: int):
+    from utils import compression
+
+    raw = sum(len(body) for body in bodies) / len(bodies)
+    print(f"{name:<34}{'identity':<14}{raw:>10.0f}{'':>10}{'':>12}")
+    for encoding in compression.ENCODINGS:
+        for label, level in (("request", compression.LEVELS[encoding]), ("cached", compression.CACHED_LEVELS[encoding])):
+            sizes = [len(compression.compress(body, encoding, level)) for body in bodies]
+            micros = sum(time_call(lambda: compression.compress(body, encoding, level), count) for body in bodies) / len(bodies)
+            size = sum(sizes) / len(sizes)
+            print(f"{'':<34}{f'{encoding}-{level} ({label})':<14}{size:>10.0f}{size / raw:>10.1%}{micros:>12.1f}")
+
+
+def report_route_cpu(cached: list, count: int):
+    from utils import compression
+
+    print()
+    print(f"{'lesson route, per request':<48}{'us':>10}")
+    print("-" * 58)
+    for encoding in compression.ENCODINGS:
+        def per_request():
+            for lesson in cached:
+                compression.compress(lesson.response_body(4), encoding)
+
+        def from_cache():
+            for lesson in cached:
+                lesson.compressed_body(4, encoding)
+
+        from_cache()
+        print(f"{f'{encoding}: compressed on every request':<48}{time_call(per_request, count) / len(cached):>10.1f}")
+        print(f"{f'{encoding}: served from lessonCache':<48}{time_call(from_cache, count * 100) / len(cached):>10.2f}")
+
+
+async def main(per_page: int, pages: int, count: int):
+    from utils import compression
+
+    cached = await lesson_bodies()
+    rng = random.Random(1)
+    leaderboards = [leaderboard_body(per_page, rng) for _ in range(pages)]
+
+    print(f"average per response; encodings available: {', '.join(compression.ENCODINGS)}")
+    print(f"{'payload':<34}{'encoding':<14}{'bytes':>10}{'ratio':>10}{'us/call':>12}")
+    print("-" * 80)
+    report_sizes(f"lesson ({len(cached)} seeded lessons)", [lesson.response_body(4) for lesson in cached], count)
+    report_sizes(f"leaderboard ({per_page} rows)", leaderboards, count)
+    report_route_cpu(cached, count)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--count", type=int, default=50, help="compressions per body")
+    args = parser.parse_args()
+
+    # connect.py reads these at import time, so they are set before seed_data is imported.
+    os.environ["SUPABASE_BACKEND"] = "fake"
+    os.environ.setdefault("SUPABASE_JWT_SECRET", "benchmark-secret")
+    asyncio.run(main(args.per_page, args.pages, args.count))
@@ -0,0 +1,90 @@
+"""
+Dashboard latency with sequential vs concurrent queries.
+
+The repository functions behind getDashboard are replaced by coroutines that
+sleep for a simulated round trip, so the numbers show how query latency adds
+up rather than what a particular database does.
+
+Run from the api directory:
+    python -m benchmarks.benchDashboard --latency 0.03
+"""
+import argparse
+import asyncio
+import os
+import time
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+import repository
+from routes.dashboardEndpoint import getDashboard
+from utils import leaderboard
+
+
+USER_ID = "00000000-0000-0000-0000-000000000001"
+LESSONS = [{"id": f"lesson-{i}", "title": f"Lesson {i}", "description": "", "order_number": i} for i in range(1, 6)]
+
+
+def simulate(latency: float):
+    async def round_trip(result):
+        await asyncio.sleep(latency)
+        return result
+
+    async def get_profile(user_id, columns="*"):
+        return await round_trip({"id": user_id, "username": "player", "xp": 300, "streak": 2, "hearts": 5, "progress_bitmap": "\\x06"})
+
+    async def get_lessons(columns="id, title, description, order_number"):
+        return await round_trip(LESSONS)
+
+    async def get_completed_lesson_ids(user_id):
+        return await round_trip(["lesson-1", "lesson-2"])
+
+    async def count_completed_lessons(user_id):
+        return await round_trip(2)
+
+    async def get_leaderboard(offset, limit, columns=None):
+        return await round_trip([{"username": "player", "xp": 300, "streak": 2}])
+
+    repository.get_profile = get_profile
+    repository.get_lessons = get_lessons
+    repository.get_leaderboard = get_leaderboard
+    return count_completed_lessons, get_completed_lesson_ids
+
+
+async def sequential_dashboard(user_id: str, count_completed_lessons, get_completed_lesson_ids):
+    """The query sequence getDashboard used to run, one after another."""
+    profile = await repository.get_profile(user_id)
+    lessons_completed = await count_completed_lessons(user_id)
+    all_lessons = await repository.get_lessons()
+    completed_ids = await get_completed_lesson_ids(user_id)
+    next_lesson = next((lesson for lesson in all_lessons if lesson["id"] not in completed_ids), None)
+    preview = await repository.get_leaderboard(0, 5, "username, xp, streak")
+    return profile, lessons_completed, next_lesson, preview
+
+
+async def measure(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+async def main(latency: float, repeat: int):
+    old_queries = simulate(latency)
+    leaderboard.loaded = False
+
+    before = await measure(lambda: sequential_dashboard(USER_ID, *old_queries), repeat)
+    after = await measure(lambda: getDashboard(USER_ID), repeat)
+
+    print(f"{latency * 1000:.0f} ms per round trip, {repeat} dashboards")
+    print("-" * 50)
+    print(f"sequential, 5 queries (before)   {before:8.1f} ms")
+    print(f"concurrent (after)               {after:8.1f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--latency", type=float, default=0.03)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+    asyncio.run(main(args.latency, args.repeat))
@@ -0,0 +1,107 @@
+"""
+Offset vs keyset (cursor) paging for the leaderboard, page 1 vs page 5,000.
+
+Measures the in-memory index always, and the database queries behind
+/v1/leaderboard when DATABASE_URL points at a disposable Postgres (the
+profiles table is created in its own schema and dropped afterwards).
+
+Run from the api directory:
+    DATABASE_URL=postgresql://... python -m benchmarks.benchLeaderboardPaging --profiles 200000
+"""
+import argparse
+import asyncio
+import os
+import random
+import time
+import uuid
+from pathlib import Path
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_KEY", "benchmark")
+
+from sortedcontainers import SortedList
+
+from utils import leaderboard
+
+
+PER_PAGE = 20
+DEEP_PAGE = 5000
+REPEAT = 50
+SCHEMA = "ruleshot_bench"
+
+OFFSET_SQL = "select username, xp, streak, handicap from profiles order by xp desc, id limit $1 offset $2"
+KEYSET_SQL = """
+    select username, xp, streak, handicap from profiles
+    where xp <= $1 and (xp < $1 or id > $2)
+    order by xp desc, id limit $3
+"""
+
+
+def timed(fn, repeat: int = REPEAT) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+async def timed_async(fn, repeat: int = REPEAT) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        await fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_memory(count: int):
+    rng = random.Random(1)
+    leaderboard.entries = {}
+    for i in range(count):
+        user_id = str(uuid.UUID(int=rng.getrandbits(128)))
+        leaderboard.entries[user_id] = {"id": user_id, "username": f"player{i}", "xp": rng.randint(0, 20000), "streak": 0, "handicap": 18}
+    leaderboard.ranking = SortedList(leaderboard.rank_key(entry) for entry in leaderboard.entries.values())
+
+    deep_offset = (DEEP_PAGE - 1) * PER_PAGE
+    xp, user_id = leaderboard.key_at(deep_offset - 1)
+
+    print("in-memory index")
+    print(f"  offset page 1      {timed(lambda: leaderboard.page(0, PER_PAGE)):8.3f} ms")
+    print(f"  offset page {DEEP_PAGE}   {timed(lambda: leaderboard.page(deep_offset, PER_PAGE)):8.3f} ms")
+    print(f"  cursor page {DEEP_PAGE}   {timed(lambda: leaderboard.page(leaderboard.position_after(xp, user_id), PER_PAGE)):8.3f} ms")
+
+
+async def bench_database(dsn: str, count: int):
+    import asyncpg
+
+    profiles_sql = (Path(__file__).parent.parent / "supabase" / "tables" / "profiles.sql").read_text()
+    profiles_sql = profiles_sql.replace("references auth.users(id) on delete cascade", "")
+    connection = await asyncpg.connect(dsn)
+    try:
+        await connection.execute(f"drop schema if exists {SCHEMA} cascade; create schema {SCHEMA}; set search_path to {SCHEMA}")
+        await connection.execute(profiles_sql)
+        await connection.execute("""
+            insert into profiles (id, username, handicap, xp)
+            select gen_random_uuid(), 'player' || n, 18, (random() * 20000)::int from generate_series(1, $1) as n
+        """, count)
+        await connection.execute("analyze profiles")
+
+        deep_offset = (DEEP_PAGE - 1) * PER_PAGE
+        row = await connection.fetchrow("select xp, id from profiles order by xp desc, id limit 1 offset $1", deep_offset - 1)
+
+        print(f"postgres ({count} profiles)")
+        print(f"  offset page 1      {await timed_async(lambda: connection.fetch(OFFSET_SQL, PER_PAGE, 0)):8.3f} ms")
+        print(f"  offset page {DEEP_PAGE}   {await timed_async(lambda: connection.fetch(OFFSET_SQL, PER_PAGE, deep_offset)):8.3f} ms")
+        print(f"  cursor page {DEEP_PAGE}   {await timed_async(lambda: connection.fetch(KEYSET_SQL, row['xp'], row['id'], PER_PAGE)):8.3f} ms")
+    finally:
+        await connection.execute(f"drop schema if exists {SCHEMA} cascade")
+        await connection.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--profiles", type=int, default=200000)
+    args = parser.parse_args()
+
+    bench_memory(args.profiles)
+    if os.getenv("DATABASE_URL"):
+        asyncio.run(bench_database(os.getenv("DATABASE_URL"), args.profiles))
+    else:
+        print("DATABASE_URL not set, skipping postgres")
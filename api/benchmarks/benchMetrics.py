@@ -0,0 +1,76 @@
+"""
+Cost of MetricsMiddleware per request.
+
+The same trivial route is served with and without the middleware through
+an in-process ASGI transport, so the difference is the middleware itself
+rather than network or database time. Histogram.observe is also timed on
+its own.
+
+Run from the api directory:
+    python -m benchmarks.benchMetrics --requests 5000
+"""
+import argparse
+import asyncio
+import time
+
+import httpx
+from fastapi import FastAPI
+
+from utils import metrics
+
+
+def make_app(instrumented: bool):
+    app = FastAPI()
+    if instrumented:
+        app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/v1/lessons/{lesson_id}")
+    async def lesson(lesson_id: str):
+        return {"id": lesson_id}
+
+    return app
+
+
+async def measure(app, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for i in range(200):
+            await client.get(f"/v1/lessons/{i}")
+
+        start = time.perf_counter()
+        for i in range(requests):
+            await client.get(f"/v1/lessons/{i}")
+        return (time.perf_counter() - start) / requests * 1_000_000
+
+
+def measure_observe(count: int) -> float:
+    histogram = metrics.Histogram("bench_seconds", "Benchmark.", ("route",))
+    labels = ("/v1/lessons/{lesson_id}",)
+    start = time.perf_counter()
+    for i in range(count):
+        histogram.observe(labels, (i % 1000) / 10_000)
+    return (time.perf_counter() - start) / count * 1_000_000_000
+
+
+async def main(requests: int, rounds: int):
+    # Rounds alternate so drift (CPU frequency, allocator warm-up) hits both.
+    plain, instrumented = [], []
+    for _ in range(rounds):
+        plain.append(await measure(make_app(False), requests))
+        instrumented.append(await measure(make_app(True), requests))
+    plain, instrumented = min(plain), min(instrumented)
+
+    print(f"{requests} requests, best of {rounds} rounds")
+    print("-" * 50)
+    print(f"without middleware          {plain:8.1f} us/request")
+    print(f"with MetricsMiddleware      {instrumented:8.1f} us/request")
+    print(f"overhead                    {instrumented - plain:8.1f} us/request")
+    print(f"Histogram.observe           {measure_observe(200_000):8.0f} ns/call")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+    asyncio.run(main(args.requests, args.rounds))
@@ -0,0 +1,160 @@
+"""
+Cost of turning a route's result into response bytes.
+
+Compares FastAPI's default path (jsonable_encoder, then JSONResponse with the
+stdlib json module) with the typed path the API uses (response model
+validated and serialized by pydantic-core, rendered by ORJSONResponse) on a
+lesson payload and a leaderboard page. Both are timed on their own and end
+to end through an in-process ASGI transport. The lesson route itself serves
+a body serialized once by lessonCache; that is timed too.
+
+Run from the api directory:
+    python -m benchmarks.benchSerialization --questions 20 --per-page 100
+"""
+import argparse
+import asyncio
+import json
+import time
+import uuid
+
+import httpx
+import orjson
+from fastapi import FastAPI
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from fastapi.utils import create_model_field
+
+import models
+
+
+def lesson_payload(questions: int) -> dict:
+    lesson_id = str(uuid.uuid4())
+    return {
+        "lesson": {
+            "id": lesson_id,
+            "title": "Taking relief from an abnormal course condition",
+            "description": "Rule 16: when and how to take free relief.",
+            "order_number": 7,
+            "created_at": "2024-03-01T10:00:00.123456+00:00",
+            "questions": [{
+                "id": (question_id := str(uuid.uuid4())),
+                "lesson_id": lesson_id,
+                "question_text": f"Question {number}: your ball lies on a cart path. What are your options?",
+                "question_order": number,
+                "created_at": "2024-03-01T10:00:00.123456+00:00",
+                "options": [{
+                    "id": str(uuid.uuid4()),
+                    "question_id": question_id,
+                    "option_text": f"Option {order}: drop within one club-length of the nearest point of complete relief",
+                    "is_correct": order == 1,
+                    "option_order": order
+                } for order in range(1, 5)]
+            } for number in range(1, questions + 1)]
+        },
+        "hearts": 4
+    }
+
+
+def leaderboard_payload(per_page: int) -> dict:
+    return {
+        "leaderboard": [
+            {"username": f"golfer{i}", "xp": 100_000 - i * 37, "streak": i % 30, "handicap": i % 36}
+            for i in range(per_page)
+        ],
+        "page": 3,
+        "per_page": per_page,
+        "total": 250_000,
+        "total_pages": 250_000 // per_page,
+        "total_is_exact": False,
+        "next_cursor": "WzEwMDAwLCAiMDAwMDAwMDAtMDAwMC0wMDA0LTAwMDAtMDAwMDAwMDAwMDAwIl0"
+    }
+
+
+def time_call(fn, count: int) -> float:
+    start = time.perf_counter()
+    for _ in range(count):
+        fn()
+    return (time.perf_counter() - start) / count * 1_000_000
+
+
+def measure_encoders(payload: dict, model, count: int):
+    field = create_model_field(name="response", type_=model, mode="serialization")
+
+    def default():
+        return JSONResponse(jsonable_encoder(payload)).body
+
+    def typed():
+        # What FastAPI's serialize_response does for a route with a response model.
+        value, _ = field.validate(payload, {}, loc=("response",))
+        return ORJSONResponse(field.serialize(value)).body
+
+    assert json.loads(default()) == json.loads(typed())
+    return time_call(default, count), time_call(typed, count), len(default()), len(typed())
+
+
+def make_app(payload: dict, model, typed: bool):
+    app = FastAPI(default_response_class=ORJSONResponse if typed else JSONResponse)
+
+    @app.get("/payload", response_model=model if typed else None)
+    async def route():
+        return payload
+
+    return app
+
+
+async def measure_route(app, requests: int) -> float:
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        for _ in range(100):
+            await client.get("/payload")
+
+        start = time.perf_counter()
+        for _ in range(requests):
+            await client.get("/payload")
+        return (time.perf_counter() - start) / requests * 1_000_000
+
+
+def measure_cached_lesson(payload: dict, count: int) -> float:
+    # The body as lessonCache.CachedLesson stores it; getLessonById only splices in hearts.
+    body = orjson.dumps(payload["lesson"])
+    hearts = payload["hearts"]
+    return time_call(lambda: b'{"lesson":' + body + b',"hearts":' + str(hearts).encode() + b'}', count)
+
+
+async def main(questions: int, per_page: int, count: int, requests: int, rounds: int):
+    cases = [
+        (f"lesson ({questions} questions)", lesson_payload(questions), models.LessonResponse),
+        (f"leaderboard ({per_page} rows)", leaderboard_payload(per_page), models.LeaderboardPage)
+    ]
+
+    print(f"best of {rounds} rounds; encode: {count} calls, route: {requests} requests")
+    print("-" * 82)
+    print(f"{'payload':<32}{'bytes':>8}{'default us':>14}{'typed us':>12}{'speedup':>10}")
+    for name, payload, model in cases:
+        # Rounds alternate so drift (CPU frequency, allocator warm-up) hits both.
+        default, typed = [], []
+        for _ in range(rounds):
+            default_us, typed_us, size, _ = measure_encoders(payload, model, count)
+            default.append(default_us)
+            typed.append(typed_us)
+        print(f"{name + ' encode':<32}{size:>8}{min(default):>14.1f}{min(typed):>12.1f}{min(default) / min(typed):>9.1f}x")
+
+        default, typed = [], []
+        for _ in range(rounds):
+            default.append(await measure_route(make_app(payload, model, False), requests))
+            typed.append(await measure_route(make_app(payload, model, True), requests))
+        print(f"{name + ' route':<32}{size:>8}{min(default):>14.1f}{min(typed):>12.1f}{min(default) / min(typed):>9.1f}x")
+
+    cached = min(measure_cached_lesson(cases[0][1], count * 10) for _ in range(rounds))
+    print(f"{'lesson from lessonCache':<32}{'':>8}{'':>14}{cached:>12.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=20)
+    parser.add_argument("--per-page", type=int, default=100)
+    parser.add_argument("--count", type=int, default=2000, help="encodes per round")
+    parser.add_argument("--requests", type=int, default=1000, help="route requests per round")
+    parser.add_argument("--rounds", type=int, default=3)
+    args = parser.parse_args()
+    asyncio.run(main(args.questions, args.per_page, args.count, args.requests, args.rounds))
@@ -0,0 +1,159 @@
+"""
+Load test of the whole API against the in-memory fake Supabase.
+
+Virtual users run the signup -> signin -> dashboard -> lesson -> answers ->
+complete -> leaderboard flow concurrently against the app in-process. Every
+fake Supabase call sleeps for --latency seconds in the repository thread
+pool, standing in for the round trip to the hosted project. With
+--storage sqlite, data goes to an in-memory SqliteStore instead and only
+auth pays the simulated latency, which approximates a single-node
+deployment. Reports throughput and p50/p95/p99 latency per route.
+
+Run from the api directory:
+    python -m benchmarks.loadTest --users 200 --concurrency 20 --latency 0.02
+    python -m benchmarks.loadTest --storage sqlite
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import os
+import random
+import time
+from collections import defaultdict
+
+
+ROUTES = ("signup", "signin", "dashboard", "lesson", "answer", "complete", "leaderboard")
+
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(fraction * (len(ordered) - 1))))]
+
+
+class Recorder:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    async def call(self, client, name: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies[name].append(time.perf_counter() - start)
+        if response.status_code >= 400:
+            self.errors[name] += 1
+        return response
+
+
+async def user_flow(client, recorder: Recorder, number: int, rng: random.Random, wrong_answer_rate: float):
+    email = f"load{number}@example.com"
+    password = "LoadTest123!"
+    await recorder.call(client, "signup", "POST", "/v1/signup", json={
+        "email": email, "password": password, "username": f"load{number}", "handicap": rng.randint(0, 36)
+    })
+
+    signin = await recorder.call(client, "signin", "POST", "/v1/signin", json={"email": email, "password": password})
+    if signin.status_code != 200:
+        return
+    headers = {"Authorization": f"Bearer {signin.json()['session']['access_token']}"}
+
+    dashboard = await recorder.call(client, "dashboard", "GET", "/v1/dashboard", headers=headers)
+    next_lesson = dashboard.json().get("next_lesson") if dashboard.status_code == 200 else None
+    if not next_lesson:
+        return
+
+    lesson_response = await recorder.call(client, "lesson", "GET", f"/v1/lessons/{next_lesson['id']}", headers=headers)
+    if lesson_response.status_code != 200:
+        return
+    lesson = lesson_response.json()["lesson"]
+
+    mistakes = 0
+    for question in lesson["questions"]:
+        wrong = [option for option in question["options"] if not option["is_correct"]]
+        right = [option for option in question["options"] if option["is_correct"]]
+        option = rng.choice(wrong) if wrong and rng.random() < wrong_answer_rate else right[0]
+        answer = await recorder.call(
+            client, "answer", "POST", f"/v1/lessons/{lesson['id']}/questions/{question['id']}/answer",
+            headers=headers, json={"selected_option_id": option["id"]}
+        )
+        if answer.status_code == 200 and not answer.json()["correct"]:
+            mistakes += 1
+
+    await recorder.call(client, "complete", "POST", f"/v1/lessons/{lesson['id']}/complete", headers=headers, json={
+        "accuracy": round(100 * (1 - mistakes / max(1, len(lesson["questions"]))), 2),
+        "time_taken": rng.randint(30, 300),
+        "mistakes": mistakes
+    })
+
+    await recorder.call(client, "leaderboard", "GET", "/v1/leaderboard", params={"per_page": 10})
+
+
+async def run(users: int, concurrency: int, wrong_answer_rate: float, seed: int, storage: str):
+    import httpx
+
+    import main
+    import repository
+    import seed_data
+    from storage.sqlStore import SqliteStore
+    from utils import answerKey, leaderboard
+
+    with contextlib.redirect_stdout(io.StringIO()):
+        seed_data.seed_options(seed_data.seed_questions(seed_data.seed_lessons()))
+        if storage == "sqlite":
+            # Copy the seeded content out of the fake into SQLite.
+            repository.store = SqliteStore(":memory:")
+            await repository.store.open()
+            for table in ("lessons", "questions", "options"):
+                await repository.store.insert_rows(table, repository.supabase.tables[table])
+        await answerKey.load()
+        await leaderboard.load()
+
+    recorder = Recorder()
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=main.app)
+
+    async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=60) as client:
+        async def limited(number: int):
+            async with semaphore:
+                await user_flow(client, recorder, number, random.Random(seed + number), wrong_answer_rate)
+
+        start = time.perf_counter()
+        await asyncio.gather(*(limited(number) for number in range(users)))
+        elapsed = time.perf_counter() - start
+
+    return recorder, elapsed
+
+
+def report(recorder: Recorder, elapsed: float, args):
+    total = sum(len(values) for values in recorder.latencies.values())
+    print(f"{args.users} users, concurrency {args.concurrency}, {args.storage} storage, {args.latency * 1000:.0f} ms per Supabase call")
+    print(f"{total} requests in {elapsed:.2f}s = {total / elapsed:.1f} req/s")
+    print("-" * 72)
+    print(f"{'route':<12}{'requests':>10}{'errors':>8}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}")
+    for name in ROUTES:
+        values = recorder.latencies.get(name)
+        if not values:
+            continue
+        print(
+            f"{name:<12}{len(values):>10}{recorder.errors[name]:>8}{len(values) / elapsed:>10.1f}"
+            f"{percentile(values, 0.50) * 1000:>10.1f}{percentile(values, 0.95) * 1000:>10.1f}{percentile(values, 0.99) * 1000:>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.02, help="seconds added to every fake Supabase call")
+    parser.add_argument("--wrong-answers", type=float, default=0.2, help="fraction of answers chosen wrong")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--storage", choices=("fake", "sqlite"), default="fake")
+    args = parser.parse_args()
+
+    # connect.py reads these at import time, so they are set before the app is imported.
+    os.environ["SUPABASE_BACKEND"] = "fake"
+    os.environ["FAKE_SUPABASE_LATENCY_MS"] = str(args.latency * 1000)
+    os.environ.setdefault("SUPABASE_JWT_SECRET", "load-test-secret")
+
+    recorder, elapsed = asyncio.run(run(args.users, args.concurrency, args.wrong_answers, args.seed, args.storage))
+    report(recorder, elapsed, args)
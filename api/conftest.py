@@ -0,0 +1,42 @@
+import asyncio
+import os
+
+import pytest
+
+os.environ.setdefault("SUPABASE_URL", "http://127.0.0.1:54321")
+os.environ.setdefault("SUPABASE_KEY", "test-key")
+os.environ.setdefault("SUPABASE_JWT_SECRET", "test-jwt-secret-with-at-least-32-bytes")
+
+from storage.sqlStore import schema_sql
+
+
+TEST_SCHEMA = "ruleshot_test"
+
+
+@pytest.fixture
+def database():
+    """DSN of a Postgres database with a fresh copy of the schema.
+
+    Skipped unless DATABASE_URL points at a disposable Postgres. Everything is
+    created in its own schema, which is dropped and recreated for every test.
+    """
+    asyncpg = pytest.importorskip("asyncpg")
+    dsn = os.getenv("DATABASE_URL")
+    if not dsn:
+        pytest.skip("DATABASE_URL not set")
+
+    async def reset():
+        connection = await asyncpg.connect(dsn)
+        try:
+            await connection.execute(f"drop schema if exists {TEST_SCHEMA} cascade; create schema {TEST_SCHEMA}")
+            await connection.execute(f"set search_path to {TEST_SCHEMA}, public;\n" + schema_sql())
+        finally:
+            await connection.close()
+
+    asyncio.run(reset())
+    return dsn
+
+
+async def connect(dsn: str, **kwargs):
+    import asyncpg
+    return await asyncpg.create_pool(dsn, server_settings={"search_path": f"{TEST_SCHEMA}, public"}, **kwargs)
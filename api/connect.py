@@ -9,4 +9,14 @@ if env_path:
 
 url: str = os.getenv("SUPABASE_URL")
 key: str = os.getenv("SUPABASE_KEY")
-supabase: Client = create_client(url, key)
\ No newline at end of file
+jwt_secret: str = os.getenv("SUPABASE_JWT_SECRET")
+
+# "fake" swaps in the in-memory client from fakeSupabase.py, with
+# FAKE_SUPABASE_LATENCY_MS of simulated round trip on every call.
+backend: str = os.getenv("SUPABASE_BACKEND", "supabase")
+
+if backend == "fake":
+    from fakeSupabase import FakeClient
+    supabase = FakeClient(float(os.getenv("FAKE_SUPABASE_LATENCY_MS", "0")) / 1000, jwt_secret)
+else:
+    supabase: Client = create_client(url, key)
@@ -0,0 +1,568 @@
+"""
+In-memory stand-in for the supabase client.
+
+Implements the part of supabase-py the API uses: table queries (select with
+embedded tables, filters, or_, order, range, limit, single, count/head,
+insert, update), the RPC functions in supabase/functions/, and auth
+sign_up / sign_in_with_password / get_user / admin.update_user_by_id.
+connect.py uses it when SUPABASE_BACKEND=fake, so the API, tests and the
+load test can run without the hosted project.
+
+Every call can sleep for a fixed latency to stand in for the network round
+trip; it runs in repository's thread pool like a real request would.
+max_rows caps every top-level select the way PostgREST's db-max-rows does:
+silently, with the count still reporting every matching row.
+Embedded tables are joined on a <parent>_id foreign key (lessons ->
+questions.lesson_id), which is the only relationship shape the schema uses.
+"""
+import secrets
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+import httpx
+import jwt
+from postgrest.exceptions import APIError
+from supabase_auth.errors import AuthApiError
+
+from utils import progress
+
+
+def now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+# Column defaults from supabase/migrations/, applied on insert.
+DEFAULTS = {
+    "profiles": lambda: {
+        "xp": 0,
+        "streak": 0,
+        "hearts": progress.MAX_HEARTS,
+        "hearts_refilled_on": progress.utc_today().isoformat(),
+        "last_lesson_date": None,
+        "timezone": progress.DEFAULT_TIMEZONE,
+        "streak_freezes_used": 0,
+        "progress_bitmap": "\\x",
+        "created_at": now_iso(),
+        "updated_at": now_iso()
+    },
+    "lessons": lambda: {"id": str(uuid.uuid4()), "description": None, "created_at": now_iso()},
+    "questions": lambda: {"id": str(uuid.uuid4()), "created_at": now_iso()},
+    "options": lambda: {"id": str(uuid.uuid4()), "is_correct": False},
+    "completed_lessons": lambda: {"id": str(uuid.uuid4()), "mistakes": 0, "completed_at": now_iso()},
+    "scheduled_jobs": lambda: {"last_run_on": None, "holder": None, "lease_expires_at": None}
+}
+
+UNIQUE = {"profiles": ("id", "username"), "lessons": ("id", "order_number"), "scheduled_jobs": ("job_name",)}
+
+# Set to now() on every update, like the profiles_set_updated_at trigger.
+UPDATED_AT = {"profiles": "updated_at"}
+
+
+def touch(table: str, row: dict):
+    if table in UPDATED_AT:
+        row[UPDATED_AT[table]] = now_iso()
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+# --- filters ---
+
+def coerce(value, like):
+    """A filter value (often a string from or_) in the type of the column it is compared with."""
+    if isinstance(value, str) and not isinstance(like, str) and like is not None:
+        if isinstance(like, bool):
+            return value == "true"
+        if isinstance(like, int):
+            return int(value)
+        if isinstance(like, float):
+            return float(value)
+    if not isinstance(value, str) and isinstance(like, str):
+        return str(value)
+    return value
+
+
+def compare(operator: str, actual, expected) -> bool:
+    # SQL semantics: any comparison with null is not true.
+    if operator == "in":
+        return actual is not None and actual in [coerce(value, actual) for value in expected]
+    if operator == "is":
+        return actual is expected
+    if actual is None or expected is None:
+        return False
+
+    expected = coerce(expected, actual)
+    if operator == "eq":
+        return actual == expected
+    if operator == "neq":
+        return actual != expected
+    if operator == "lt":
+        return actual < expected
+    if operator == "lte":
+        return actual <= expected
+    if operator == "gt":
+        return actual > expected
+    if operator == "gte":
+        return actual >= expected
+    raise ValueError(f"Unsupported filter operator: {operator}")
+
+
+def parse_or(expression: str):
+    """'xp.lt.100,id.gt.abc' -> [("xp", "lt", "100"), ("id", "gt", "abc")]."""
+    conditions = []
+    for part in expression.split(","):
+        column, operator, value = part.strip().split(".", 2)
+        conditions.append((column, operator, value))
+    return conditions
+
+
+# --- select projection ---
+
+def parse_select(columns: str):
+    """'*, questions(*, options(*))' -> ["*", ("questions", ["*", ("options", ["*"])])]."""
+    items = []
+    depth = 0
+    current = ""
+    for char in columns + ",":
+        if char == "," and depth == 0:
+            item = current.strip()
+            if item:
+                if "(" in item:
+                    name, inner = item.split("(", 1)
+                    items.append((name.strip(), parse_select(inner[:-1])))
+                else:
+                    items.append(item)
+            current = ""
+            continue
+        depth += char == "("
+        depth -= char == ")"
+        current += char
+    return items
+
+
+def sort_rows(rows, orders):
+    # Postgres puts nulls last ascending and first descending.
+    for column, desc in reversed(orders):
+        present = [row for row in rows if row.get(column) is not None]
+        missing = [row for row in rows if row.get(column) is None]
+        present.sort(key=lambda row: row[column], reverse=desc)
+        rows = missing + present if desc else present + missing
+    return rows
+
+
+class FakeQuery:
+    def __init__(self, client, table: str):
+        self.client = client
+        self.table = table
+        self.path = f"/{table}"
+        self.http_method = "GET"
+        self.select_items = ["*"]
+        self.filters = []
+        self.or_filters = []
+        self.orders = {}
+        self.limits = {}
+        self.offset = 0
+        self.single_row = False
+        self.count_method = None
+        self.values = None
+        self.returning = "representation"
+        self.param_items = []
+
+    @property
+    def params(self):
+        return httpx.QueryParams(self.param_items)
+
+    # --- operations ---
+
+    def select(self, *columns, count: str = None, head: bool = False):
+        columns = ",".join(columns) or "*"
+        self.select_items = parse_select(columns)
+        self.count_method = count
+        self.http_method = "HEAD" if head else "GET"
+        self.param_items.append(("select", columns))
+        return self
+
+    def insert(self, values, count: str = None, returning: str = "representation"):
+        self.http_method = "POST"
+        self.values = values if isinstance(values, list) else [values]
+        self.count_method = count
+        self.returning = returning
+        return self
+
+    def update(self, values: dict, count: str = None, returning: str = "representation"):
+        self.http_method = "PATCH"
+        self.values = values
+        self.count_method = count
+        self.returning = returning
+        return self
+
+    # --- filters and modifiers ---
+
+    def filter_by(self, operator: str, column: str, value):
+        self.filters.append((column, operator, value))
+        self.param_items.append((column, f"{operator}.{value}"))
+        return self
+
+    def eq(self, column, value):
+        return self.filter_by("eq", column, value)
+
+    def neq(self, column, value):
+        return self.filter_by("neq", column, value)
+
+    def lt(self, column, value):
+        return self.filter_by("lt", column, value)
+
+    def lte(self, column, value):
+        return self.filter_by("lte", column, value)
+
+    def gt(self, column, value):
+        return self.filter_by("gt", column, value)
+
+    def gte(self, column, value):
+        return self.filter_by("gte", column, value)
+
+    def in_(self, column, values):
+        self.filters.append((column, "in", list(values)))
+        self.param_items.append((column, f"in.({','.join(str(value) for value in values)})"))
+        return self
+
+    def or_(self, expression: str):
+        self.or_filters.append(parse_or(expression))
+        self.param_items.append(("or", f"({expression})"))
+        return self
+
+    def order(self, column: str, desc: bool = False, foreign_table: str = None):
+        self.orders.setdefault(foreign_table, []).append((column, desc))
+        prefix = f"{foreign_table}." if foreign_table else ""
+        self.param_items.append((f"{prefix}order", f"{column}.{'desc' if desc else 'asc'}"))
+        return self
+
+    def limit(self, size: int, foreign_table: str = None):
+        self.limits[foreign_table] = size
+        self.param_items.append(("limit", str(size)))
+        return self
+
+    def range(self, start: int, end: int):
+        self.offset = start
+        self.limits[None] = end - start + 1
+        self.param_items.extend([("offset", str(start)), ("limit", str(end - start + 1))])
+        return self
+
+    def single(self):
+        self.single_row = True
+        return self
+
+    # --- execution ---
+
+    def execute(self):
+        self.client.simulate_latency()
+        with self.client.lock:
+            if self.http_method == "POST":
+                return self.run_insert()
+            if self.http_method == "PATCH":
+                return self.run_update()
+            return self.run_select()
+
+    def matches(self, row: dict) -> bool:
+        if not all(compare(operator, row.get(column), value) for column, operator, value in self.filters):
+            return False
+        return all(
+            any(compare(operator, row.get(column), value) for column, operator, value in conditions)
+            for conditions in self.or_filters
+        )
+
+    def matching_rows(self):
+        return [row for row in self.client.tables.setdefault(self.table, []) if self.matches(row)]
+
+    def run_select(self):
+        rows = sort_rows(self.matching_rows(), self.orders.get(None, []))
+        count = len(rows) if self.count_method else None
+
+        limit = self.limits.get(None)
+        if self.client.max_rows is not None:
+            limit = min(limit, self.client.max_rows) if limit is not None else self.client.max_rows
+        rows = rows[self.offset:self.offset + limit if limit is not None else None]
+        data = [self.project(row, self.table, self.select_items, "") for row in rows]
+
+        if self.http_method == "HEAD":
+            return FakeResponse([], count)
+        if self.single_row:
+            if len(data) != 1:
+                raise APIError({"message": "JSON object requested, multiple (or no) rows returned", "code": "PGRST116"})
+            return FakeResponse(data[0], count)
+        return FakeResponse(data, count)
+
+    def project(self, row: dict, table: str, items, path: str) -> dict:
+        result = {}
+        for item in items:
+            if isinstance(item, tuple):
+                child_table, child_items = item
+                child_path = f"{path}.{child_table}" if path else child_table
+                foreign_key = f"{table.rstrip('s')}_id"
+                children = [child for child in self.client.tables.get(child_table, []) if child.get(foreign_key) == row["id"]]
+                children = sort_rows(children, self.orders.get(child_path, []))
+                result[child_table] = [self.project(child, child_table, child_items, child_path) for child in children]
+            elif item == "*":
+                result.update(row)
+            else:
+                result[item] = row.get(item)
+        return result
+
+    def run_insert(self):
+        table = self.client.tables.setdefault(self.table, [])
+        inserted = []
+        for values in self.values:
+            row = {**DEFAULTS.get(self.table, dict)(), **values}
+            for column in UNIQUE.get(self.table, ()):
+                if any(existing.get(column) == row.get(column) for existing in table + inserted):
+                    raise APIError({
+                        "message": f'duplicate key value violates unique constraint "{self.table}_{column}_key"',
+                        "code": "23505"
+                    })
+            inserted.append(row)
+        table.extend(inserted)
+        return self.written(inserted)
+
+    def run_update(self):
+        rows = self.matching_rows()
+        for row in rows:
+            row.update(self.values)
+            touch(self.table, row)
+        return self.written(rows)
+
+    def written(self, rows):
+        count = len(rows) if self.count_method else None
+        data = [] if self.returning == "minimal" else [dict(row) for row in rows]
+        return FakeResponse(data, count)
+
+
+class FakeRpc:
+    def __init__(self, client, name: str, params: dict):
+        self.client = client
+        self.name = name
+        self.path = f"/rpc/{name}"
+        self.http_method = "POST"
+        self.params = httpx.QueryParams()
+        self.arguments = params
+
+    def execute(self):
+        function = RPC_FUNCTIONS.get(self.name)
+        if function is None:
+            raise APIError({"message": f"Could not find the function {self.name}", "code": "PGRST202"})
+        self.client.simulate_latency()
+        with self.client.lock:
+            return FakeResponse(function(self.client, **self.arguments))
+
+
+# --- rpc functions, mirroring supabase/functions/ ---
+
+def find(client, table: str, column: str, value):
+    return next((row for row in client.tables.get(table, []) if row.get(column) == value), None)
+
+
+def user_today(profile: dict, p_today=None):
+    return progress.local_today(profile.get("timezone")) if p_today is None else datetime.fromisoformat(str(p_today)).date()
+
+
+def decrement_hearts(client, p_user_id, p_today=None):
+    profile = find(client, "profiles", "id", p_user_id)
+    if profile is None:
+        return None
+
+    today = user_today(profile, p_today)
+    hearts = progress.effective_hearts(profile["hearts"], profile["hearts_refilled_on"], today)
+    if hearts <= 0:
+        return 0
+
+    profile["hearts"] = hearts - 1
+    profile["hearts_refilled_on"] = today.isoformat()
+    touch("profiles", profile)
+    return profile["hearts"]
+
+
+def complete_lesson(client, p_user_id, p_lesson_id, p_accuracy, p_time_taken, p_mistakes, p_today=None):
+    profile = find(client, "profiles", "id", p_user_id)
+    if profile is None:
+        return []
+
+    today = user_today(profile, p_today)
+    xp_earned = progress.calculate_xp(p_mistakes)
+    lesson = find(client, "lessons", "id", p_lesson_id)
+
+    profile["xp"] += xp_earned
+    profile["streak"] = progress.next_streak(profile["streak"], profile["last_lesson_date"], today)
+    profile["last_lesson_date"] = today.isoformat()
+    if lesson is not None:
+        bitmap = progress.set_bit(progress.decode_bitmap(profile["progress_bitmap"]), lesson["order_number"])
+        profile["progress_bitmap"] = "\\x" + bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little").hex()
+    touch("profiles", profile)
+
+    client.tables.setdefault("completed_lessons", []).append({
+        **DEFAULTS["completed_lessons"](),
+        "user_id": p_user_id,
+        "lesson_id": p_lesson_id,
+        "accuracy": p_accuracy,
+        "xp_earned": xp_earned,
+        "time_taken": p_time_taken,
+        "mistakes": p_mistakes
+    })
+    return [{"xp_earned": xp_earned, "new_streak": profile["streak"], "total_xp": profile["xp"], "lesson_date": today.isoformat()}]
+
+
+def claim_job(client, p_job, p_run_on, p_holder, p_ttl_seconds):
+    job = find(client, "scheduled_jobs", "job_name", p_job)
+    if job is None:
+        job = {**DEFAULTS["scheduled_jobs"](), "job_name": p_job}
+        client.tables.setdefault("scheduled_jobs", []).append(job)
+
+    now = datetime.now(timezone.utc)
+    if job["last_run_on"] is not None and job["last_run_on"] >= p_run_on:
+        return False
+    if job["lease_expires_at"] is not None and job["lease_expires_at"] >= now and job["holder"] != p_holder:
+        return False
+
+    job["holder"] = p_holder
+    job["lease_expires_at"] = now + timedelta(seconds=p_ttl_seconds)
+    return True
+
+
+def finish_job(client, p_job, p_run_on, p_holder, p_completed=True):
+    job = find(client, "scheduled_jobs", "job_name", p_job)
+    if job is None or job["holder"] != p_holder:
+        return None
+    if p_completed:
+        job["last_run_on"] = max(job["last_run_on"] or p_run_on, p_run_on)
+    job["holder"] = None
+    job["lease_expires_at"] = None
+    return None
+
+
+RPC_FUNCTIONS = {
+    "decrement_hearts": decrement_hearts,
+    "complete_lesson": complete_lesson,
+    "claim_job": claim_job,
+    "finish_job": finish_job
+}
+
+
+# --- auth ---
+
+class FakeUser:
+    def __init__(self, id: str, email: str):
+        self.id = id
+        self.email = email
+        self.aud = "authenticated"
+        self.role = "authenticated"
+        self.created_at = now_iso()
+
+
+class FakeSession:
+    def __init__(self, access_token: str, user: FakeUser, expires_in: int):
+        self.access_token = access_token
+        self.refresh_token = secrets.token_urlsafe(24)
+        self.token_type = "bearer"
+        self.expires_in = expires_in
+        self.user = user
+
+
+class FakeAuthResponse:
+    def __init__(self, user: FakeUser, session: FakeSession = None):
+        self.user = user
+        self.session = session
+
+
+class FakeAdmin:
+    def __init__(self, auth):
+        self.auth = auth
+
+    def update_user_by_id(self, user_id: str, attributes: dict):
+        self.auth.client.simulate_latency()
+        with self.auth.client.lock:
+            user = self.auth.users.get(user_id)
+            if user is None:
+                raise AuthApiError("User not found", 404, "user_not_found")
+            if attributes.get("email"):
+                del self.auth.by_email[user.email]
+                user.email = attributes["email"]
+                self.auth.by_email[user.email] = user
+            if attributes.get("password"):
+                self.auth.passwords[user_id] = attributes["password"]
+            return FakeAuthResponse(user)
+
+
+class FakeAuth:
+    """Users and sessions in memory.
+
+    With a JWT secret, access tokens are HS256 JWTs the API verifies locally
+    (auth/verify.py); without one they are opaque and get_user resolves them.
+    """
+    TOKEN_SECONDS = 3600
+
+    def __init__(self, client, jwt_secret: str = None):
+        self.client = client
+        self.jwt_secret = jwt_secret
+        self.users = {}
+        self.by_email = {}
+        self.passwords = {}
+        self.sessions = {}
+        self.admin = FakeAdmin(self)
+
+    def issue_session(self, user: FakeUser) -> FakeSession:
+        if self.jwt_secret:
+            claims = {"sub": user.id, "email": user.email, "aud": "authenticated", "role": "authenticated", "exp": int(time.time()) + self.TOKEN_SECONDS}
+            token = jwt.encode(claims, self.jwt_secret, algorithm="HS256")
+        else:
+            token = secrets.token_urlsafe(32)
+        self.sessions[token] = user.id
+        return FakeSession(token, user, self.TOKEN_SECONDS)
+
+    def sign_up(self, credentials: dict):
+        self.client.simulate_latency()
+        with self.client.lock:
+            if credentials["email"] in self.by_email:
+                raise AuthApiError("User already registered", 422, "user_already_exists")
+            user = FakeUser(str(uuid.uuid4()), credentials["email"])
+            self.users[user.id] = user
+            self.by_email[user.email] = user
+            self.passwords[user.id] = credentials["password"]
+            return FakeAuthResponse(user, self.issue_session(user))
+
+    def sign_in_with_password(self, credentials: dict):
+        self.client.simulate_latency()
+        with self.client.lock:
+            user = self.by_email.get(credentials["email"])
+            if user is None or self.passwords[user.id] != credentials["password"]:
+                raise AuthApiError("Invalid login credentials", 400, "invalid_credentials")
+            return FakeAuthResponse(user, self.issue_session(user))
+
+    def get_user(self, token: str):
+        self.client.simulate_latency()
+        with self.client.lock:
+            user_id = self.sessions.get(token)
+            if user_id is None:
+                raise AuthApiError("Invalid JWT", 401, "bad_jwt")
+            return FakeAuthResponse(self.users[user_id])
+
+
+class FakeClient:
+    def __init__(self, latency: float = 0.0, jwt_secret: str = None, max_rows: int = None):
+        self.latency = latency
+        self.max_rows = max_rows
+        self.tables = {}
+        self.lock = threading.Lock()
+        self.auth = FakeAuth(self, jwt_secret)
+
+    def simulate_latency(self):
+        if self.latency:
+            time.sleep(self.latency)
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: dict = None) -> FakeRpc:
+        return FakeRpc(self, name, params or {})
@@ -1,12 +1,17 @@
-from fastapi import FastAPI, Request
+from fastapi import FastAPI, Request, Depends, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
-from routes.userEndpoint import getUser, updateUser
+from fastapi.responses import ORJSONResponse
+from routes.userEndpoint import getUser, updateUser, updateProfile
 from routes.signinEndpoint import signinEndpoint
 from routes.signupEndpoint import signupEndpoint
 from routes.dashboardEndpoint import getDashboard
 from routes.leaderboardEndpoint import getLeaderboard
 from routes.lessonEndpoint import getLessonById, submitAnswer, completeLesson
 from auth.signup import signup
+from auth.verify import current_user_id
+from utils import answerKey, compression, leaderboard, metrics, queryLog
+import models
+import repository
 import asyncio
 from contextlib import asynccontextmanager
 
@@ -19,18 +24,34 @@ except ImportError:
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
+    await repository.store.open()
+
+    try:
+        await answerKey.load()
+    except Exception as e:
+        print(f"Error loading answer key: {e}")
+
+    try:
+        await leaderboard.load()
+    except Exception as e:
+        print(f"Error loading leaderboard: {e}")
+    refresh_task = asyncio.create_task(leaderboard.refresh_task())
+
     if daily_reset_task:
         task = asyncio.create_task(daily_reset_task())
     yield
+    refresh_task.cancel()
     if daily_reset_task:
         task.cancel()
+    await repository.store.close()
 
 
 app = FastAPI(
     title="RuleShot™ Language Learning API",
     description="API for language learning application with lessons, streaks, and gamification",
     version="1.0.0",
-    lifespan=lifespan
+    lifespan=lifespan,
+    default_response_class=ORJSONResponse
 )
 
 app.add_middleware(
@@ -40,8 +61,12 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(compression.CompressionMiddleware)
+app.add_middleware(queryLog.QueryLogMiddleware)
+app.add_middleware(metrics.MetricsMiddleware)
 
-@app.get("/")
+@app.get("/", response_model=models.RootInfo)
+@queryLog.budget(0)
 async def root():
     return {
         "message": "Welcome to RuleShot™ API",
@@ -49,47 +74,65 @@ async def root():
         "docs": "/docs",
         "endpoints": {
             "auth": ["/v1/signup", "/v1/signin"],
-            "user": ["/v1/user", "/v1/dashboard"],
+            "user": ["/v1/user", "/v1/profile", "/v1/dashboard"],
             "lessons": ["/v1/lessons/{lesson_id}"],
             "leaderboard": ["/v1/leaderboard"]
         }
     }
 
-@app.post("/v1/signup")
+@app.get("/metrics", include_in_schema=False)
+@queryLog.budget(0)
+async def metricsRoute():
+    return Response(metrics.render(), media_type="text/plain; version=0.0.4")
+
+@app.post("/v1/signup", response_model=models.SignupResponse)
+@queryLog.budget(3)
 async def signupRoute(request: Request):
     return await signupEndpoint(request)
 
-@app.post("/v1/signin")
+@app.post("/v1/signin", response_model=models.SigninResponse)
+@queryLog.budget(2)
 async def signinRoute(request: Request):
     return await signinEndpoint(request)
 
-@app.get("/v1/user")
+@app.get("/v1/user", response_model=models.UserResponse)
+@queryLog.budget(1)
 async def userRoute(request: Request):
     return await getUser(request)
 
-@app.put("/v1/user")
-async def updateUserRoute(request: Request, user_update: dict):
-    return await updateUser(request, user_update)
-
-@app.get("/v1/dashboard")
-async def dashboardRoute(request: Request):
-    return await getDashboard(request)
-
-@app.get("/v1/leaderboard")
-async def leaderboardRoute(page: int = 1, per_page: int = 10):
-    return await getLeaderboard(page, per_page)
-
-@app.get("/v1/lessons/{lesson_id}")
-async def getLessonRoute(lesson_id: str, request: Request):
-    return await getLessonById(lesson_id, request)
-
-@app.post("/v1/lessons/{lesson_id}/questions/{question_id}/answer")
-async def submitAnswerRoute(lesson_id: str, question_id: str, request: Request):
+@app.put("/v1/user", response_model=models.UserResponse)
+@queryLog.budget(1)
+async def updateUserRoute(user_update: dict, user_id: str = Depends(current_user_id)):
+    return await updateUser(user_id, user_update)
+
+@app.patch("/v1/profile", response_model=models.Profile)
+@queryLog.budget(1)
+async def updateProfileRoute(changes: dict, user_id: str = Depends(current_user_id)):
+    return await updateProfile(user_id, changes)
+
+@app.get("/v1/dashboard", response_model=models.Dashboard)
+@queryLog.budget(3)
+async def dashboardRoute(request: Request, response: Response, user_id: str = Depends(current_user_id)):
+    return await getDashboard(user_id, request.headers.get("if-modified-since"), response)
+
+@app.get("/v1/leaderboard", response_model=models.LeaderboardPage)
+@queryLog.budget(2)
+async def leaderboardRoute(request: Request, response: Response, page: int = Query(1, ge=1), per_page: int = Query(10, ge=1, le=100), cursor: str = None, count: str = "maintained"):
+    return await getLeaderboard(page, per_page, cursor, count, request.headers.get("if-none-match"), response)
+
+@app.get("/v1/lessons/{lesson_id}", response_model=models.LessonResponse)
+@queryLog.budget(2)
+async def getLessonRoute(lesson_id: str, request: Request, user_id: str = Depends(current_user_id)):
+    return await getLessonById(lesson_id, user_id, request.headers.get("accept-encoding"), request.headers.get("if-none-match"))
+
+@app.post("/v1/lessons/{lesson_id}/questions/{question_id}/answer", response_model=models.AnswerResult, response_model_exclude_unset=True)
+@queryLog.budget(2)
+async def submitAnswerRoute(lesson_id: str, question_id: str, request: Request, user_id: str = Depends(current_user_id)):
     body = await request.json()
     selected_option_id = body.get("selected_option_id")
-    return await submitAnswer(lesson_id, question_id, selected_option_id, request)
+    return await submitAnswer(lesson_id, question_id, selected_option_id, user_id)
 
-@app.post("/v1/lessons/{lesson_id}/complete")
-async def completeLessonRoute(lesson_id: str, request: Request):
-    body = await request.json()
-    return await completeLesson(lesson_id, request, body)
\ No newline at end of file
+@app.post("/v1/lessons/{lesson_id}/complete", response_model=models.CompletionResult)
+@queryLog.budget(1)
+async def completeLessonRoute(lesson_id: str, completion: models.CompletionRequest, user_id: str = Depends(current_user_id)):
+    return await completeLesson(lesson_id, user_id, completion.model_dump())
\ No newline at end of file
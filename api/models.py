@@ -0,0 +1,191 @@
+"""
+Response models for every route.
+
+FastAPI validates each route's return value against its model in
+pydantic-core and hands the result straight to ORJSONResponse, so no
+response goes through jsonable_encoder and the stdlib json module. Dates and
+timestamps from the store are passed through as the ISO strings it returns.
+Auth models read attributes (from_attributes), so they accept the supabase
+client's response objects as well as dicts.
+
+The lesson route is the exception: it sends the body lessonCache serialized
+once, and LessonResponse only documents it.
+
+CompletionRequest is a request body: a completion is checked before it is
+recorded, since its values are stored and sent back.
+"""
+from datetime import datetime
+from typing import Optional
+
+from pydantic import BaseModel, ConfigDict, Field
+
+
+class RootInfo(BaseModel):
+    message: str
+    version: str
+    docs: str
+    endpoints: dict[str, list[str]]
+
+
+# --- auth ---
+
+class AuthUser(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    email: Optional[str] = None
+    aud: Optional[str] = None
+    role: Optional[str] = None
+    created_at: Optional[datetime] = None
+
+
+class AuthSession(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    access_token: str
+    refresh_token: str
+    token_type: Optional[str] = None
+    expires_in: Optional[int] = None
+
+
+class AuthResult(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    user: Optional[AuthUser] = None
+    session: Optional[AuthSession] = None
+
+
+class SignupResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    status_code: int
+    data: AuthResult
+
+
+class UserResponse(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    user: AuthUser
+
+
+# --- profiles ---
+
+class Profile(BaseModel):
+    id: str
+    username: str
+    handicap: int
+    xp: int
+    streak: int
+    hearts: int
+    last_lesson_date: Optional[str] = None
+    timezone: str
+    streak_freezes_used: int = 0
+    created_at: Optional[str] = None
+    updated_at: Optional[str] = None
+
+
+class SessionTokens(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    access_token: str
+    refresh_token: str
+
+
+class SigninUser(BaseModel):
+    model_config = ConfigDict(from_attributes=True)
+
+    id: str
+    email: Optional[str] = None
+
+
+class SigninResponse(BaseModel):
+    session: SessionTokens
+    user: SigninUser
+    profile: Optional[Profile] = None
+
+
+# --- leaderboard ---
+
+class LeaderboardPreviewEntry(BaseModel):
+    username: str
+    xp: int
+    streak: int
+
+
+class LeaderboardEntry(LeaderboardPreviewEntry):
+    handicap: int
+
+
+class LeaderboardPage(BaseModel):
+    leaderboard: list[LeaderboardEntry]
+    page: int
+    per_page: int
+    total: int
+    total_pages: int
+    total_is_exact: bool
+    next_cursor: Optional[str] = None
+
+
+# --- lessons ---
+
+class LessonSummary(BaseModel):
+    id: str
+    title: str
+    description: Optional[str] = None
+    order_number: int
+
+
+class Dashboard(BaseModel):
+    profile: Profile
+    next_lesson: Optional[LessonSummary] = None
+    leaderboard_preview: list[LeaderboardPreviewEntry]
+    rank: Optional[int] = None
+    lessons_completed: int
+
+
+class Option(BaseModel):
+    id: str
+    question_id: str
+    option_text: str
+    is_correct: bool
+    option_order: int
+
+
+class Question(BaseModel):
+    id: str
+    lesson_id: str
+    question_text: str
+    question_order: int
+    created_at: Optional[str] = None
+    options: list[Option]
+
+
+class Lesson(LessonSummary):
+    created_at: Optional[str] = None
+    questions: list[Question]
+
+
+class LessonResponse(BaseModel):
+    lesson: Lesson
+    hearts: int
+
+
+class AnswerResult(BaseModel):
+    # Only "correct" is sent for a right answer.
+    correct: bool
+    hearts_remaining: Optional[int] = None
+    correct_answer: Optional[Option] = None
+
+
+class CompletionRequest(BaseModel):
+    accuracy: float = Field(0, ge=0, le=100)
+    time_taken: int = Field(0, ge=0)  # in seconds
+    mistakes: int = Field(0, ge=0)
+
+
+class CompletionResult(BaseModel):
+    xp_earned: int
+    new_streak: int
+    total_xp: int
+    accuracy: float
+    time_taken: int
@@ -0,0 +1,185 @@
+"""
+Async data access layer.
+
+Route handlers should only talk to the database through the functions in
+this module. Auth always goes through the supabase client; data goes
+through the store selected by STORAGE_BACKEND (see storage/store.py):
+
+- "supabase" (default): PostgREST via the supabase client.
+- "sqlite": SqliteStore on SQLITE_PATH.
+- "postgres": PostgresStore on DATABASE_URL, for when the API and the
+  database share a box.
+
+The supabase client is synchronous, so every call is offloaded to a bounded
+thread pool instead of running on the event loop.
+"""
+import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from functools import partial
+
+from connect import supabase
+from storage.sqlStore import PostgresStore, SqliteStore
+from storage.supabaseStore import SupabaseStore
+from utils import metrics
+
+
+MAX_WORKERS = int(os.getenv("SUPABASE_MAX_WORKERS", "32"))
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "supabase")
+
+executor = ThreadPoolExecutor(max_workers=MAX_WORKERS, thread_name_prefix="supabase")
+
+
+async def run_sync(fn, *args, **kwargs):
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(executor, partial(fn, *args, **kwargs))
+
+
+OPERATIONS = {"GET": "select", "HEAD": "count", "POST": "insert", "PATCH": "update", "DELETE": "delete"}
+
+
+def query_labels(query):
+    """(target, operation) metric labels for a postgrest query builder."""
+    path = query.path.lstrip("/")
+    if path.startswith("rpc/"):
+        return path[len("rpc/"):], "rpc"
+    return path, OPERATIONS.get(query.http_method, query.http_method.lower())
+
+
+def query_filters(query) -> str:
+    """The query's filter parameters, e.g. "id=eq.42&limit=1", for the query log."""
+    return "&".join(f"{name}={value}" for name, value in query.params.multi_items() if name != "select")
+
+
+async def timed(target: str, operation: str, fn, *args, filters: str = "", **kwargs):
+    return await metrics.track(target, operation, run_sync(fn, *args, **kwargs), filters)
+
+
+async def execute(query):
+    target, operation = query_labels(query)
+    return await timed(target, operation, query.execute, filters=query_filters(query))
+
+
+# --- auth ---
+
+async def get_user(token: str):
+    return await timed("auth", "get_user", supabase.auth.get_user, token)
+
+
+async def sign_in(email: str, password: str):
+    return await timed("auth", "sign_in", supabase.auth.sign_in_with_password, {"email": email, "password": password})
+
+
+async def sign_up(email: str, password: str):
+    return await timed("auth", "sign_up", supabase.auth.sign_up, {"email": email, "password": password})
+
+
+async def update_auth_user(user_id: str, attributes: dict):
+    return await timed("auth", "update_user", supabase.auth.admin.update_user_by_id, user_id, attributes)
+
+
+# --- storage ---
+
+def create_store(backend: str):
+    if backend == "sqlite":
+        return SqliteStore(os.getenv("SQLITE_PATH", "ruleshot.db"))
+    if backend == "postgres":
+        return PostgresStore(os.getenv("DATABASE_URL"), max_size=int(os.getenv("DATABASE_POOL_SIZE", "10")))
+    if backend == "supabase":
+        return SupabaseStore(supabase, execute)
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+
+store = create_store(STORAGE_BACKEND)
+
+
+# --- profiles ---
+
+async def get_profile(user_id: str, columns: str = "*"):
+    return await store.get_profile(user_id, columns)
+
+
+async def username_exists(username: str) -> bool:
+    return await store.username_exists(username)
+
+
+async def insert_profile(profile_data: dict):
+    return await store.insert_profile(profile_data)
+
+
+async def update_profile(user_id: str, changes: dict):
+    return await store.update_profile(user_id, changes)
+
+
+async def decrement_hearts(user_id: str):
+    """Atomically take one heart; returns the new count, or None if there is no profile."""
+    return await store.decrement_hearts(user_id)
+
+
+async def count_profiles(method: str = "exact") -> int:
+    """Row count of profiles; method is "exact", or "planned" for the planner's estimate."""
+    return await store.count_profiles(method)
+
+
+async def get_leaderboard(offset: int, limit: int, columns: str = "username, xp, streak, handicap"):
+    return await store.get_leaderboard(offset, limit, columns)
+
+
+async def get_leaderboard_after(xp: int, user_id: str, limit: int, columns: str = "id, username, xp, streak, handicap"):
+    """Keyset page: the rows ranked directly below (xp, user_id)."""
+    return await store.get_leaderboard_after(xp, user_id, limit, columns)
+
+
+# --- lessons ---
+
+async def get_lessons(columns: str = "id, title, description, order_number"):
+    return await store.get_lessons(columns)
+
+
+async def get_lesson_content(lesson_id: str):
+    """Lesson with its questions and their options, in a single round trip."""
+    return await store.get_lesson_content(lesson_id)
+
+
+async def get_answer_key():
+    """Every lesson's question ids and options, for building the answer key."""
+    return await store.get_answer_key()
+
+
+# --- completed lessons ---
+
+async def complete_lesson(user_id: str, lesson_id: str, accuracy, time_taken: int, mistakes: int):
+    """Record a completion and apply its XP/streak changes in one transaction.
+
+    Returns {"xp_earned", "new_streak", "total_xp", "lesson_date"}, or None if there is no profile.
+    """
+    return await store.complete_lesson(user_id, lesson_id, accuracy, time_taken, mistakes)
+
+
+# --- maintenance ---
+
+async def reset_stale_streaks(before: date, timezone: str, after_id: str = None, through_id: str = None) -> int:
+    """Set streak = 0 for users in timezone whose last_lesson_date < before, in one statement.
+
+    after_id/through_id limit the update to one id range (after_id, through_id],
+    so a scan can reset the table one page at a time. Returns rows updated.
+    """
+    return await store.reset_stale_streaks(before, timezone, after_id, through_id)
+
+
+async def get_page(table: str, columns: str, after_id: str = None, limit: int = 1000, filters=()):
+    """One page of table in id order, starting after after_id.
+
+    filters are (operator, column, value) tuples applied with the query
+    builder method of that name, e.g. ("lt", "last_lesson_date", "2024-01-01").
+    """
+    return await store.get_page(table, columns, after_id, limit, filters)
+
+
+async def claim_job(job: str, run_on: date, holder: str, ttl_seconds: int) -> bool:
+    return await store.claim_job(job, run_on, holder, ttl_seconds)
+
+
+async def finish_job(job: str, run_on: date, holder: str, completed: bool = True):
+    await store.finish_job(job, run_on, holder, completed)
@@ -1,43 +1,66 @@
-from fastapi import HTTPException
-from connect import supabase
+import asyncio
 from datetime import datetime, timezone
+from fastapi import HTTPException, Response
+import repository
+from utils import conditional, leaderboard, lessonCache, progress
 
 
-async def getDashboard(request):
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or " " not in auth_header:
-        raise HTTPException(status_code=401, detail="Authorization token required")
+async def leaderboard_preview():
+    if leaderboard.loaded:
+        return leaderboard.top(5)
+    rows = await repository.get_leaderboard(0, 5, "username, xp, streak, last_lesson_date, timezone")
+    return [leaderboard.present(row, ("username", "xp", "streak")) for row in rows]
 
-    token = auth_header.split(" ")[1]
 
+def last_modified(profile: dict, catalog):
+    """When anything on the dashboard last changed, or None if unknown.
+
+    Besides the profile row, the dashboard shows the catalog, the
+    leaderboard preview and rank, and hearts and streaks that reset at the
+    user's local midnight. Without the leaderboard index the preview comes
+    from the database, and there is no validator.
+    """
+    if not leaderboard.loaded or not profile.get("updated_at"):
+        return None
+    updated_at = datetime.fromisoformat(profile["updated_at"].replace("Z", "+00:00"))
+    if updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    return max(
+        updated_at,
+        datetime.fromtimestamp(max(leaderboard.changed_at, catalog.loaded_at), timezone.utc),
+        progress.start_of_local_day(profile.get("timezone"))
+    )
+
+
+async def getDashboard(user_id: str, if_modified_since: str = None, response: Response = None):
     try:
-        user_response = supabase.auth.get_user(token)
-        user_id = user_response.user.id
-        profile = supabase.table("profiles").select("*").eq("id", user_id).single().execute()
+        profile, catalog, preview = await asyncio.gather(
+            repository.get_profile(user_id),
+            lessonCache.catalog(),
+            leaderboard_preview()
+        )
 
-        if not profile.data:
+        if not profile:
             raise HTTPException(status_code=404, detail="Profile not found")
 
-        completed = supabase.table("completed_lessons").select("id", count="exact").eq("user_id", user_id).execute()
-        lessons_completed = completed.count if completed.count else 0
+        modified = last_modified(profile, catalog)
+        if modified and conditional.is_settled(modified):
+            headers = {"Last-Modified": conditional.http_date(modified), "Cache-Control": "private, no-cache"}
+            if conditional.not_modified_since(if_modified_since, modified):
+                return conditional.not_modified(headers)
+            if response is not None:
+                response.headers.update(headers)
 
-        all_lessons = supabase.table("lessons").select("id, title, description, order_number").order("order_number").execute()
-        completed_lesson_ids = supabase.table("completed_lessons").select("lesson_id").eq("user_id", user_id).execute()
-        completed_ids = [item["lesson_id"] for item in completed_lesson_ids.data] if completed_lesson_ids.data else []
-        next_lesson = None
-
-        for lesson in all_lessons.data if all_lessons.data else []:
-            if lesson["id"] not in completed_ids:
-                next_lesson = lesson
-                break
-        
-        leaderboard = supabase.table("profiles").select("username, xp, streak").order("xp", desc=True).limit(5).execute()
+        progress.apply_daily_rules(profile)
+        bitmap = progress.decode_bitmap(profile.pop("progress_bitmap", None))
+        next_order = progress.first_incomplete(bitmap, catalog.mask)
         
         return {
-            "profile": profile.data,
-            "next_lesson": next_lesson,
-            "leaderboard_preview": leaderboard.data if leaderboard.data else [],
-            "lessons_completed": lessons_completed
+            "profile": profile,
+            "next_lesson": catalog.by_order[next_order] if next_order is not None else None,
+            "leaderboard_preview": preview,
+            "rank": leaderboard.rank(user_id),
+            "lessons_completed": progress.completed_count(bitmap)
         }
     except HTTPException:
         raise
@@ -1,24 +1,84 @@
-from fastapi import HTTPException
-from connect import supabase
+import base64
+import json
+import uuid
+from fastapi import HTTPException, Response
+import repository
+from utils import conditional, leaderboard
 
 
-async def getLeaderboard(page: int = 1, per_page: int = 10):
+COUNT_MODES = ("maintained", "estimated", "exact")
+
+
+def encode_cursor(xp: int, user_id: str) -> str:
+    return base64.urlsafe_b64encode(json.dumps([xp, user_id]).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
     try:
+        xp, user_id = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        return int(xp), str(uuid.UUID(user_id))
+    except Exception:
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+async def leaderboard_total(count: str):
+    """Total number of profiles and whether it is exact.
+
+    maintained: size of the in-memory index (kept up to date by signups in
+    this worker and refreshed periodically), estimated: the Postgres planner's
+    row estimate, exact: a full count(*).
+    """
+    if count not in COUNT_MODES:
+        raise HTTPException(status_code=400, detail=f"count must be one of: {', '.join(COUNT_MODES)}")
+
+    if count == "exact":
+        return await repository.count_profiles("exact"), True
+    if count == "maintained" and leaderboard.loaded:
+        return leaderboard.total(), False
+    return await repository.count_profiles("planned"), False
+
+
+async def getLeaderboard(page: int = 1, per_page: int = 10, cursor: str = None, count: str = "maintained",
+                         if_none_match: str = None, response: Response = None):
+    try:
+        # Pages served entirely from the in-memory index can be validated
+        # before any work; a count from the database has no cheap validator.
+        etag = leaderboard.etag() if count == "maintained" and leaderboard.loaded else None
+        if etag and conditional.etag_matches(if_none_match, etag):
+            return conditional.not_modified({"ETag": etag, "Cache-Control": "no-cache"})
+
         offset = (page - 1) * per_page
+        after = decode_cursor(cursor) if cursor else None
+        total, total_is_exact = await leaderboard_total(count)
+
+        if leaderboard.loaded:
+            start = leaderboard.position_after(*after) if after else offset
+            rows = leaderboard.page(start, per_page)
+            end = start + len(rows)
+            next_cursor = encode_cursor(*leaderboard.key_at(end - 1)) if rows and end < leaderboard.total() else None
+        else:
+            columns = "id, username, xp, streak, handicap, last_lesson_date, timezone"
+            if after:
+                rows = await repository.get_leaderboard_after(*after, per_page, columns)
+            else:
+                rows = await repository.get_leaderboard(offset, per_page, columns)
+            next_cursor = encode_cursor(rows[-1]["xp"], rows[-1]["id"]) if len(rows) == per_page else None
+            rows = [leaderboard.present(row, ("username", "xp", "streak", "handicap")) for row in rows]
 
-        count_response = supabase.table("profiles").select("id", count="exact").execute()
-        total = count_response.count if count_response.count else 0
+        if etag and response is not None:
+            response.headers["ETag"] = etag
+            response.headers["Cache-Control"] = "no-cache"
 
-        response = supabase.table("profiles").select(
-            "username, xp, streak, handicap"
-        ).order("xp", desc=True).range(offset, offset + per_page - 1).execute()
-        
         return {
-            "leaderboard": response.data if response.data else [],
+            "leaderboard": rows,
             "page": page,
             "per_page": per_page,
             "total": total,
-            "total_pages": (total + per_page - 1) // per_page
+            "total_pages": (total + per_page - 1) // per_page,
+            "total_is_exact": total_is_exact,
+            "next_cursor": next_cursor
         }
+    except HTTPException:
+        raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -1,87 +1,68 @@
-from fastapi import HTTPException
-from connect import supabase
-from datetime import datetime, timezone, timedelta
+from fastapi import HTTPException, Response
+import repository
+from utils import lessonCache, answerKey, leaderboard, progress, compression, conditional
 
 
-async def getLessonById(lesson_id: str, request):
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or " " not in auth_header:
-        raise HTTPException(status_code=401, detail="Authorization token required")
-    
-    token = auth_header.split(" ")[1]
-
+async def getLessonById(lesson_id: str, user_id: str, accept_encoding: str = None, if_none_match: str = None):
     try:
-        user_response = supabase.auth.get_user(token)
-        user_id = user_response.user.id
-
-        profile = supabase.table("profiles").select("hearts").eq("id", user_id).single().execute()
+        profile = progress.apply_daily_rules(await repository.get_profile(user_id, "hearts, hearts_refilled_on, timezone"))
 
-        if not profile.data:
+        if not profile:
             raise HTTPException(status_code=404, detail="Profile not found")
         
-        if profile.data["hearts"] <= 0:
+        if profile["hearts"] <= 0:
             raise HTTPException(status_code=400, detail="No hearts remaining. Come back tomorrow!")
         
-        lesson = supabase.table("lessons").select("*").eq("id", lesson_id).single().execute()
+        cached = await lessonCache.get(lesson_id)
 
-        if not lesson.data:
+        if not cached:
             raise HTTPException(status_code=404, detail="Lesson not found")
-        
-        questions = supabase.table("questions").select("*").eq("lesson_id", lesson_id).order("question_order").execute()
-
-        lesson_data = lesson.data
-        lesson_data["questions"] = []
-        
-        for question in questions.data if questions.data else []:
-            options = supabase.table("options").select("*").eq("question_id", question["id"]).order("option_order").execute()
-            question["options"] = options.data if options.data else []
-            lesson_data["questions"].append(question)
 
-        return {
-            "lesson": lesson_data,
-            "hearts": profile.data["hearts"]
-        }
+        hearts = profile["hearts"]
+        body = cached.response_body(hearts)
+        encoding = compression.negotiate(accept_encoding)
+        if len(body) < compression.MINIMUM_SIZE:
+            encoding = None
+
+        # The hearts count is part of the body, so the profile read above
+        # is needed before the ETag is known; the lesson itself is cached.
+        headers = {"ETag": cached.etag(hearts, encoding), "Cache-Control": "private, no-cache"}
+        if conditional.etag_matches(if_none_match, headers["ETag"]):
+            return conditional.not_modified({**headers, "Vary": "Accept-Encoding"})
+
+        if encoding:
+            return Response(
+                content=cached.compressed_body(hearts, encoding),
+                media_type="application/json",
+                headers={**headers, "Content-Encoding": encoding, "Vary": "Accept-Encoding"}
+            )
+        return Response(content=body, media_type="application/json", headers=headers)
     except HTTPException:
         raise
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-async def submitAnswer(lesson_id: str, question_id: str, selected_option_id: str, request):
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or " " not in auth_header:
-        raise HTTPException(status_code=401, detail="Authorization token required")
-    
-    token = auth_header.split(" ")[1]
-    
+async def submitAnswer(lesson_id: str, question_id: str, selected_option_id: str, user_id: str):
     try:
-        user_response = supabase.auth.get_user(token)
-        user_id = user_response.user.id
+        option = await answerKey.lookup(selected_option_id)
 
-        option = supabase.table("options").select("*").eq("id", selected_option_id).single().execute()
-
-        if not option.data:
+        if not option:
             raise HTTPException(status_code=404, detail="Option not found")
-        
-        is_correct = option.data["is_correct"]
 
-        if not is_correct:
-            profile = supabase.table("profiles").select("hearts").eq("id", user_id).single().execute()
+        if option.question_id != question_id or option.lesson_id != lesson_id:
+            raise HTTPException(status_code=400, detail="Option does not belong to this question")
+        
+        if not option.is_correct:
+            hearts_remaining = await repository.decrement_hearts(user_id)
 
-            if not profile.data:
+            if hearts_remaining is None:
                 raise HTTPException(status_code=404, detail="Profile not found")
-            
-            current_hearts = profile.data["hearts"]
-
-            if current_hearts > 0:
-                supabase.table("profiles").update({"hearts": current_hearts - 1}).eq("id", user_id).execute()
-
-            correct_option = supabase.table("options").select("*").eq("question_id", question_id).eq("is_correct", True).single().execute()
 
             return {
                 "correct": False,
-                "hearts_remaining": max(0, current_hearts - 1),
-                "correct_answer": correct_option.data if correct_option.data else None
+                "hearts_remaining": hearts_remaining,
+                "correct_answer": answerKey.correct_option(question_id)
             }
         
         return {
@@ -93,61 +74,30 @@ async def submitAnswer(lesson_id: str, question_id: str, selected_option_id: str
         raise HTTPException(status_code=400, detail=str(e))
 
 
-async def completeLesson(lesson_id: str, request, completion_data: dict):
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or " " not in auth_header:
-        raise HTTPException(status_code=401, detail="Authorization token required")
-    
-    token = auth_header.split(" ")[1]
-
+async def completeLesson(lesson_id: str, user_id: str, completion_data: dict):
     try:
-        user_response = supabase.auth.get_user(token)
-        user_id = user_response.user.id
-
-        profile = supabase.table("profiles").select("*").eq("id", user_id).single().execute()
-
-        if not profile.data:
+        result = await repository.complete_lesson(
+            user_id,
+            lesson_id,
+            completion_data.get("accuracy", 0),
+            completion_data.get("time_taken", 0),
+            completion_data.get("mistakes", 0)
+        )
+
+        if not result:
             raise HTTPException(status_code=404, detail="Profile not found")
-        
-        mistakes = completion_data.get("mistakes", 0)
-        xp_earned = max(0, 100 - (mistakes * 5))
-        current_xp = profile.data["xp"]
-        current_streak = profile.data["streak"]
-
-        last_lesson_date = profile.data.get("last_lesson_date")
-        today = datetime.now(timezone.utc).date()
-
-        new_streak = current_streak
-        if last_lesson_date:
-            last_date = datetime.fromisoformat(str(last_lesson_date)).date()
-            days_diff = (today - last_date).days
-
-            if days_diff == 1:
-                new_streak = current_streak + 1
-            elif days_diff > 1:
-                new_streak = 1
-        else:
-            new_streak = 1
-
-        supabase.table("profiles").update({
-            "xp": current_xp + xp_earned,
-            "streak": new_streak,
-            "last_lesson_date": today.isoformat()
-        }).eq("id", user_id).execute()
-
-        supabase.table("completed_lessons").insert({
-            "user_id": user_id,
-            "lesson_id": lesson_id,
-            "accuracy": completion_data.get("accuracy", 0),
-            "xp_earned": xp_earned,
-            "time_taken": completion_data.get("time_taken", 0),
-            "mistakes": mistakes
-        }).execute()
+
+        leaderboard.update(
+            user_id,
+            xp=result["total_xp"],
+            streak=result["new_streak"],
+            last_lesson_date=result["lesson_date"]
+        )
         
         return {
-            "xp_earned": xp_earned,
-            "new_streak": new_streak,
-            "total_xp": current_xp + xp_earned,
+            "xp_earned": result["xp_earned"],
+            "new_streak": result["new_streak"],
+            "total_xp": result["total_xp"],
             "accuracy": completion_data.get("accuracy", 0),
             "time_taken": completion_data.get("time_taken", 0)
         }
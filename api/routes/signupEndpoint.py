@@ -1,5 +1,6 @@
 from fastapi import HTTPException, Request
 from auth.signup import signup
+from utils import progress
 
 async def signupEndpoint(request: Request):
     body = await request.json()
@@ -8,6 +9,7 @@ async def signupEndpoint(request: Request):
     password = body.get("password")
     username = body.get("username")
     handicap = body.get("handicap")
+    timezone = body.get("timezone") or progress.DEFAULT_TIMEZONE
     
     if not email:
         raise HTTPException(status_code=400, detail="Email is required")
@@ -19,7 +21,7 @@ async def signupEndpoint(request: Request):
         raise HTTPException(status_code=400, detail="Handicap is required")
     
     try:
-        response = await signup(email, password, username, handicap)
+        response = await signup(email, password, username, handicap, timezone)
         return response
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
@@ -1,34 +1,21 @@
 from fastapi import HTTPException
-from connect import supabase
+import repository
+from auth.verify import bearer_token
+from utils import leaderboard, progress
 
 
 async def getUser(request):
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or " " not in auth_header:
-        raise HTTPException(status_code=401, detail="Authorization token required")
-    
-    token = auth_header.split(" ")[1]
+    token = bearer_token(request)
     try:
-        response = supabase.auth.get_user(token)
+        response = await repository.get_user(token)
         return response
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 
-async def updateUser(request, user_update):
-    auth_header = request.headers.get("Authorization")
-    if not auth_header or " " not in auth_header:
-        raise HTTPException(status_code=401, detail="Authorization token required")
-    
-    access_token = auth_header.split(" ")[1]
+async def updateUser(user_id: str, user_update):
     try:
-        if access_token is None:
-            raise HTTPException(status_code=400, detail="Access token is required")
-        
-        user_id = supabase.auth.get_user(access_token).user.id
-        if user_id is None:
-            raise HTTPException(status_code=400, detail="Invalid access token")
-        response = supabase.auth.admin.update_user_by_id(
+        response = await repository.update_auth_user(
             user_id,
             {
                 "email": user_update.get("email"),
@@ -37,4 +24,21 @@ async def updateUser(request, user_update):
         )
         return response
     except Exception as e:
-        raise HTTPException(status_code=400, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+async def updateProfile(user_id: str, body: dict):
+    timezone = body.get("timezone")
+    if not timezone or not progress.is_valid_timezone(timezone):
+        raise HTTPException(status_code=400, detail="Invalid time zone")
+
+    try:
+        rows = await repository.update_profile(user_id, {"timezone": timezone})
+    except Exception as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    if not rows:
+        raise HTTPException(status_code=404, detail="Profile not found")
+
+    leaderboard.update(user_id, timezone=timezone)
+    return progress.apply_daily_rules(rows[0])
@@ -1854,7 +1854,7 @@ def main():
         print("✓ Database tables are accessible")
     except Exception as e:
         print(f"✗ Error accessing database tables: {e}")
-        print("Please make sure you've run all the SQL migration files first!")
+        print("Please make sure you've applied supabase/migrations/ and supabase/functions/ first!")
         return
     
     print("\nSeeding data...")
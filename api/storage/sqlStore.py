@@ -0,0 +1,515 @@
+"""
+Direct SQL storage for single-node deployments.
+
+When the API and the database run on the same box, going through PostgREST
+costs an HTTPS round trip per query. SqlStore runs the same operations as
+plain SQL instead:
+
+- PostgresStore talks to Postgres through an asyncpg pool. open() applies
+  any pending migrations from supabase/migrations/ and (re)creates the
+  functions in supabase/functions/, where the hearts, completion and job
+  rules stay.
+- SqliteStore keeps everything in one SQLite file (or in memory) for
+  development and benchmarks, with the schema in storage/sqlite.sql and
+  the same rules applied in Python inside a write transaction.
+
+SQL is written once with "?" placeholders; PostgresStore renumbers them.
+Table and column names come from the callers, so they are checked against
+COLUMNS before they reach a query.
+"""
+import asyncio
+import re
+import sqlite3
+import uuid
+from abc import abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+from functools import partial
+from pathlib import Path
+from uuid import UUID
+
+from storage.store import Store
+from utils import metrics, progress
+
+
+SUPABASE_DIR = Path(__file__).parent.parent / "supabase"
+SQLITE_SCHEMA = Path(__file__).parent / "sqlite.sql"
+AUTH_STUB_SQL = "create schema if not exists auth; create table if not exists auth.users (id uuid primary key)"
+
+COLUMNS = {
+    "profiles": (
+        "id", "username", "handicap", "xp", "streak", "hearts", "hearts_refilled_on", "last_lesson_date",
+        "timezone", "streak_freezes_used", "progress_bitmap", "created_at", "updated_at"
+    ),
+    "lessons": ("id", "title", "description", "order_number", "created_at"),
+    "questions": ("id", "lesson_id", "question_text", "question_order", "created_at"),
+    "options": ("id", "question_id", "option_text", "is_correct", "option_order"),
+    "completed_lessons": ("id", "user_id", "lesson_id", "accuracy", "xp_earned", "time_taken", "mistakes", "completed_at"),
+    "scheduled_jobs": ("job_name", "last_run_on", "holder", "lease_expires_at")
+}
+DATE_COLUMNS = {"hearts_refilled_on", "last_lesson_date", "last_run_on"}
+TIMESTAMP_COLUMNS = {"created_at", "updated_at", "completed_at", "lease_expires_at"}
+BOOLEAN_COLUMNS = {"is_correct"}
+OPERATORS = {"eq": "=", "neq": "<>", "lt": "<", "lte": "<=", "gt": ">", "gte": ">="}
+
+
+def migrations() -> list:
+    """(version, sql) for every file in supabase/migrations/, in order."""
+    return [(path.stem, path.read_text()) for path in sorted((SUPABASE_DIR / "migrations").glob("*.sql"))]
+
+
+def functions_sql() -> str:
+    return ";\n".join(path.read_text() for path in sorted((SUPABASE_DIR / "functions").glob("*.sql")))
+
+
+def schema_sql() -> str:
+    """The whole Postgres schema at once: every migration, then every function.
+
+    A stub auth.users is created for databases without Supabase auth, so the
+    foreign keys resolve.
+    """
+    return ";\n".join([AUTH_STUB_SQL] + [sql for _, sql in migrations()] + [functions_sql()])
+
+
+def column_list(table: str, columns: str = "*") -> list:
+    if table not in COLUMNS:
+        raise ValueError(f"Unknown table: {table}")
+    names = [column.strip() for column in columns.split(",") if column.strip()]
+    if names == ["*"]:
+        return list(COLUMNS[table])
+    for name in names:
+        if name not in COLUMNS[table]:
+            raise ValueError(f"Unknown column: {table}.{name}")
+    return names
+
+
+def serialize(key: str, value):
+    """A column value as PostgREST would send it."""
+    if isinstance(value, UUID):
+        return str(value)
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (bytes, memoryview)):
+        return "\\x" + bytes(value).hex()
+    if isinstance(value, Decimal):
+        return float(value)
+    if key.rsplit("__", 1)[-1] in BOOLEAN_COLUMNS and value is not None:
+        return bool(value)
+    return value
+
+
+def to_date(column: str, value):
+    if column in DATE_COLUMNS and isinstance(value, str):
+        return date.fromisoformat(value)
+    if column in TIMESTAMP_COLUMNS and isinstance(value, str):
+        return datetime.fromisoformat(value)
+    return value
+
+
+def prefixed(alias: str, table: str) -> str:
+    return ", ".join(f"{alias}.{column} as {alias}__{column}" for column in COLUMNS[table])
+
+
+def unprefix(row: dict, alias: str) -> dict:
+    prefix = f"{alias}__"
+    return {key[len(prefix):]: value for key, value in row.items() if key.startswith(prefix)}
+
+
+class SqlStore(Store):
+    @abstractmethod
+    async def fetch(self, target: str, operation: str, sql: str, *args) -> list:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def execute_count(self, target: str, operation: str, sql: str, *args) -> int:
+        """Run a statement and return the number of rows it changed."""
+        raise NotImplementedError
+
+    async def insert_rows(self, table: str, rows: list):
+        """Insert rows into any table, e.g. to seed lesson content."""
+        if not rows:
+            return []
+        columns = column_list(table, ", ".join(rows[0]))
+        values = ", ".join("(" + ", ".join("?" for _ in columns) + ")" for _ in rows)
+        args = [to_date(column, row.get(column)) for row in rows for column in columns]
+        return await self.fetch(table, "insert", f"insert into {table} ({', '.join(columns)}) values {values} returning *", *args)
+
+    # --- profiles ---
+
+    async def get_profile(self, user_id: str, columns: str = "*"):
+        rows = await self.fetch("profiles", "select", f"select {', '.join(column_list('profiles', columns))} from profiles where id = ?", user_id)
+        return rows[0] if rows else None
+
+    async def username_exists(self, username: str) -> bool:
+        rows = await self.fetch("profiles", "select", "select 1 as found from profiles where username = ? limit 1", username)
+        return len(rows) > 0
+
+    async def insert_profile(self, profile_data: dict):
+        return await self.insert_rows("profiles", [profile_data])
+
+    async def update_profile(self, user_id: str, changes: dict):
+        columns = column_list("profiles", ", ".join(changes))
+        assignments = ", ".join(f"{column} = ?" for column in columns)
+        args = [to_date(column, changes[column]) for column in columns]
+        return await self.fetch("profiles", "update", f"update profiles set {assignments} where id = ? returning *", *args, user_id)
+
+    async def count_profiles(self, method: str = "exact") -> int:
+        rows = await self.fetch("profiles", "count", "select count(*) as count from profiles")
+        return rows[0]["count"]
+
+    async def get_leaderboard(self, offset: int, limit: int, columns: str = "username, xp, streak, handicap"):
+        return await self.fetch(
+            "profiles", "select",
+            f"select {', '.join(column_list('profiles', columns))} from profiles order by xp desc, id limit ? offset ?",
+            limit, offset
+        )
+
+    async def get_leaderboard_after(self, xp: int, user_id: str, limit: int, columns: str = "id, username, xp, streak, handicap"):
+        return await self.fetch(
+            "profiles", "select",
+            f"select {', '.join(column_list('profiles', columns))} from profiles "
+            "where xp <= ? and (xp < ? or id > ?) order by xp desc, id limit ?",
+            xp, xp, user_id, limit
+        )
+
+    # --- lessons ---
+
+    async def get_lessons(self, columns: str = "id, title, description, order_number"):
+        return await self.fetch("lessons", "select", f"select {', '.join(column_list('lessons', columns))} from lessons order by order_number")
+
+    async def get_lesson_content(self, lesson_id: str):
+        rows = await self.fetch(
+            "lessons", "select",
+            f"select {prefixed('l', 'lessons')}, {prefixed('q', 'questions')}, {prefixed('o', 'options')} "
+            "from lessons l "
+            "left join questions q on q.lesson_id = l.id "
+            "left join options o on o.question_id = q.id "
+            "where l.id = ? order by q.question_order, o.option_order",
+            lesson_id
+        )
+        if not rows:
+            return None
+
+        lesson = {**unprefix(rows[0], "l"), "questions": []}
+        questions = {}
+        for row in rows:
+            question_id = row["q__id"]
+            if question_id is None:
+                continue
+            if question_id not in questions:
+                questions[question_id] = {**unprefix(row, "q"), "options": []}
+                lesson["questions"].append(questions[question_id])
+            if row["o__id"] is not None:
+                questions[question_id]["options"].append(unprefix(row, "o"))
+        return lesson
+
+    async def get_answer_key(self):
+        rows = await self.fetch(
+            "lessons", "select",
+            f"select q.lesson_id as q__lesson_id, q.id as q__id, {prefixed('o', 'options')} "
+            "from questions q join options o on o.question_id = q.id"
+        )
+        lessons = {}
+        questions = {}
+        for row in rows:
+            lesson = lessons.setdefault(row["q__lesson_id"], {"id": row["q__lesson_id"], "questions": []})
+            if row["q__id"] not in questions:
+                questions[row["q__id"]] = {"id": row["q__id"], "options": []}
+                lesson["questions"].append(questions[row["q__id"]])
+            questions[row["q__id"]]["options"].append(unprefix(row, "o"))
+        return list(lessons.values())
+
+    # --- maintenance ---
+
+    async def reset_stale_streaks(self, before: date, timezone: str, after_id: str = None, through_id: str = None) -> int:
+        sql = "update profiles set streak = 0 where timezone = ? and last_lesson_date < ? and streak <> 0"
+        args = [timezone, before]
+        if after_id:
+            sql += " and id > ?"
+            args.append(after_id)
+        if through_id:
+            sql += " and id <= ?"
+            args.append(through_id)
+        return await self.execute_count("profiles", "update", sql, *args)
+
+    async def get_page(self, table: str, columns: str, after_id: str = None, limit: int = 1000, filters=()):
+        conditions = []
+        args = []
+        for operator, column, value in filters:
+            column_list(table, column)
+            if operator == "in":
+                conditions.append(f"{column} in ({', '.join('?' for _ in value)})")
+                args.extend(to_date(column, item) for item in value)
+            elif operator in OPERATORS:
+                conditions.append(f"{column} {OPERATORS[operator]} ?")
+                args.append(to_date(column, value))
+            else:
+                raise ValueError(f"Unsupported filter operator: {operator}")
+        if after_id:
+            conditions.append("id > ?")
+            args.append(after_id)
+
+        where = f" where {' and '.join(conditions)}" if conditions else ""
+        return await self.fetch(
+            table, "select",
+            f"select {', '.join(column_list(table, columns))} from {table}{where} order by id limit ?",
+            *args, limit
+        )
+
+
+class PostgresStore(SqlStore):
+    def __init__(self, dsn: str, min_size: int = 1, max_size: int = 10, server_settings: dict = None):
+        self.dsn = dsn
+        self.min_size = min_size
+        self.max_size = max_size
+        self.server_settings = server_settings
+        self.pool = None
+        self.pool_lock = asyncio.Lock()
+
+    async def connection_pool(self):
+        if self.pool is None:
+            async with self.pool_lock:
+                if self.pool is None:
+                    import asyncpg
+                    self.pool = await asyncpg.create_pool(
+                        self.dsn, min_size=self.min_size, max_size=self.max_size, server_settings=self.server_settings
+                    )
+        return self.pool
+
+    async def open(self):
+        pool = await self.connection_pool()
+        async with pool.acquire() as connection:
+            # Serialise workers starting at the same time; replacing a
+            # function concurrently fails with "tuple concurrently updated".
+            await connection.execute("select pg_advisory_lock(hashtext('ruleshot_schema'))")
+            try:
+                has_auth = await connection.fetchval("select to_regclass('auth.users') is not null")
+                await connection.execute(AUTH_STUB_SQL)
+                await self.migrate(connection)
+                await connection.execute(functions_sql())
+                if not has_auth:
+                    # Users live in the Supabase auth project, not in this database.
+                    await connection.execute(
+                        "alter table profiles drop constraint if exists profiles_id_fkey;"
+                        "alter table completed_lessons drop constraint if exists completed_lessons_user_id_fkey"
+                    )
+            finally:
+                await connection.execute("select pg_advisory_unlock(hashtext('ruleshot_schema'))")
+
+    @staticmethod
+    async def migrate(connection) -> list:
+        """Apply the migrations not yet recorded in schema_migrations, each in its own transaction."""
+        await connection.execute(
+            "create table if not exists schema_migrations (version text primary key, applied_at timestamp with time zone default now())"
+        )
+        applied = {row["version"] for row in await connection.fetch("select version from schema_migrations")}
+
+        pending = [(version, sql) for version, sql in migrations() if version not in applied]
+        for version, sql in pending:
+            async with connection.transaction():
+                await connection.execute(sql)
+                await connection.execute("insert into schema_migrations (version) values ($1)", version)
+            print(f"Applied migration {version}")
+        return [version for version, _ in pending]
+
+    async def close(self):
+        if self.pool is not None:
+            await self.pool.close()
+            self.pool = None
+
+    @staticmethod
+    def numbered(sql: str) -> str:
+        counter = iter(range(1, sql.count("?") + 1))
+        return re.sub(r"\?", lambda _: f"${next(counter)}", sql)
+
+    async def fetch(self, target: str, operation: str, sql: str, *args) -> list:
+        pool = await self.connection_pool()
+        records = await metrics.track(target, operation, pool.fetch(self.numbered(sql), *args))
+        return [{key: serialize(key, value) for key, value in record.items()} for record in records]
+
+    async def execute_count(self, target: str, operation: str, sql: str, *args) -> int:
+        pool = await self.connection_pool()
+        status = await metrics.track(target, operation, pool.execute(self.numbered(sql), *args))
+        return int(status.rsplit(" ", 1)[-1])
+
+    async def count_profiles(self, method: str = "exact") -> int:
+        if method == "planned":
+            rows = await self.fetch("profiles", "count", "select reltuples::bigint as count from pg_class where oid = 'profiles'::regclass")
+            # reltuples is -1 until the table has been analyzed.
+            if rows and rows[0]["count"] >= 0:
+                return rows[0]["count"]
+        return await super().count_profiles("exact")
+
+    async def decrement_hearts(self, user_id: str):
+        rows = await self.fetch("decrement_hearts", "rpc", "select decrement_hearts(?) as hearts", user_id)
+        return rows[0]["hearts"]
+
+    async def complete_lesson(self, user_id: str, lesson_id: str, accuracy, time_taken: int, mistakes: int):
+        rows = await self.fetch(
+            "complete_lesson", "rpc", "select * from complete_lesson(?, ?, ?, ?, ?)",
+            user_id, lesson_id, Decimal(str(accuracy)), time_taken, mistakes
+        )
+        return rows[0] if rows else None
+
+    async def claim_job(self, job: str, run_on: date, holder: str, ttl_seconds: int) -> bool:
+        rows = await self.fetch("claim_job", "rpc", "select claim_job(?, ?, ?, ?) as claimed", job, run_on, holder, ttl_seconds)
+        return bool(rows[0]["claimed"])
+
+    async def finish_job(self, job: str, run_on: date, holder: str, completed: bool = True):
+        await self.fetch("finish_job", "rpc", "select finish_job(?, ?, ?, ?)", job, run_on, holder, completed)
+
+
+class SqliteStore(SqlStore):
+    """One SQLite connection on its own thread.
+
+    SQLite runs one writer at a time anyway, so a single thread keeps this
+    simple (and makes ":memory:" databases work) at the cost of read
+    concurrency, which is fine for development and benchmarks.
+    """
+
+    def __init__(self, path: str = ":memory:"):
+        self.path = path
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="sqlite")
+        self.connection = None
+
+    def connect(self):
+        connection = sqlite3.connect(self.path, check_same_thread=False, isolation_level=None)
+        connection.row_factory = sqlite3.Row
+        connection.execute("pragma foreign_keys = on")
+        if self.path != ":memory:":
+            connection.execute("pragma journal_mode = wal")
+        return connection
+
+    def call(self, fn, *args):
+        if self.connection is None:
+            self.connection = self.connect()
+        return fn(self.connection, *args)
+
+    async def run(self, target: str, operation: str, fn, *args):
+        loop = asyncio.get_running_loop()
+        return await metrics.track(target, operation, loop.run_in_executor(self.executor, partial(self.call, fn, *args)))
+
+    async def transaction(self, target: str, operation: str, fn, *args):
+        """Run fn(connection, *args) in a write transaction, as one call."""
+        def in_transaction(connection, *args):
+            connection.execute("begin immediate")
+            try:
+                result = fn(connection, *args)
+            except Exception:
+                connection.execute("rollback")
+                raise
+            connection.execute("commit")
+            return result
+
+        return await self.run(target, operation, in_transaction, *args)
+
+    @staticmethod
+    def adapt(args) -> tuple:
+        return tuple(SqliteStore.adapt_value(value) for value in args)
+
+    @staticmethod
+    def adapt_value(value):
+        # Timestamps are stored as UTC text in the format sqlite.sql's
+        # defaults write, so they compare correctly as strings.
+        if isinstance(value, datetime) and value.tzinfo is not None:
+            return value.astimezone(timezone.utc).strftime("%Y-%m-%dT%H:%M:%S.%f")[:-3] + "Z"
+        if isinstance(value, date):
+            return value.isoformat()
+        return value
+
+    @staticmethod
+    def rows(cursor) -> list:
+        return [{key: serialize(key, row[key]) for key in row.keys()} for row in cursor.fetchall()]
+
+    async def open(self):
+        await self.run("schema", "create", lambda connection: connection.executescript(SQLITE_SCHEMA.read_text()))
+
+    async def close(self):
+        if self.connection is not None:
+            await asyncio.get_running_loop().run_in_executor(self.executor, self.connection.close)
+            self.connection = None
+
+    async def fetch(self, target: str, operation: str, sql: str, *args) -> list:
+        return await self.run(target, operation, lambda connection: self.rows(connection.execute(sql, self.adapt(args))))
+
+    async def execute_count(self, target: str, operation: str, sql: str, *args) -> int:
+        return await self.run(target, operation, lambda connection: connection.execute(sql, self.adapt(args)).rowcount)
+
+    async def insert_rows(self, table: str, rows: list):
+        # SQLite has no gen_random_uuid() default.
+        if "id" in COLUMNS.get(table, ()):
+            rows = [{"id": str(uuid.uuid4()), **row} for row in rows]
+        return await super().insert_rows(table, rows)
+
+    # The rules below mirror supabase/functions/ (see utils/progress.py).
+
+    async def decrement_hearts(self, user_id: str):
+        def decrement(connection):
+            profile = connection.execute("select hearts, hearts_refilled_on, timezone from profiles where id = ?", (user_id,)).fetchone()
+            if profile is None:
+                return None
+
+            today = progress.local_today(profile["timezone"])
+            hearts = progress.effective_hearts(profile["hearts"], profile["hearts_refilled_on"], today)
+            if hearts <= 0:
+                return 0
+
+            connection.execute("update profiles set hearts = ?, hearts_refilled_on = ? where id = ?", (hearts - 1, today.isoformat(), user_id))
+            return hearts - 1
+
+        return await self.transaction("decrement_hearts", "rpc", decrement)
+
+    async def complete_lesson(self, user_id: str, lesson_id: str, accuracy, time_taken: int, mistakes: int):
+        def complete(connection):
+            profile = connection.execute(
+                "select xp, streak, last_lesson_date, timezone, progress_bitmap from profiles where id = ?", (user_id,)
+            ).fetchone()
+            if profile is None:
+                return None
+
+            today = progress.local_today(profile["timezone"])
+            xp_earned = progress.calculate_xp(mistakes)
+            new_streak = progress.next_streak(profile["streak"], profile["last_lesson_date"], today)
+            bitmap = progress.decode_bitmap(profile["progress_bitmap"])
+            lesson = connection.execute("select order_number from lessons where id = ?", (lesson_id,)).fetchone()
+            if lesson is not None:
+                bitmap = progress.set_bit(bitmap, lesson["order_number"])
+
+            connection.execute(
+                "update profiles set xp = xp + ?, streak = ?, last_lesson_date = ?, progress_bitmap = ? where id = ?",
+                (xp_earned, new_streak, today.isoformat(), bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little"), user_id)
+            )
+            connection.execute(
+                "insert into completed_lessons (id, user_id, lesson_id, accuracy, xp_earned, time_taken, mistakes) values (?, ?, ?, ?, ?, ?, ?)",
+                (str(uuid.uuid4()), user_id, lesson_id, accuracy, xp_earned, time_taken, mistakes)
+            )
+            return {"xp_earned": xp_earned, "new_streak": new_streak, "total_xp": profile["xp"] + xp_earned, "lesson_date": today.isoformat()}
+
+        return await self.transaction("complete_lesson", "rpc", complete)
+
+    async def claim_job(self, job: str, run_on: date, holder: str, ttl_seconds: int) -> bool:
+        def claim(connection):
+            now = datetime.now(timezone.utc)
+            connection.execute("insert into scheduled_jobs (job_name) values (?) on conflict (job_name) do nothing", (job,))
+            cursor = connection.execute(
+                "update scheduled_jobs set holder = ?, lease_expires_at = ? "
+                "where job_name = ? and (last_run_on is null or last_run_on < ?) "
+                "and (lease_expires_at is null or lease_expires_at < ? or holder = ?)",
+                (holder, (now + timedelta(seconds=ttl_seconds)).isoformat(), job, run_on.isoformat(), now.isoformat(), holder)
+            )
+            return cursor.rowcount == 1
+
+        return await self.transaction("claim_job", "rpc", claim)
+
+    async def finish_job(self, job: str, run_on: date, holder: str, completed: bool = True):
+        def finish(connection):
+            connection.execute(
+                "update scheduled_jobs set "
+                "last_run_on = case when ? then max(coalesce(last_run_on, ?), ?) else last_run_on end, "
+                "holder = null, lease_expires_at = null "
+                "where job_name = ? and holder = ?",
+                (completed, run_on.isoformat(), run_on.isoformat(), job, holder)
+            )
+
+        await self.transaction("finish_job", "rpc", finish)
@@ -0,0 +1,84 @@
+-- SQLite version of supabase/migrations/, created by SqliteStore.open().
+-- Column types follow what PostgREST returns: uuids, dates and timestamps
+-- are ISO text, bytea is a blob. The rules in supabase/functions/ are
+-- implemented in Python by SqliteStore.
+
+create table if not exists lessons (
+    id text primary key,
+    title text not null,
+    description text,
+    order_number integer not null,
+    created_at text default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+
+create unique index if not exists idx_lessons_order_number on lessons(order_number);
+
+create table if not exists questions (
+    id text primary key,
+    lesson_id text references lessons(id) on delete cascade not null,
+    question_text text not null,
+    question_order integer not null,
+    created_at text default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+
+create index if not exists idx_questions_lesson_order on questions(lesson_id, question_order);
+
+create table if not exists options (
+    id text primary key,
+    question_id text references questions(id) on delete cascade not null,
+    option_text text not null,
+    is_correct boolean not null default false,
+    option_order integer not null
+);
+
+create index if not exists idx_options_question_order on options(question_id, option_order);
+
+create table if not exists profiles (
+    id text primary key,
+    username text unique not null,
+    handicap integer not null,
+    xp integer not null default 0,
+    streak integer not null default 0,
+    hearts integer not null default 5,
+    hearts_refilled_on text not null default (date('now')),
+    last_lesson_date text,
+    timezone text not null default 'UTC',
+    streak_freezes_used integer not null default 0,
+    progress_bitmap blob not null default x'',
+    created_at text default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    updated_at text default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now'))
+);
+
+create index if not exists idx_profiles_leaderboard on profiles(xp desc, id, username, streak, handicap, last_lesson_date, timezone);
+create index if not exists idx_profiles_active_streak_tz on profiles(timezone, last_lesson_date) where streak <> 0;
+create index if not exists idx_profiles_updated_at on profiles(updated_at);
+
+-- profiles_set_updated_at in supabase/migrations/0003_profile_updated_at.sql.
+-- The update inside does not fire the trigger again (recursive_triggers is off).
+create trigger if not exists profiles_set_updated_at
+after update on profiles
+for each row
+begin
+    update profiles set updated_at = strftime('%Y-%m-%dT%H:%M:%fZ', 'now') where id = new.id;
+end;
+
+create table if not exists completed_lessons (
+    id text primary key,
+    user_id text not null,
+    lesson_id text references lessons(id) on delete cascade not null,
+    accuracy real not null,
+    xp_earned integer not null,
+    time_taken integer not null, -- in seconds
+    mistakes integer not null default 0,
+    completed_at text default (strftime('%Y-%m-%dT%H:%M:%fZ', 'now')),
+    unique(user_id, lesson_id, completed_at)
+);
+
+create index if not exists idx_completed_lessons_user_lesson on completed_lessons(user_id, lesson_id);
+
+create table if not exists scheduled_jobs (
+    job_name text primary key,
+    last_run_on text,
+    holder text,
+    lease_expires_at text
+);
@@ -0,0 +1,105 @@
+"""
+Storage interface.
+
+The operations routes and jobs need from the database, independent of how
+it is reached. Rows are returned the way PostgREST serialises them (ids and
+dates as strings, bytea as a "\\x..." hex string) whatever the backend, so
+callers never see a difference. repository.py picks the implementation:
+
+- SupabaseStore (supabaseStore.py): PostgREST through the supabase client.
+- SqliteStore / PostgresStore (sqlStore.py): direct SQL, for single-node
+  deployments where the API and database share a box.
+
+Store is an abstract base class, so a backend missing an operation fails
+when it is created rather than on the first request that needs it.
+"""
+from abc import ABC, abstractmethod
+
+
+class Store(ABC):
+    async def open(self):
+        """Prepare connections (and, for direct SQL, the schema)."""
+
+    async def close(self):
+        pass
+
+    # --- profiles ---
+
+    @abstractmethod
+    async def get_profile(self, user_id: str, columns: str = "*"):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def username_exists(self, username: str) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def insert_profile(self, profile_data: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def update_profile(self, user_id: str, changes: dict):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def decrement_hearts(self, user_id: str):
+        """Atomically take one heart; returns the new count, or None if there is no profile."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def count_profiles(self, method: str = "exact") -> int:
+        """Row count of profiles; method is "exact", or "planned" for the planner's estimate."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_leaderboard(self, offset: int, limit: int, columns: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_leaderboard_after(self, xp: int, user_id: str, limit: int, columns: str):
+        """Keyset page: the rows ranked directly below (xp, user_id)."""
+        raise NotImplementedError
+
+    # --- lessons ---
+
+    @abstractmethod
+    async def get_lessons(self, columns: str):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_lesson_content(self, lesson_id: str):
+        """Lesson with its questions and their options, in order."""
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_answer_key(self):
+        """Every lesson's question ids and options, for building the answer key."""
+        raise NotImplementedError
+
+    # --- completed lessons ---
+
+    @abstractmethod
+    async def complete_lesson(self, user_id: str, lesson_id: str, accuracy, time_taken: int, mistakes: int):
+        """Record a completion and apply its XP/streak changes in one transaction.
+
+        Returns {"xp_earned", "new_streak", "total_xp", "lesson_date"}, or None if there is no profile.
+        """
+        raise NotImplementedError
+
+    # --- maintenance ---
+
+    @abstractmethod
+    async def reset_stale_streaks(self, before, timezone: str, after_id: str = None, through_id: str = None) -> int:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_page(self, table: str, columns: str, after_id: str = None, limit: int = 1000, filters=()):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def claim_job(self, job: str, run_on, holder: str, ttl_seconds: int) -> bool:
+        raise NotImplementedError
+
+    @abstractmethod
+    async def finish_job(self, job: str, run_on, holder: str, completed: bool = True):
+        raise NotImplementedError
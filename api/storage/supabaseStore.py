@@ -0,0 +1,156 @@
+"""
+Storage through PostgREST with the supabase client.
+
+Queries are built here and run by the execute function passed in
+(repository.execute), which offloads the synchronous client to a thread
+pool and records each call's latency.
+
+PostgREST cuts any select off at its max-rows setting (1000 on Supabase)
+without an error. Reads that need a whole table go through select_all.
+"""
+from datetime import date
+
+from storage.store import Store
+
+
+class SupabaseStore(Store):
+    def __init__(self, client, execute):
+        self.client = client
+        self.execute = execute
+
+    async def select_all(self, table: str, columns: str, key: str):
+        """Every row of table in key order, however many max-rows allows per request.
+
+        The first request also asks for the total, so a table under the cap
+        takes one round trip; the rest are keyset pages after the last key.
+        """
+        response = await self.execute(self.client.table(table).select(columns, count="exact").order(key))
+        rows = response.data or []
+        total = response.count if response.count is not None else len(rows)
+        while rows and len(rows) < total:
+            response = await self.execute(self.client.table(table).select(columns).order(key).gt(key, rows[-1][key]))
+            if not response.data:
+                break
+            rows.extend(response.data)
+        return rows
+
+    # --- profiles ---
+
+    async def get_profile(self, user_id: str, columns: str = "*"):
+        response = await self.execute(self.client.table("profiles").select(columns).eq("id", user_id).single())
+        return response.data
+
+    async def username_exists(self, username: str) -> bool:
+        response = await self.execute(self.client.table("profiles").select("username").eq("username", username))
+        return len(response.data) > 0
+
+    async def insert_profile(self, profile_data: dict):
+        response = await self.execute(self.client.table("profiles").insert(profile_data))
+        return response.data
+
+    async def update_profile(self, user_id: str, changes: dict):
+        response = await self.execute(self.client.table("profiles").update(changes).eq("id", user_id))
+        return response.data
+
+    async def decrement_hearts(self, user_id: str):
+        response = await self.execute(self.client.rpc("decrement_hearts", {"p_user_id": user_id}))
+        return response.data
+
+    async def count_profiles(self, method: str = "exact") -> int:
+        response = await self.execute(self.client.table("profiles").select("id", count=method, head=True))
+        return response.count if response.count else 0
+
+    async def get_leaderboard(self, offset: int, limit: int, columns: str):
+        response = await self.execute(
+            self.client.table("profiles").select(columns).order("xp", desc=True).order("id").range(offset, offset + limit - 1)
+        )
+        return response.data if response.data else []
+
+    async def get_leaderboard_after(self, xp: int, user_id: str, limit: int, columns: str):
+        # Equivalent to 'xp < ? or (xp = ? and id > ?)'; the extra 'xp <= ?'
+        # lets Postgres seek into idx_profiles_leaderboard instead of scanning from the top.
+        response = await self.execute(
+            self.client.table("profiles")
+            .select(columns)
+            .lte("xp", xp)
+            .or_(f"xp.lt.{xp},id.gt.{user_id}")
+            .order("xp", desc=True)
+            .order("id")
+            .limit(limit)
+        )
+        return response.data if response.data else []
+
+    # --- lessons ---
+
+    async def get_lessons(self, columns: str):
+        return await self.select_all("lessons", columns, "order_number")
+
+    async def get_lesson_content(self, lesson_id: str):
+        response = await self.execute(
+            self.client.table("lessons")
+            .select("*, questions(*, options(*))")
+            .eq("id", lesson_id)
+            .order("question_order", foreign_table="questions")
+            .order("option_order", foreign_table="questions.options")
+            .single()
+        )
+        return response.data
+
+    async def get_answer_key(self):
+        return await self.select_all("lessons", "id, questions(id, options(*))", "id")
+
+    # --- completed lessons ---
+
+    async def complete_lesson(self, user_id: str, lesson_id: str, accuracy, time_taken: int, mistakes: int):
+        response = await self.execute(self.client.rpc("complete_lesson", {
+            "p_user_id": user_id,
+            "p_lesson_id": lesson_id,
+            "p_accuracy": accuracy,
+            "p_time_taken": time_taken,
+            "p_mistakes": mistakes
+        }))
+        return response.data[0] if response.data else None
+
+    # --- maintenance ---
+
+    async def reset_stale_streaks(self, before: date, timezone: str, after_id: str = None, through_id: str = None) -> int:
+        query = (
+            self.client.table("profiles")
+            .update({"streak": 0}, count="exact", returning="minimal")
+            .eq("timezone", timezone)
+            .lt("last_lesson_date", before.isoformat())
+            .neq("streak", 0)
+        )
+        if after_id:
+            query = query.gt("id", after_id)
+        if through_id:
+            query = query.lte("id", through_id)
+        response = await self.execute(query)
+        return response.count if response.count else 0
+
+    async def get_page(self, table: str, columns: str, after_id: str = None, limit: int = 1000, filters=()):
+        query = self.client.table(table).select(columns)
+        for operator, column, value in filters:
+            query = getattr(query, operator)(column, value)
+        query = query.order("id").limit(limit)
+        if after_id:
+            query = query.gt("id", after_id)
+        response = await self.execute(query)
+        return response.data if response.data else []
+
+    async def claim_job(self, job: str, run_on: date, holder: str, ttl_seconds: int) -> bool:
+        response = await self.execute(self.client.rpc("claim_job", {
+            "p_job": job,
+            "p_run_on": run_on.isoformat(),
+            "p_holder": holder,
+            "p_ttl_seconds": ttl_seconds
+        }))
+        return bool(response.data)
+
+    async def finish_job(self, job: str, run_on: date, holder: str, completed: bool = True):
+        await self.execute(self.client.rpc("finish_job", {
+            "p_job": job,
+            "p_run_on": run_on.isoformat(),
+            "p_holder": holder,
+            "p_completed": completed
+        }))
@@ -0,0 +1,49 @@
+-- Records a completed lesson and applies its XP and streak changes atomically.
+-- Mirrors calculate_xp and next_streak in api/utils/progress.py. Days are
+-- counted in the user's time zone (profiles.timezone).
+-- Returns no rows if the profile doesn't exist.
+create or replace function complete_lesson(
+    p_user_id uuid,
+    p_lesson_id uuid,
+    p_accuracy numeric,
+    p_time_taken integer,
+    p_mistakes integer,
+    p_today date default null
+)
+returns table (xp_earned integer, new_streak integer, total_xp integer, lesson_date date)
+language plpgsql
+as $$
+declare
+    v_today date;
+    v_xp_earned integer := greatest(0, 100 - p_mistakes * 5);
+    v_order_number integer;
+begin
+    select coalesce(p_today, (now() at time zone timezone)::date) into v_today from profiles where id = p_user_id;
+
+    select order_number into v_order_number from lessons where id = p_lesson_id;
+
+    update profiles p
+    set xp = p.xp + v_xp_earned,
+        streak = case
+            when p.last_lesson_date is null then 1
+            when v_today - p.last_lesson_date = 1 then p.streak + 1
+            when v_today - p.last_lesson_date > 1 then 1
+            else p.streak
+        end,
+        last_lesson_date = v_today,
+        progress_bitmap = set_progress_bit(p.progress_bitmap, v_order_number)
+    where p.id = p_user_id
+    returning p.streak, p.xp into new_streak, total_xp;
+
+    if not found then
+        return;
+    end if;
+
+    insert into completed_lessons (user_id, lesson_id, accuracy, xp_earned, time_taken, mistakes)
+    values (p_user_id, p_lesson_id, p_accuracy, v_xp_earned, p_time_taken, p_mistakes);
+
+    xp_earned := v_xp_earned;
+    lesson_date := v_today;
+    return next;
+end;
+$$;
\ No newline at end of file
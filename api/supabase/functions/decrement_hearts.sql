@@ -0,0 +1,32 @@
+-- Takes one heart from a profile in a single statement.
+-- Hearts refill lazily: if hearts_refilled_on is before today (in the
+-- user's time zone) the profile starts from a full set of 5, and the refill
+-- is written back here.
+-- Returns the new heart count, 0 if the profile had none left,
+-- or null if the profile doesn't exist.
+create or replace function decrement_hearts(p_user_id uuid, p_today date default null)
+returns integer
+language plpgsql
+as $$
+declare
+    v_today date;
+    new_hearts integer;
+begin
+    select coalesce(p_today, (now() at time zone timezone)::date) into v_today from profiles where id = p_user_id;
+
+    update profiles
+    set hearts = case when hearts_refilled_on < v_today then 5 else hearts end - 1,
+        hearts_refilled_on = v_today
+    where id = p_user_id and (hearts > 0 or hearts_refilled_on < v_today)
+    returning hearts into new_hearts;
+
+    if not found then
+        select case when hearts_refilled_on < v_today then 5 else hearts end
+        into new_hearts
+        from profiles
+        where id = p_user_id;
+    end if;
+
+    return new_hearts;
+end;
+$$;
\ No newline at end of file
@@ -0,0 +1,58 @@
+-- profiles.progress_bitmap has bit n set when the lesson with order_number n
+-- has been completed. Bit n lives in byte n / 8 at position n % 8, which is
+-- what set_bit/get_bit use and what int.from_bytes(..., "little") reads.
+
+create or replace function set_progress_bit(p_bitmap bytea, p_bit integer)
+returns bytea
+language sql
+immutable
+as $$
+    select case
+        when p_bit is null then p_bitmap
+        else set_bit(
+            p_bitmap || decode(repeat('00', greatest(0, p_bit / 8 + 1 - length(p_bitmap))), 'hex'),
+            p_bit,
+            1
+        )
+    end;
+$$;
+
+create or replace function progress_bitmap_from(p_order_numbers integer[])
+returns bytea
+language plpgsql
+immutable
+as $$
+declare
+    v_bitmap bytea := ''::bytea;
+    v_bit integer;
+begin
+    foreach v_bit in array coalesce(p_order_numbers, '{}') loop
+        v_bitmap := set_progress_bit(v_bitmap, v_bit);
+    end loop;
+    return v_bitmap;
+end;
+$$;
+
+-- Rebuilds bitmaps from completed_lessons, for one user or for everyone when
+-- p_user_id is null (the one-off backfill is migration 0004). Returns rows
+-- updated.
+create or replace function rebuild_progress_bitmap(p_user_id uuid default null)
+returns integer
+language plpgsql
+as $$
+declare
+    v_updated integer;
+begin
+    update profiles p
+    set progress_bitmap = progress_bitmap_from(array(
+        select distinct l.order_number
+        from completed_lessons c
+        join lessons l on l.id = c.lesson_id
+        where c.user_id = p.id
+    ))
+    where p_user_id is null or p.id = p_user_id;
+
+    get diagnostics v_updated = row_count;
+    return v_updated;
+end;
+$$;
\ No newline at end of file
@@ -0,0 +1,44 @@
+-- Leader election for scheduled jobs across API workers.
+-- PostgREST requests don't share a session, so a session advisory lock
+-- can't be held for the length of a job. Instead a transaction advisory
+-- lock serialises claims and the lease row records who holds the job and
+-- until when. A crashed holder's lease simply expires.
+
+-- Claims p_job for p_run_on. True if the caller should run it: the job
+-- hasn't completed for that day and nobody else holds a live lease.
+create or replace function claim_job(p_job text, p_run_on date, p_holder text, p_ttl_seconds integer)
+returns boolean
+language plpgsql
+as $$
+declare
+    v_claimed boolean;
+begin
+    perform pg_advisory_xact_lock(hashtext('scheduled_jobs:' || p_job));
+
+    insert into scheduled_jobs (job_name)
+    values (p_job)
+    on conflict (job_name) do nothing;
+
+    update scheduled_jobs
+    set holder = p_holder,
+        lease_expires_at = now() + make_interval(secs => p_ttl_seconds)
+    where job_name = p_job
+      and (last_run_on is null or last_run_on < p_run_on)
+      and (lease_expires_at is null or lease_expires_at < now() or holder = p_holder)
+    returning true into v_claimed;
+
+    return coalesce(v_claimed, false);
+end;
+$$;
+
+-- Releases the lease. With p_completed the watermark moves to p_run_on.
+create or replace function finish_job(p_job text, p_run_on date, p_holder text, p_completed boolean default true)
+returns void
+language sql
+as $$
+    update scheduled_jobs
+    set last_run_on = case when p_completed then greatest(coalesce(last_run_on, p_run_on), p_run_on) else last_run_on end,
+        holder = null,
+        lease_expires_at = null
+    where job_name = p_job and holder = p_holder;
+$$;
\ No newline at end of file
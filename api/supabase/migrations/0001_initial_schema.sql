@@ -0,0 +1,86 @@
+-- Initial schema: every table the API uses, with the columns and indexes
+-- they have grown so far. Written with "if not exists" so it also applies
+-- cleanly to databases created from the old per-table files.
+
+create table if not exists lessons (
+    id uuid primary key default gen_random_uuid(),
+    title text not null,
+    description text,
+    order_number integer not null,
+    created_at timestamp with time zone default now()
+);
+
+create unique index if not exists idx_lessons_order_number on lessons(order_number);
+
+create table if not exists questions (
+    id uuid primary key default gen_random_uuid(),
+    lesson_id uuid references lessons(id) on delete cascade not null,
+    question_text text not null,
+    question_order integer not null,
+    created_at timestamp with time zone default now()
+);
+
+create index if not exists idx_questions_lesson_id on questions(lesson_id);
+
+create table if not exists options (
+    id uuid primary key default gen_random_uuid(),
+    question_id uuid references questions(id) on delete cascade not null,
+    option_text text not null,
+    is_correct boolean not null default false,
+    option_order integer not null
+);
+
+create index if not exists idx_options_question_id on options(question_id);
+
+create table if not exists answers (
+    id uuid primary key default gen_random_uuid(),
+    answer_text text not null,
+    is_correct boolean not null,
+    question_id uuid references questions(id) on delete cascade
+);
+
+create table if not exists profiles (
+    id uuid primary key references auth.users(id) on delete cascade,
+    username text unique not null,
+    handicap integer not null,
+    xp integer not null default 0,
+    streak integer not null default 0,
+    hearts integer not null default 5,
+    hearts_refilled_on date not null default (now() at time zone 'utc')::date, -- hearts are full on any later day
+    last_lesson_date date,
+    timezone text not null default 'UTC', -- IANA name; defines the user's day for streaks and hearts
+    streak_freezes_used integer not null default 0,
+    progress_bitmap bytea not null default ''::bytea, -- bit n set = lesson with order_number n completed
+    created_at timestamp with time zone default now(),
+    updated_at timestamp with time zone default now()
+);
+
+alter table profiles add column if not exists progress_bitmap bytea not null default ''::bytea;
+alter table profiles add column if not exists hearts_refilled_on date not null default (now() at time zone 'utc')::date;
+alter table profiles add column if not exists timezone text not null default 'UTC';
+
+create index if not exists idx_profiles_username on profiles(username);
+create index if not exists idx_profiles_xp_id on profiles(xp desc, id);
+create index if not exists idx_profiles_active_streak_tz on profiles(timezone, last_lesson_date) where streak <> 0;
+
+create table if not exists completed_lessons (
+    id uuid primary key default gen_random_uuid(),
+    user_id uuid references auth.users(id) on delete cascade not null,
+    lesson_id uuid references lessons(id) on delete cascade not null,
+    accuracy numeric(5,2) not null,
+    xp_earned integer not null,
+    time_taken integer not null, -- in seconds
+    mistakes integer not null default 0,
+    completed_at timestamp with time zone default now(),
+    unique(user_id, lesson_id, completed_at)
+);
+
+create index if not exists idx_completed_lessons_user_id on completed_lessons(user_id);
+create index if not exists idx_completed_lessons_completed_at on completed_lessons(completed_at);
+
+create table if not exists scheduled_jobs (
+    job_name text primary key,
+    last_run_on date, -- watermark: the last day the job completed for
+    holder text, -- worker currently running the job
+    lease_expires_at timestamp with time zone
+);
@@ -0,0 +1,28 @@
+-- Indexes matched to the queries the API actually runs. test_indexes.py
+-- checks each query shape with EXPLAIN.
+
+-- A lesson's questions in order: where lesson_id = ? order by question_order.
+create index if not exists idx_questions_lesson_order on questions(lesson_id, question_order);
+drop index if exists idx_questions_lesson_id;
+
+-- A question's options in order: where question_id = ? order by option_order.
+create index if not exists idx_options_question_order on options(question_id, option_order);
+drop index if exists idx_options_question_id;
+
+-- A user's completions, and the distinct lessons among them (rebuild_progress_bitmap).
+create index if not exists idx_completed_lessons_user_lesson on completed_lessons(user_id, lesson_id);
+drop index if exists idx_completed_lessons_user_id;
+
+-- Nothing filters or sorts completions by time, so this only slowed inserts.
+drop index if exists idx_completed_lessons_completed_at;
+
+-- Leaderboard pages walk (xp desc, id) and read the shown columns from the
+-- index itself, so a page is an index-only scan.
+create index if not exists idx_profiles_leaderboard on profiles(xp desc, id) include (username, streak, handicap, last_lesson_date, timezone);
+drop index if exists idx_profiles_xp_id;
+drop index if exists idx_profiles_xp;
+
+-- Usernames are unique. Lookups use the unique index behind that
+-- constraint; the plain index on the same column duplicated it.
+create unique index if not exists profiles_username_key on profiles(username);
+drop index if exists idx_profiles_username;
@@ -0,0 +1,18 @@
+-- profiles.updated_at had only an insert default. Keep it current on every
+-- update (including the ones inside complete_lesson and decrement_hearts),
+-- since the dashboard serves it as Last-Modified.
+
+create or replace function set_updated_at()
+returns trigger
+language plpgsql
+as $$
+begin
+    new.updated_at := now();
+    return new;
+end;
+$$;
+
+drop trigger if exists profiles_set_updated_at on profiles;
+create trigger profiles_set_updated_at
+before update on profiles
+for each row execute function set_updated_at();
@@ -0,0 +1,27 @@
+-- 0001 added profiles.progress_bitmap to existing databases as an empty
+-- bitmap. Fill it from completed_lessons for every profile that has
+-- completions but no bits yet. Functions are created after migrations, so
+-- this builds the bytes inline: byte k holds order_numbers 8k..8k+7, bit
+-- n % 8 within it, the layout set_progress_bit produces.
+
+with done as (
+    select distinct c.user_id, l.order_number
+    from completed_lessons c
+    join lessons l on l.id = c.lesson_id
+),
+bytes as (
+    select u.user_id, k.byte, coalesce(sum(1 << (d.order_number % 8)), 0)::integer as value
+    from (select user_id, max(order_number) / 8 as last_byte from done group by user_id) u
+    cross join lateral generate_series(0, u.last_byte) as k(byte)
+    left join done d on d.user_id = u.user_id and d.order_number / 8 = k.byte
+    group by u.user_id, k.byte
+),
+bitmaps as (
+    select user_id, decode(string_agg(lpad(to_hex(value), 2, '0'), '' order by byte), 'hex') as bitmap
+    from bytes
+    group by user_id
+)
+update profiles p
+set progress_bitmap = b.bitmap
+from bitmaps b
+where b.user_id = p.id and p.progress_bitmap = ''::bytea;
@@ -0,0 +1,3 @@
+-- The leaderboard refresh reads the profiles updated since its last read:
+-- where updated_at > ? order by id, a handful of rows out of the table.
+create index if not exists idx_profiles_updated_at on profiles(updated_at);
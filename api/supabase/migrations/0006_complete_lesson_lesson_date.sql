@@ -0,0 +1,16 @@
+-- complete_lesson gained a lesson_date result column. create or replace
+-- can't change a function's return type, so a database still holding the
+-- old function drops it here, once; supabase/functions/complete_lesson.sql
+-- creates the new one right after the migrations.
+
+do $$
+declare
+    v_function regprocedure := to_regprocedure('complete_lesson(uuid, uuid, numeric, integer, integer, date)');
+begin
+    if v_function is not null and not exists (
+        select 1 from pg_proc where oid = v_function and 'lesson_date' = any(proargnames)
+    ) then
+        execute 'drop function ' || v_function::text;
+    end if;
+end;
+$$;
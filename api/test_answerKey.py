@@ -0,0 +1,95 @@
+import asyncio
+
+import repository
+from fakeSupabase import FakeClient
+from storage.supabaseStore import SupabaseStore
+from utils import answerKey, lessonCache
+
+
+LESSONS = [
+    {"id": "lesson-1", "questions": [
+        {"id": "q-1", "options": [
+            {"id": "o-1", "question_id": "q-1", "option_text": "A: Ball", "is_correct": True, "option_order": 1},
+            {"id": "o-2", "question_id": "q-1", "option_text": "B: Tee", "is_correct": False, "option_order": 2}
+        ]}
+    ]},
+    {"id": "lesson-2", "questions": [
+        {"id": "q-2", "options": [
+            {"id": "o-3", "question_id": "q-2", "option_text": "A: Flag", "is_correct": True, "option_order": 1}
+        ]}
+    ]}
+]
+
+
+def test_grading_is_a_lookup(monkeypatch):
+    calls = []
+
+    async def get_answer_key():
+        calls.append(1)
+        return LESSONS
+
+    monkeypatch.setattr(repository, "get_answer_key", get_answer_key)
+
+    async def scenario():
+        await answerKey.load()
+        return [await answerKey.lookup(option_id) for option_id in ("o-1", "o-2", "o-3")]
+
+    right, wrong, other = asyncio.run(scenario())
+    assert calls == [1]
+    assert right.is_correct and not wrong.is_correct
+    assert (other.question_id, other.lesson_id) == ("q-2", "lesson-2")
+    assert answerKey.correct_option("q-1")["id"] == "o-1"
+
+
+def test_content_version_change_rebuilds(monkeypatch):
+    calls = []
+
+    async def get_answer_key():
+        calls.append(1)
+        return LESSONS
+
+    monkeypatch.setattr(repository, "get_answer_key", get_answer_key)
+
+    async def scenario():
+        await answerKey.load()
+        lessonCache.invalidate()
+        return await answerKey.lookup("o-1")
+
+    assert asyncio.run(scenario()).is_correct
+    assert calls == [1, 1]
+    assert answerKey.version == lessonCache.content_version
+
+
+def test_concurrent_misses_reload_once(monkeypatch):
+    calls = []
+
+    async def get_answer_key():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return LESSONS
+
+    monkeypatch.setattr(repository, "get_answer_key", get_answer_key)
+    monkeypatch.setattr(answerKey, "lock", asyncio.Lock())
+
+    async def scenario():
+        await answerKey.load()
+        # Make the key old enough for a miss to force a reload.
+        answerKey.loaded_at -= answerKey.RELOAD_ON_MISS_SECONDS + 1
+        return await asyncio.gather(*(answerKey.lookup("bogus") for _ in range(20)))
+
+    assert asyncio.run(scenario()) == [None] * 20
+    assert calls == [1, 1]
+
+
+def test_key_covers_lessons_past_the_row_cap(monkeypatch):
+    fake = FakeClient(max_rows=1)
+    for lesson in LESSONS:
+        fake.table("lessons").insert({"id": lesson["id"], "title": lesson["id"], "order_number": int(lesson["id"][-1])}).execute()
+        for question in lesson["questions"]:
+            fake.table("questions").insert({"id": question["id"], "lesson_id": lesson["id"], "question_text": "?", "question_order": 1}).execute()
+            fake.table("options").insert(question["options"]).execute()
+    monkeypatch.setattr(repository, "store", SupabaseStore(fake, repository.execute))
+
+    asyncio.run(answerKey.load())
+    assert sorted(answerKey.options) == ["o-1", "o-2", "o-3"]
+    assert answerKey.options["o-3"].lesson_id == "lesson-2"
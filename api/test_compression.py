@@ -0,0 +1,109 @@
+import gzip
+
+import pytest
+from fastapi import FastAPI, Response
+from fastapi.testclient import TestClient
+
+from utils import compression, lessonCache
+
+
+LARGE = {"rows": [{"username": f"golfer{i}", "xp": i * 10} for i in range(200)]}
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(compression.CompressionMiddleware, minimum_size=500)
+
+    @app.get("/large")
+    async def large():
+        return LARGE
+
+    @app.get("/small")
+    async def small():
+        return {"ok": True}
+
+    @app.get("/encoded")
+    async def encoded():
+        return Response(gzip.compress(b"{}" * 1000), media_type="application/json", headers={"Content-Encoding": "gzip"})
+
+    @app.get("/image")
+    async def image():
+        return Response(b"\x89PNG" * 1000, media_type="image/png")
+
+    return app
+
+
+def test_negotiate_prefers_highest_weight():
+    assert compression.negotiate("gzip") == "gzip"
+    assert compression.negotiate("deflate, gzip;q=0.5") == "gzip"
+    assert compression.negotiate("*") == compression.ENCODINGS[0]
+    assert compression.negotiate("gzip;q=0, *;q=0.1") == ("br" if compression.brotli else None)
+    assert compression.negotiate("identity") is None
+    assert compression.negotiate("") is None
+    assert compression.negotiate(None) is None
+
+
+def test_large_json_compressed_when_accepted():
+    client = TestClient(make_app())
+
+    response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["vary"]
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == LARGE
+
+    plain = client.get("/large", headers={"Accept-Encoding": "identity"})
+    assert "content-encoding" not in plain.headers
+    assert plain.json() == LARGE
+
+
+def test_small_and_binary_responses_sent_as_is():
+    client = TestClient(make_app())
+
+    small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in small.headers
+    assert small.headers["vary"] == "Accept-Encoding"
+
+    image = client.get("/image", headers={"Accept-Encoding": "gzip"})
+    assert "content-encoding" not in image.headers
+
+
+def test_encoded_responses_pass_through():
+    response = TestClient(make_app()).get("/encoded", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.content == b"{}" * 1000
+
+
+def test_lesson_compressed_once_per_encoding_and_hearts(monkeypatch):
+    calls = []
+    compress = compression.compress
+
+    def counting_compress(body, encoding, level=None):
+        calls.append((encoding, level))
+        return compress(body, encoding, level)
+
+    monkeypatch.setattr(compression, "compress", counting_compress)
+    cached = lessonCache.CachedLesson(1, {"id": "lesson-1", "questions": [{"id": "q-1", "question_text": "Which?" * 100}]})
+
+    first = cached.compressed_body(5, "gzip")
+    assert cached.compressed_body(5, "gzip") is first
+    assert gzip.decompress(first) == cached.response_body(5)
+
+    cached.compressed_body(4, "gzip")
+    assert calls == [("gzip", compression.CACHED_LEVELS["gzip"])] * 2
+
+
+def test_brotli_preferred_and_cached():
+    brotli = pytest.importorskip("brotli")
+    assert compression.negotiate("gzip, deflate, br") == "br"
+    assert compression.negotiate("br;q=0.5, gzip") == "gzip"
+
+    response = TestClient(make_app()).get("/large", headers={"Accept-Encoding": "gzip, br"})
+    assert response.headers["content-encoding"] == "br"
+    assert int(response.headers["content-length"]) < len(response.content)
+    assert response.json() == LARGE
+
+    cached = lessonCache.CachedLesson(1, {"id": "lesson-1", "questions": [{"id": "q-1", "question_text": "Which?" * 100}]})
+    body = cached.compressed_body(5, "br")
+    assert brotli.decompress(body) == cached.response_body(5)
+    assert cached.compressed_body(5, "br") is body
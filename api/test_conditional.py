@@ -0,0 +1,110 @@
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import repository
+from storage.supabaseStore import SupabaseStore
+from test_fakeSupabase import seeded_client
+from utils import answerKey, conditional, leaderboard, lessonCache, queryLog
+
+
+def test_etag_matching_is_weak():
+    assert conditional.etag_matches('"abc"', '"abc"')
+    assert conditional.etag_matches('W/"abc"', '"abc"')
+    assert conditional.etag_matches('"x", W/"abc"', 'W/"abc"')
+    assert conditional.etag_matches("*", '"abc"')
+    assert not conditional.etag_matches('"abd"', '"abc"')
+    assert not conditional.etag_matches(None, '"abc"')
+
+
+def test_not_modified_since_ignores_sub_second_and_bad_dates():
+    modified = datetime(2024, 3, 1, 10, 0, 0, 500_000, tzinfo=timezone.utc)
+    header = conditional.http_date(modified)
+    assert header == "Fri, 01 Mar 2024 10:00:00 GMT"
+    assert conditional.not_modified_since(header, modified)
+    assert not conditional.not_modified_since(header, modified + timedelta(seconds=1))
+    assert not conditional.not_modified_since("yesterday", modified)
+    assert not conditional.is_settled(datetime.now(timezone.utc))
+
+
+@pytest.fixture
+def fake(monkeypatch):
+    fake = seeded_client()
+    monkeypatch.setattr(repository, "supabase", fake)
+    monkeypatch.setattr(repository, "store", SupabaseStore(fake, repository.execute))
+    monkeypatch.setattr(queryLog, "enforce", True)
+    monkeypatch.setattr(answerKey, "version", None)
+    for name in ("entries", "ranking", "loaded", "generation", "changed_at"):
+        monkeypatch.setattr(leaderboard, name, getattr(leaderboard, name))
+    lessonCache.invalidate()
+    return fake
+
+
+def signed_in(fake) -> TestClient:
+    client = TestClient(main.app)
+    client.post("/v1/signup", json={"email": "etag@example.com", "password": "Password123!", "username": "etag", "handicap": 8})
+    signin = client.post("/v1/signin", json={"email": "etag@example.com", "password": "Password123!"})
+    client.headers["Authorization"] = f"Bearer {signin.json()['session']['access_token']}"
+    asyncio.run(leaderboard.load())
+    return client
+
+
+def test_lesson_etag_follows_hearts(fake):
+    client = signed_in(fake)
+
+    first = client.get("/v1/lessons/l1")
+    etag = first.headers["etag"]
+    assert not etag.startswith("W/")
+
+    again = client.get("/v1/lessons/l1", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert again.content == b""
+
+    client.post("/v1/lessons/l1/questions/q1/answer", json={"selected_option_id": "o2"})
+    after = client.get("/v1/lessons/l1", headers={"If-None-Match": etag})
+    assert after.status_code == 200
+    assert after.json()["hearts"] == 4
+    assert after.headers["etag"] != etag
+
+
+def test_leaderboard_304_without_database_work(fake):
+    client = signed_in(fake)
+
+    first = client.get("/v1/leaderboard")
+    etag = first.headers["etag"]
+    assert etag.startswith("W/")
+
+    again = client.get("/v1/leaderboard", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+    assert 'desc="0 queries"' in again.headers["server-timing"]
+
+    user_id = next(iter(leaderboard.entries))
+    leaderboard.update(user_id, xp=500)
+    assert client.get("/v1/leaderboard", headers={"If-None-Match": etag}).status_code == 200
+
+    exact = client.get("/v1/leaderboard", params={"count": "exact"})
+    assert "etag" not in exact.headers
+
+
+def test_dashboard_last_modified(fake):
+    client = signed_in(fake)
+    profile = fake.tables["profiles"][0]
+    past = time.time() - 60
+
+    assert client.get("/v1/dashboard").status_code == 200
+    profile["updated_at"] = datetime.fromtimestamp(past, timezone.utc).isoformat()
+    lessonCache.lesson_catalog.loaded_at = past
+    leaderboard.changed_at = past
+
+    first = client.get("/v1/dashboard")
+    last_modified = first.headers["last-modified"]
+    assert client.get("/v1/dashboard", headers={"If-Modified-Since": last_modified}).status_code == 304
+
+    client.post("/v1/lessons/l1/questions/q1/answer", json={"selected_option_id": "o2"})
+    changed = client.get("/v1/dashboard", headers={"If-Modified-Since": last_modified})
+    assert changed.status_code == 200
+    assert changed.json()["profile"]["hearts"] == 4
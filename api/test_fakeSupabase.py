@@ -0,0 +1,137 @@
+import asyncio
+
+import pytest
+from fastapi.testclient import TestClient
+from postgrest.exceptions import APIError
+
+import main
+import repository
+from connect import jwt_secret
+from fakeSupabase import FakeClient
+from storage.supabaseStore import SupabaseStore
+from utils import answerKey, leaderboard, lessonCache, queryLog
+
+
+def seeded_client():
+    client = FakeClient(jwt_secret=jwt_secret)
+    client.table("lessons").insert([
+        {"id": "l1", "title": "Relief", "order_number": 1},
+        {"id": "l2", "title": "Penalties", "order_number": 2}
+    ]).execute()
+    client.table("questions").insert([
+        {"id": "q2", "lesson_id": "l1", "question_text": "Second?", "question_order": 2},
+        {"id": "q1", "lesson_id": "l1", "question_text": "First?", "question_order": 1}
+    ]).execute()
+    client.table("options").insert([
+        {"id": "o2", "question_id": "q1", "option_text": "No", "is_correct": False, "option_order": 2},
+        {"id": "o1", "question_id": "q1", "option_text": "Yes", "is_correct": True, "option_order": 1},
+        {"id": "o3", "question_id": "q2", "option_text": "Yes", "is_correct": True, "option_order": 1}
+    ]).execute()
+    return client
+
+
+def test_select_filters_order_and_paging():
+    client = FakeClient()
+    client.table("profiles").insert([
+        {"id": f"u{i}", "username": f"player{i}", "handicap": 0, "xp": xp}
+        for i, xp in enumerate([300, 100, 300, 200, 100])
+    ]).execute()
+    profiles = client.table("profiles")
+
+    ranked = profiles.select("id, xp").order("xp", desc=True).order("id").range(1, 3).execute().data
+    assert [row["id"] for row in ranked] == ["u2", "u3", "u1"]
+
+    after = client.table("profiles").select("id").lte("xp", 200).or_("xp.lt.200,id.gt.u3").order("xp", desc=True).order("id").limit(2).execute().data
+    assert [row["id"] for row in after] == ["u1", "u4"]
+
+    assert client.table("profiles").select("id", count="exact", head=True).neq("xp", 100).execute().count == 3
+
+    with pytest.raises(APIError):
+        client.table("profiles").select("*").eq("id", "nobody").single().execute()
+
+    with pytest.raises(APIError):
+        client.table("profiles").insert({"id": "u9", "username": "player0", "handicap": 0}).execute()
+
+
+def test_embedded_tables_use_foreign_table_order():
+    client = seeded_client()
+
+    lesson = (
+        client.table("lessons")
+        .select("*, questions(*, options(*))")
+        .eq("id", "l1")
+        .order("question_order", foreign_table="questions")
+        .order("option_order", foreign_table="questions.options")
+        .single()
+        .execute()
+        .data
+    )
+
+    assert [question["id"] for question in lesson["questions"]] == ["q1", "q2"]
+    assert [option["id"] for option in lesson["questions"][0]["options"]] == ["o1", "o2"]
+
+
+def test_full_flow_against_fake(monkeypatch):
+    fake = seeded_client()
+    monkeypatch.setattr(repository, "supabase", fake)
+    monkeypatch.setattr(repository, "store", SupabaseStore(fake, repository.execute))
+    monkeypatch.setattr(queryLog, "enforce", True)
+    monkeypatch.setattr(leaderboard, "loaded", False)
+    monkeypatch.setattr(answerKey, "version", None)
+    lessonCache.invalidate()
+    client = TestClient(main.app)
+
+    signup = client.post("/v1/signup", json={"email": "fake@example.com", "password": "Password123!", "username": "fake", "handicap": 12})
+    assert signup.status_code == 200
+
+    signin = client.post("/v1/signin", json={"email": "fake@example.com", "password": "Password123!"})
+    assert signin.json()["profile"]["hearts"] == 5
+    client.headers["Authorization"] = f"Bearer {signin.json()['session']['access_token']}"
+
+    dashboard = client.get("/v1/dashboard").json()
+    assert dashboard["next_lesson"]["id"] == "l1"
+
+    assert client.get("/v1/lessons/l1").json()["hearts"] == 5
+    wrong = client.post("/v1/lessons/l1/questions/q1/answer", json={"selected_option_id": "o2"}).json()
+    assert wrong["hearts_remaining"] == 4
+    assert wrong["correct_answer"]["id"] == "o1"
+
+    for bad in ({"accuracy": 50, "time_taken": 12.7}, {"accuracy": 150}, {"mistakes": -1}):
+        assert client.post("/v1/lessons/l1/complete", json=bad).status_code == 422
+    assert fake.tables.get("completed_lessons", []) == []
+
+    complete = client.post("/v1/lessons/l1/complete", json={"accuracy": 50, "time_taken": 40, "mistakes": 1}).json()
+    assert (complete["xp_earned"], complete["new_streak"], complete["total_xp"]) == (95, 1, 95)
+
+    dashboard = client.get("/v1/dashboard").json()
+    assert dashboard["next_lesson"]["id"] == "l2"
+    assert dashboard["lessons_completed"] == 1
+
+    board = client.get("/v1/leaderboard").json()
+    assert board["leaderboard"][0]["username"] == "fake"
+    assert board["total"] == 1
+
+
+def test_profile_time_zone_follows_the_player(monkeypatch):
+    fake = seeded_client()
+    monkeypatch.setattr(repository, "supabase", fake)
+    monkeypatch.setattr(repository, "store", SupabaseStore(fake, repository.execute))
+    monkeypatch.setattr(queryLog, "enforce", True)
+    for name in ("entries", "ranking", "loaded"):
+        monkeypatch.setattr(leaderboard, name, getattr(leaderboard, name))
+    client = TestClient(main.app)
+
+    client.post("/v1/signup", json={"email": "tz@example.com", "password": "Password123!", "username": "tz", "handicap": 3, "timezone": "Europe/London"})
+    signin = client.post("/v1/signin", json={"email": "tz@example.com", "password": "Password123!"}).json()
+    assert signin["profile"]["timezone"] == "Europe/London"
+    client.headers["Authorization"] = f"Bearer {signin['session']['access_token']}"
+    asyncio.run(leaderboard.load())
+
+    moved = client.patch("/v1/profile", json={"timezone": "Asia/Tokyo"})
+    assert moved.status_code == 200
+    assert moved.json()["timezone"] == "Asia/Tokyo"
+    assert fake.tables["profiles"][0]["timezone"] == "Asia/Tokyo"
+    assert leaderboard.entries[signin["user"]["id"]]["timezone"] == "Asia/Tokyo"
+
+    assert client.patch("/v1/profile", json={"timezone": "Mars/Olympus"}).status_code == 400
+    assert client.patch("/v1/profile", json={}).status_code == 400
@@ -0,0 +1,83 @@
+import asyncio
+import random
+import uuid
+from datetime import date, timedelta
+
+from conftest import connect
+from utils.progress import MAX_HEARTS, effective_hearts
+
+
+def test_decrement_hearts_under_concurrency(database):
+    user_id = uuid.uuid4()
+
+    async def scenario():
+        pool = await connect(database, min_size=10, max_size=10)
+        try:
+            await pool.execute("insert into auth.users (id) values ($1)", user_id)
+            await pool.execute(
+                "insert into profiles (id, username, handicap, hearts) values ($1, 'hammer', 10, 5)", user_id
+            )
+
+            results = await asyncio.gather(
+                *(pool.fetchval("select decrement_hearts($1)", user_id) for _ in range(50))
+            )
+            final = await pool.fetchval("select hearts from profiles where id = $1", user_id)
+            return results, final
+        finally:
+            await pool.close()
+
+    results, final = asyncio.run(scenario())
+
+    assert final == 0
+    assert sorted(r for r in results if r > 0) == [1, 2, 3, 4]
+    assert results.count(0) == 46
+
+
+def test_decrement_hearts_missing_profile(database):
+    async def scenario():
+        pool = await connect(database, min_size=1, max_size=1)
+        try:
+            return await pool.fetchval("select decrement_hearts($1)", uuid.uuid4())
+        finally:
+            await pool.close()
+
+    assert asyncio.run(scenario()) is None
+
+
+def test_lazy_refill_matches_nightly_reset():
+    rng = random.Random(13)
+    start = date(2026, 1, 1)
+
+    for _ in range(200):
+        nightly = MAX_HEARTS
+        stored, refilled_on = MAX_HEARTS, start
+        for day in range(10):
+            today = start + timedelta(days=day)
+            if day:
+                nightly = MAX_HEARTS
+            for _ in range(rng.randint(0, 7)):
+                # Wrong answer: the nightly model decrements what's stored,
+                # the lazy model refills first, like decrement_hearts does.
+                nightly = max(0, nightly - 1)
+                hearts = effective_hearts(stored, refilled_on, today)
+                stored, refilled_on = max(0, hearts - 1), today
+            assert effective_hearts(stored, refilled_on, today) == nightly
+
+
+def test_decrement_hearts_refills_on_a_new_day(database):
+    user_id = uuid.uuid4()
+    today = date(2026, 5, 2)
+
+    async def scenario():
+        pool = await connect(database, min_size=1, max_size=1)
+        try:
+            await pool.execute("insert into auth.users (id) values ($1)", user_id)
+            await pool.execute(
+                "insert into profiles (id, username, handicap, hearts, hearts_refilled_on) values ($1, 'tired', 10, 0, $2)",
+                user_id, today - timedelta(days=1)
+            )
+            return [await pool.fetchval("select decrement_hearts($1, $2)", user_id, today) for _ in range(6)]
+        finally:
+            await pool.close()
+
+    assert asyncio.run(scenario()) == [4, 3, 2, 1, 0, 0]
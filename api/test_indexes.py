@@ -0,0 +1,248 @@
+import asyncio
+import json
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+from conftest import TEST_SCHEMA, connect
+from storage.sqlStore import PostgresStore, migrations
+from utils import leaderboard, progress
+
+
+USER = str(uuid.UUID(int=(4 << 64) + 500))
+LESSON = str(uuid.UUID(int=(1 << 64) + 3))
+
+
+class RecordingStore(PostgresStore):
+    """Captures the SQL a store method would run instead of running it."""
+
+    def __init__(self):
+        super().__init__("")
+        self.statements = []
+
+    async def fetch(self, target: str, operation: str, sql: str, *args) -> list:
+        self.statements.append((self.numbered(sql), args))
+        return []
+
+    async def execute_count(self, target: str, operation: str, sql: str, *args) -> int:
+        self.statements.append((self.numbered(sql), args))
+        return 0
+
+
+SEED = """
+insert into lessons (id, title, order_number)
+select ('00000000-0000-0001-' || lpad(to_hex(n), 16, '0')::text)::uuid, 'Lesson ' || n, n
+from generate_series(0, 199) n;
+
+insert into questions (id, lesson_id, question_text, question_order)
+select gen_random_uuid(), l.id, 'Question ' || n, n
+from lessons l, generate_series(1, 12) n;
+
+insert into options (question_id, option_text, is_correct, option_order)
+select q.id, 'Option ' || n, n = 1, n
+from questions q, generate_series(1, 4) n;
+
+insert into auth.users (id)
+select ('00000000-0000-0004-' || lpad(to_hex(n), 16, '0')::text)::uuid
+from generate_series(0, 19999) n
+on conflict do nothing;
+
+insert into profiles (id, username, handicap, xp, streak, last_lesson_date, timezone)
+select ('00000000-0000-0004-' || lpad(to_hex(n), 16, '0')::text)::uuid, 'golfer' || n, n % 36, (n * 7919) % 5000,
+       case when n % 20 = 0 then n % 30 + 1 else 0 end,
+       date '2024-01-01' + n % 60,
+       (array['UTC', 'Europe/London', 'America/New_York', 'Asia/Tokyo'])[n % 4 + 1]
+from generate_series(0, 19999) n;
+
+insert into completed_lessons (user_id, lesson_id, accuracy, xp_earned, time_taken)
+select p.id, l.id, 90, 10, 60
+from profiles p join lessons l on l.order_number < (p.xp % 5)
+"""
+
+
+def plan_nodes(plan: dict):
+    yield plan
+    for child in plan.get("Plans", []):
+        yield from plan_nodes(child)
+
+
+def explain(dsn: str, statements):
+    """The top-level plan of every statement, on a seeded and analyzed database."""
+    async def main():
+        pool = await connect(dsn, min_size=1, max_size=1)
+        try:
+            await pool.execute(SEED)
+            await pool.execute("vacuum analyze lessons, questions, options, profiles, completed_lessons")
+            plans = []
+            for sql, args in statements:
+                rows = await pool.fetchval(f"explain (format json) {sql}", *args)
+                plans.append(json.loads(rows)[0]["Plan"])
+            return plans
+        finally:
+            await pool.close()
+    return asyncio.run(main())
+
+
+def statements(calls):
+    store = RecordingStore()
+
+    async def main():
+        for method, args in calls:
+            await getattr(store, method)(*args)
+    asyncio.run(main())
+    return store.statements
+
+
+def indexes(plan: dict) -> set:
+    return {node["Index Name"] for node in plan_nodes(plan) if "Index Name" in node}
+
+
+def seq_scanned(plan: dict) -> set:
+    return {node["Relation Name"] for node in plan_nodes(plan) if node["Node Type"] == "Seq Scan"}
+
+
+# (store method, args, index the plan must use). The leaderboard refresh
+# asks for rows updated after its last read; every seeded row is older.
+ROUTE_QUERIES = [
+    ("get_profile", (USER, "*"), "profiles_pkey"),
+    ("username_exists", ("golfer500",), "profiles_username_key"),
+    ("get_leaderboard", (0, 20, "username, xp, streak, handicap"), "idx_profiles_leaderboard"),
+    ("get_leaderboard_after", (2500, USER, 20, "id, username, xp, streak, handicap"), "idx_profiles_leaderboard"),
+    ("get_lesson_content", (LESSON,), "idx_questions_lesson_order"),
+    ("get_lesson_content", (LESSON,), "idx_options_question_order"),
+    ("reset_stale_streaks", (date(2024, 2, 1), "Asia/Tokyo"), "idx_profiles_active_streak_tz"),
+    ("get_page", ("profiles", leaderboard.COLUMNS, None, 1000, (("gt", "updated_at", (datetime.now(timezone.utc) + timedelta(hours=1)).isoformat()),)), "idx_profiles_updated_at")
+]
+
+
+def test_route_queries_use_their_indexes(database):
+    recorded = statements([(method, args) for method, args, _ in ROUTE_QUERIES])
+    plans = explain(database, recorded)
+
+    for (method, _, index), plan, (sql, _) in zip(ROUTE_QUERIES, plans, recorded):
+        assert index in indexes(plan), f"{method} does not use {index}: {sql}\n{json.dumps(plan, indent=1)}"
+        assert not seq_scanned(plan) & {"profiles", "questions", "options"}, f"{method} scans a whole table: {sql}"
+
+
+def test_leaderboard_pages_are_index_only(database):
+    recorded = statements([
+        ("get_leaderboard", (40, 20, "username, xp, streak, handicap")),
+        ("get_leaderboard_after", (2500, USER, 20, "id, username, xp, streak, handicap, last_lesson_date, timezone"))
+    ])
+    for plan in explain(database, recorded):
+        assert any(node["Node Type"] == "Index Only Scan" for node in plan_nodes(plan)), json.dumps(plan, indent=1)
+
+
+def test_maintenance_scans_avoid_full_table_scans(database):
+    filters = (("eq", "timezone", "UTC"), ("neq", "streak", 0), ("lt", "last_lesson_date", "2024-02-01"))
+    recorded = statements([
+        ("get_page", ("profiles", "id", None, 1000, filters)),
+        ("get_page", ("profiles", "id", str(uuid.UUID(int=(4 << 64) + 100)), 1000, filters)),
+        ("reset_stale_streaks", (date(2024, 2, 1), "UTC", str(uuid.UUID(int=(4 << 64) + 100)), str(uuid.UUID(int=(4 << 64) + 900))))
+    ])
+    recorded.append((
+        "select distinct l.order_number from completed_lessons c join lessons l on l.id = c.lesson_id where c.user_id = $1",
+        (uuid.UUID(USER),)
+    ))
+    for (sql, _), plan in zip(recorded, explain(database, recorded)):
+        assert "profiles" not in seq_scanned(plan) and "completed_lessons" not in seq_scanned(plan), \
+            f"{sql}\n{json.dumps(plan, indent=1)}"
+
+
+def test_migrations_are_recorded_once(database):
+    async def main():
+        store = PostgresStore(database, server_settings={"search_path": f"{TEST_SCHEMA}, public"})
+        await store.open()
+        pool = await store.connection_pool()
+        async with pool.acquire() as connection:
+            pending = await store.migrate(connection)
+            versions = await connection.fetch("select version from schema_migrations order by version")
+        await store.close()
+        return pending, [row["version"] for row in versions]
+
+    pending, versions = asyncio.run(main())
+    assert pending == []
+    assert versions == [version for version, _ in migrations()]
+
+
+UPGRADED = """
+insert into lessons (id, title, order_number)
+select ('00000000-0000-0001-' || lpad(to_hex(n), 16, '0')::text)::uuid, 'Lesson ' || n, n
+from generate_series(0, 19) n;
+
+insert into auth.users (id)
+select ('00000000-0000-0004-' || lpad(to_hex(n), 16, '0')::text)::uuid
+from generate_series(0, 3) n
+on conflict do nothing;
+
+insert into profiles (id, username, handicap)
+select ('00000000-0000-0004-' || lpad(to_hex(n), 16, '0')::text)::uuid, 'golfer' || n, 10
+from generate_series(0, 3) n;
+
+-- Golfer n < 3 completed every lesson whose order_number is a multiple of
+-- n + 1, the first five of them twice; golfer 3 completed nothing.
+insert into completed_lessons (user_id, lesson_id, accuracy, xp_earned, time_taken, completed_at)
+select p.id, l.id, 90, 10, 60, now() - make_interval(days => r)
+from profiles p
+join lessons l on l.order_number % (right(p.id::text, 1)::integer + 1) = 0
+cross join generate_series(0, 1) r
+where right(p.id::text, 1) < '3' and (r = 0 or l.order_number < 5);
+"""
+
+
+def test_upgrade_backfills_progress_bitmap(database):
+    async def main():
+        store = PostgresStore(database, server_settings={"search_path": f"{TEST_SCHEMA}, public"})
+        await store.open()
+        pool = await store.connection_pool()
+        async with pool.acquire() as connection:
+            # A database from before the bitmap: completions, empty bitmaps, 0004 not applied.
+            await connection.execute(UPGRADED)
+            await connection.execute("delete from schema_migrations where version = '0004_backfill_progress_bitmap'")
+            pending = await store.migrate(connection)
+            counts = await connection.fetch(
+                "select p.id, p.progress_bitmap, count(distinct c.lesson_id) as completed "
+                "from profiles p left join completed_lessons c on c.user_id = p.id group by p.id order by p.id"
+            )
+            await connection.execute("select rebuild_progress_bitmap()")
+            rebuilt = await connection.fetch("select progress_bitmap from profiles order by id")
+        await store.close()
+        return pending, counts, rebuilt
+
+    pending, counts, rebuilt = asyncio.run(main())
+    assert pending == ["0004_backfill_progress_bitmap"]
+    assert [progress.completed_count(progress.decode_bitmap(row["progress_bitmap"])) for row in counts] == [20, 10, 7, 0]
+    assert [row["completed"] for row in counts] == [20, 10, 7, 0]
+    assert [row["progress_bitmap"] for row in counts] == [row["progress_bitmap"] for row in rebuilt]
+
+
+OLD_COMPLETE_LESSON = """
+drop function complete_lesson(uuid, uuid, numeric, integer, integer, date);
+create function complete_lesson(p_user_id uuid, p_lesson_id uuid, p_accuracy numeric, p_time_taken integer, p_mistakes integer, p_today date default null)
+returns table (xp_earned integer, new_streak integer, total_xp integer)
+language sql
+as $$ select 0, 0, 0 where false $$;
+"""
+
+
+def test_upgrade_replaces_complete_lesson_return_type(database):
+    async def main():
+        store = PostgresStore(database, server_settings={"search_path": f"{TEST_SCHEMA}, public"})
+        await store.open()
+        pool = await store.connection_pool()
+        async with pool.acquire() as connection:
+            # A database from before complete_lesson returned lesson_date.
+            await connection.execute(OLD_COMPLETE_LESSON)
+            await connection.execute("delete from schema_migrations where version = '0006_complete_lesson_lesson_date'")
+        await store.close()
+
+        # Restarting applies the migration, then recreates the functions.
+        store = PostgresStore(database, server_settings={"search_path": f"{TEST_SCHEMA}, public"})
+        await store.open()
+        pool = await store.connection_pool()
+        columns = await pool.fetchval(
+            "select proargnames from pg_proc where oid = to_regprocedure('complete_lesson(uuid, uuid, numeric, integer, integer, date)')"
+        )
+        await store.close()
+        return columns
+
+    assert "lesson_date" in asyncio.run(main())
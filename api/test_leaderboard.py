@@ -0,0 +1,169 @@
+import asyncio
+import random
+import uuid
+
+from fastapi.testclient import TestClient
+
+import main
+import repository
+from routes.leaderboardEndpoint import getLeaderboard
+from utils import leaderboard
+
+
+def make_profiles(count: int, seed: int = 7):
+    rng = random.Random(seed)
+    return [
+        {"id": str(uuid.UUID(int=i)), "username": f"player{i}", "xp": rng.randint(0, 50) * 100, "streak": rng.randint(0, 9), "handicap": rng.randint(0, 36)}
+        for i in range(count)
+    ]
+
+
+def load(monkeypatch, profiles):
+    async def get_page(table, columns, after_id=None, limit=1000, filters=()):
+        rows = [p for p in profiles if after_id is None or p["id"] > after_id]
+        return [dict(p) for p in rows[:limit]]
+
+    monkeypatch.setattr(repository, "get_page", get_page)
+    monkeypatch.setattr(leaderboard, "PAGE_SIZE", 100)
+    asyncio.run(leaderboard.load())
+
+
+def reference(profiles):
+    return sorted(profiles, key=lambda p: (-p["xp"], p["id"]))
+
+
+def test_pages_and_ranks_match_sorted_order(monkeypatch):
+    profiles = make_profiles(1050)
+    load(monkeypatch, profiles)
+    expected = reference(profiles)
+
+    assert leaderboard.total() == 1050
+    assert [row["username"] for row in leaderboard.page(40, 20)] == [p["username"] for p in expected[40:60]]
+    assert leaderboard.top(5) == [{"username": p["username"], "xp": p["xp"], "streak": p["streak"]} for p in expected[:5]]
+    for position in (0, 1, 500, 1049):
+        assert leaderboard.rank(expected[position]["id"]) == position + 1
+
+
+def test_xp_update_moves_user(monkeypatch):
+    profiles = make_profiles(200)
+    load(monkeypatch, profiles)
+    last = reference(profiles)[-1]
+
+    leaderboard.update(last["id"], xp=10_000, streak=1)
+
+    assert leaderboard.rank(last["id"]) == 1
+    assert leaderboard.top(1)[0]["username"] == last["username"]
+    assert leaderboard.total() == 200
+
+
+def test_signup_adds_user(monkeypatch):
+    load(monkeypatch, make_profiles(10))
+
+    leaderboard.upsert({"id": "ffffffff-ffff-ffff-ffff-ffffffffffff", "username": "newbie", "xp": 0, "streak": 0, "handicap": 28, "hearts": 5})
+
+    assert leaderboard.total() == 11
+    assert leaderboard.rank("ffffffff-ffff-ffff-ffff-ffffffffffff") == 11
+    assert leaderboard.rank("missing") is None
+
+
+def test_cursor_walk_matches_offset_pages(monkeypatch):
+    profiles = make_profiles(95)
+    load(monkeypatch, profiles)
+
+    async def walk():
+        pages = []
+        response = await getLeaderboard(1, 10)
+        pages.append(response["leaderboard"])
+        while response["next_cursor"]:
+            response = await getLeaderboard(1, 10, response["next_cursor"])
+            pages.append(response["leaderboard"])
+        return pages
+
+    pages = asyncio.run(walk())
+    assert len(pages) == 10
+    assert [row["username"] for page in pages for row in page] == [p["username"] for p in reference(profiles)]
+
+
+def test_total_modes(monkeypatch):
+    load(monkeypatch, make_profiles(30))
+    counts = []
+
+    async def count_profiles(method="exact"):
+        counts.append(method)
+        return 31
+
+    monkeypatch.setattr(repository, "count_profiles", count_profiles)
+
+    maintained = asyncio.run(getLeaderboard(1, 10))
+    exact = asyncio.run(getLeaderboard(1, 10, count="exact"))
+    estimated = asyncio.run(getLeaderboard(1, 10, count="estimated"))
+
+    assert (maintained["total"], maintained["total_is_exact"]) == (30, False)
+    assert (exact["total"], exact["total_is_exact"]) == (31, True)
+    assert estimated["total_is_exact"] is False
+    assert counts == ["exact", "planned"]
+
+
+def test_upserts_during_load_survive_the_swap(monkeypatch):
+    profiles = make_profiles(300)
+    load(monkeypatch, profiles)
+    first, last = profiles[0], profiles[-1]
+    newbie = {"id": "ffffffff-ffff-ffff-ffff-ffffffffffff", "username": "newbie", "xp": 0, "streak": 0, "handicap": 28}
+
+    async def get_page(table, columns, after_id=None, limit=1000, filters=()):
+        if after_id == profiles[99]["id"]:
+            # Lands after the first page was read, before the rest.
+            leaderboard.update(first["id"], xp=99_999)
+            leaderboard.update(last["id"], xp=99_998)
+            leaderboard.upsert(newbie)
+        rows = [p for p in profiles if after_id is None or p["id"] > after_id]
+        return [dict(p) for p in rows[:limit]]
+
+    monkeypatch.setattr(repository, "get_page", get_page)
+    asyncio.run(leaderboard.load())
+
+    assert leaderboard.total() == 301
+    assert leaderboard.rank(first["id"]) == 1
+    assert leaderboard.rank(last["id"]) == 2
+    assert leaderboard.rank(newbie["id"]) is not None
+    assert leaderboard.entries[first["id"]]["username"] == first["username"]
+    assert leaderboard.pending is None
+
+
+def test_page_parameters_are_bounded():
+    client = TestClient(main.app)
+
+    for params in ({"per_page": 1_000_000}, {"per_page": 0}, {"page": 0}, {"page": -1}):
+        assert client.get("/v1/leaderboard", params=params).status_code == 422
+
+
+def test_refresh_reads_only_updated_profiles(monkeypatch):
+    profiles = [dict(p, updated_at="2024-03-01T09:00:00+00:00") for p in make_profiles(300)]
+    profiles[7]["updated_at"] = "2024-03-01T10:00:00+00:00"
+    load(monkeypatch, profiles)
+    assert leaderboard.updated_through == "2024-03-01T10:00:00+00:00"
+    requested = []
+
+    async def get_page(table, columns, after_id=None, limit=1000, filters=()):
+        requested.append(filters)
+        (_, column, since), = filters
+        rows = [p for p in profiles if p[column] > since and (after_id is None or p["id"] > after_id)]
+        return [dict(p) for p in rows[:limit]]
+
+    monkeypatch.setattr(repository, "get_page", get_page)
+    generation = leaderboard.generation
+
+    # Nothing changed: only the row inside the slack is read again, and
+    # clients' ETags stay valid.
+    asyncio.run(leaderboard.refresh())
+    assert requested == [(("gt", "updated_at", "2024-03-01T09:59:00+00:00"),)] * 2
+    assert leaderboard.generation == generation
+
+    last = reference(profiles)[-1]
+    last.update(xp=99_999, updated_at="2024-03-01T10:05:00+00:00")
+    asyncio.run(leaderboard.refresh())
+
+    assert leaderboard.rank(last["id"]) == 1
+    assert leaderboard.total() == 300
+    assert leaderboard.updated_through == "2024-03-01T10:05:00+00:00"
+    assert leaderboard.generation == generation + 1
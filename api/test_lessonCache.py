@@ -0,0 +1,80 @@
+import asyncio
+import json
+
+import repository
+from fakeSupabase import FakeClient
+from storage.supabaseStore import SupabaseStore
+from utils import lessonCache
+
+
+LESSON = {
+    "id": "lesson-1",
+    "title": "Foundations of the Rules of Golf",
+    "questions": [{"id": "q-1", "question_text": "Which?", "options": [{"id": "o-1", "option_text": "A: Ball", "is_correct": True}]}]
+}
+
+
+def setup_function():
+    lessonCache.invalidate()
+    lessonCache.hits = 0
+    lessonCache.misses = 0
+
+
+def fake_loader(monkeypatch):
+    calls = []
+
+    async def get_lesson_content(lesson_id):
+        calls.append(lesson_id)
+        await asyncio.sleep(0.01)
+        return dict(LESSON, id=lesson_id)
+
+    monkeypatch.setattr(repository, "get_lesson_content", get_lesson_content)
+    return calls
+
+
+def test_hot_lesson_served_from_cache(monkeypatch):
+    calls = fake_loader(monkeypatch)
+
+    async def scenario():
+        first = await lessonCache.get("lesson-1")
+        second = await lessonCache.get("lesson-1")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert calls == ["lesson-1"]
+    assert second is first
+    assert json.loads(first.body)["id"] == "lesson-1"
+    assert lessonCache.stats()["hit_ratio"] == 0.5
+
+
+def test_concurrent_misses_share_one_load(monkeypatch):
+    calls = fake_loader(monkeypatch)
+
+    async def scenario():
+        return await asyncio.gather(*(lessonCache.get("lesson-1") for _ in range(10)))
+
+    asyncio.run(scenario())
+    assert calls == ["lesson-1"]
+
+
+def test_invalidate_reloads(monkeypatch):
+    calls = fake_loader(monkeypatch)
+
+    async def scenario():
+        await lessonCache.get("lesson-1")
+        lessonCache.invalidate()
+        return await lessonCache.get("lesson-1")
+
+    reloaded = asyncio.run(scenario())
+    assert calls == ["lesson-1", "lesson-1"]
+    assert reloaded.version == lessonCache.content_version
+
+
+def test_catalog_reads_past_the_row_cap(monkeypatch):
+    fake = FakeClient(max_rows=4)
+    fake.table("lessons").insert([{"id": f"l{n}", "title": f"Lesson {n}", "order_number": n} for n in range(10, 0, -1)]).execute()
+    monkeypatch.setattr(repository, "store", SupabaseStore(fake, repository.execute))
+
+    catalog = asyncio.run(lessonCache.catalog())
+    assert sorted(catalog.by_order) == list(range(1, 11))
+    assert catalog.mask == sum(1 << n for n in range(1, 11))
@@ -0,0 +1,77 @@
+import asyncio
+
+from fastapi import FastAPI, HTTPException
+from fastapi.testclient import TestClient
+
+import repository
+from connect import supabase
+from utils import metrics
+
+
+def make_app():
+    app = FastAPI()
+    app.add_middleware(metrics.MetricsMiddleware)
+
+    @app.get("/items/{item_id}")
+    async def item(item_id: str):
+        if item_id == "missing":
+            raise HTTPException(status_code=404, detail="Not found")
+        return {"id": item_id}
+
+    return app
+
+
+def test_requests_grouped_by_route_template():
+    client = TestClient(make_app())
+    before = metrics.requests_total.values.get(("GET", "/items/{item_id}", 200), 0)
+
+    for item_id in ("a", "b", "c", "missing"):
+        client.get(f"/items/{item_id}")
+    client.get("/nowhere")
+
+    assert metrics.requests_total.values[("GET", "/items/{item_id}", 200)] == before + 3
+    assert metrics.requests_total.values[("GET", "/items/{item_id}", 404)] >= 1
+    assert metrics.requests_total.values[("GET", "unmatched", 404)] >= 1
+
+    text = metrics.render()
+    assert 'ruleshot_http_request_duration_seconds_bucket{method="GET",route="/items/{item_id}",le="+Inf"}' in text
+    assert "/items/a" not in text
+
+
+def test_upstream_calls_labelled_by_table_and_operation(monkeypatch):
+    monkeypatch.setattr(repository, "run_sync", fake_run_sync)
+    queries = {
+        ("profiles", "select"): supabase.table("profiles").select("id").eq("id", "x").single(),
+        ("profiles", "count"): supabase.table("profiles").select("id", count="exact", head=True),
+        ("profiles", "update"): supabase.table("profiles").update({"streak": 0}).eq("id", "x"),
+        ("decrement_hearts", "rpc"): supabase.rpc("decrement_hearts", {"p_user_id": "x"})
+    }
+
+    for labels, query in queries.items():
+        before = upstream_count(labels)
+        asyncio.run(repository.execute(query))
+        assert upstream_count(labels) == before + 1
+
+
+def test_failed_upstream_call_counted(monkeypatch):
+    async def failing(fn, *args, **kwargs):
+        raise RuntimeError("connection reset")
+
+    monkeypatch.setattr(repository, "run_sync", failing)
+    before = metrics.upstream_errors.values.get(("auth", "get_user"), 0)
+
+    try:
+        asyncio.run(repository.get_user("token"))
+    except RuntimeError:
+        pass
+
+    assert metrics.upstream_errors.values[("auth", "get_user")] == before + 1
+
+
+async def fake_run_sync(fn, *args, **kwargs):
+    return None
+
+
+def upstream_count(labels):
+    series = metrics.upstream_duration.series.get(labels)
+    return sum(series[0]) if series else 0
@@ -0,0 +1,47 @@
+from datetime import datetime, timezone
+
+from fastapi.testclient import TestClient
+from supabase_auth.types import AuthResponse, Session, User, UserResponse
+
+import main
+import models
+import repository
+from fakeSupabase import FakeAuthResponse, FakeSession, FakeUser
+
+
+USER_ID = "3f1c2a4e-0000-4000-8000-000000000001"
+
+
+def auth_user() -> User:
+    return User(
+        id=USER_ID, email="golfer@example.com", aud="authenticated", role="authenticated",
+        app_metadata={}, user_metadata={}, created_at=datetime(2024, 3, 1, tzinfo=timezone.utc)
+    )
+
+
+def test_auth_models_read_client_responses():
+    user = auth_user()
+    session = Session(access_token="access", refresh_token="refresh", expires_in=3600, token_type="bearer", user=user)
+
+    signup = models.SignupResponse.model_validate({"status_code": 200, "data": AuthResponse(user=user, session=session)})
+    assert signup.data.user.id == USER_ID
+    assert signup.data.user.created_at == user.created_at
+    assert signup.data.session.expires_in == 3600
+
+    fake_user = FakeUser(USER_ID, "golfer@example.com")
+    fake = models.AuthResult.model_validate(FakeAuthResponse(fake_user, FakeSession("access", fake_user, 3600)))
+    assert (fake.user.email, fake.session.token_type) == ("golfer@example.com", "bearer")
+
+
+def test_user_route_serves_client_response(monkeypatch):
+    async def get_user(token):
+        return UserResponse(user=auth_user())
+
+    monkeypatch.setattr(repository, "get_user", get_user)
+
+    response = TestClient(main.app).get("/v1/user", headers={"Authorization": "Bearer token"})
+    assert response.status_code == 200
+    assert response.json()["user"] == {
+        "id": USER_ID, "email": "golfer@example.com", "aud": "authenticated", "role": "authenticated",
+        "created_at": "2024-03-01T00:00:00Z"
+    }
@@ -0,0 +1,182 @@
+import asyncio
+import random
+import uuid
+from datetime import date, timedelta
+
+import repository
+from conftest import connect
+from utils.progress import calculate_xp, next_streak, set_bit, completed_count, first_incomplete, decode_bitmap
+
+
+TODAY = date(2026, 3, 14)
+
+
+def random_case(rng: random.Random):
+    streak = rng.randint(0, 60)
+    gap = rng.choice([None, -1, 0, 1, 1, 1, 2, 3, rng.randint(4, 400)])
+    last_lesson_date = None if gap is None else TODAY - timedelta(days=gap)
+    mistakes = rng.randint(0, 30)
+    return streak, last_lesson_date, mistakes
+
+
+def test_xp_and_streak_properties():
+    rng = random.Random(6)
+    for _ in range(2000):
+        streak, last_lesson_date, mistakes = random_case(rng)
+        xp = calculate_xp(mistakes)
+        new_streak = next_streak(streak, last_lesson_date, TODAY)
+
+        assert 0 <= xp <= 100
+        assert xp == 100 - 5 * mistakes or (xp == 0 and mistakes >= 20)
+
+        if last_lesson_date is None or (TODAY - last_lesson_date).days > 1:
+            assert new_streak == 1
+        elif (TODAY - last_lesson_date).days == 1:
+            assert new_streak == streak + 1
+        else:
+            assert new_streak == streak
+
+        # A second completion on the same day never changes the streak again.
+        assert next_streak(new_streak, TODAY, TODAY) == new_streak
+
+
+def test_complete_lesson_matches_reference(database):
+    rng = random.Random(60)
+    cases = [random_case(rng) for _ in range(200)]
+
+    async def scenario():
+        pool = await connect(database, min_size=1, max_size=4)
+        try:
+            lesson_id = await pool.fetchval("insert into lessons (title, order_number) values ('Rules', 1) returning id")
+            results = []
+            for index, (streak, last_lesson_date, mistakes) in enumerate(cases):
+                user_id = uuid.uuid4()
+                xp = rng.randint(0, 5000)
+                await pool.execute("insert into auth.users (id) values ($1)", user_id)
+                await pool.execute(
+                    "insert into profiles (id, username, handicap, xp, streak, last_lesson_date) values ($1, $2, 0, $3, $4, $5)",
+                    user_id, f"player{index}", xp, streak, last_lesson_date
+                )
+                row = await pool.fetchrow(
+                    "select * from complete_lesson($1, $2, 90, 120, $3, $4)", user_id, lesson_id, mistakes, TODAY
+                )
+                completions = await pool.fetchval("select count(*) from completed_lessons where user_id = $1", user_id)
+                results.append((xp, dict(row), completions))
+            return results
+        finally:
+            await pool.close()
+
+    for (streak, last_lesson_date, mistakes), (xp, row, completions) in zip(cases, asyncio.run(scenario())):
+        assert row["xp_earned"] == calculate_xp(mistakes)
+        assert row["total_xp"] == xp + calculate_xp(mistakes)
+        assert row["new_streak"] == next_streak(streak, last_lesson_date, TODAY)
+        assert completions == 1
+
+
+def test_concurrent_completions_keep_all_xp(database):
+    user_id = uuid.uuid4()
+
+    async def scenario():
+        pool = await connect(database, min_size=8, max_size=8)
+        try:
+            lesson_id = await pool.fetchval("insert into lessons (title, order_number) values ('Rules', 1) returning id")
+            await pool.execute("insert into auth.users (id) values ($1)", user_id)
+            await pool.execute("insert into profiles (id, username, handicap) values ($1, 'racer', 0)", user_id)
+            await asyncio.gather(
+                *(pool.fetchrow("select * from complete_lesson($1, $2, 100, 60, 0)", user_id, lesson_id) for _ in range(20))
+            )
+            return await pool.fetchval("select xp from profiles where id = $1", user_id)
+        finally:
+            await pool.close()
+
+    assert asyncio.run(scenario()) == 20 * 100
+
+
+def test_progress_bitmap_scan():
+    catalog_mask = sum(1 << order_number for order_number in (1, 2, 3, 5, 900))
+    bitmap = 0
+    for order_number in (1, 2, 900):
+        bitmap = set_bit(bitmap, order_number)
+
+    assert completed_count(bitmap) == 3
+    assert first_incomplete(bitmap, catalog_mask) == 3
+    assert first_incomplete(set_bit(set_bit(bitmap, 3), 5), catalog_mask) is None
+    assert decode_bitmap("\\x0601") == (1 << 1) | (1 << 2) | (1 << 8)
+    assert decode_bitmap(None) == 0
+
+
+def test_complete_lesson_sets_progress_bit(database):
+    user_id = uuid.uuid4()
+    order_numbers = [1, 9, 17, 2]
+
+    async def scenario():
+        pool = await connect(database, min_size=1, max_size=2)
+        try:
+            await pool.execute("insert into auth.users (id) values ($1)", user_id)
+            await pool.execute("insert into profiles (id, username, handicap) values ($1, 'bits', 0)", user_id)
+            for order_number in order_numbers:
+                lesson_id = await pool.fetchval(
+                    "insert into lessons (title, order_number) values ('Rules', $1) returning id", order_number
+                )
+                await pool.fetchrow("select * from complete_lesson($1, $2, 100, 60, 0)", user_id, lesson_id)
+            stored = await pool.fetchval("select progress_bitmap from profiles where id = $1", user_id)
+            await pool.execute("update profiles set progress_bitmap = ''::bytea")
+            rebuilt_rows = await pool.fetchval("select rebuild_progress_bitmap()")
+            rebuilt = await pool.fetchval("select progress_bitmap from profiles where id = $1", user_id)
+            return stored, rebuilt_rows, rebuilt
+        finally:
+            await pool.close()
+
+    stored, rebuilt_rows, rebuilt = asyncio.run(scenario())
+    expected = sum(1 << order_number for order_number in order_numbers)
+    assert decode_bitmap(stored) == expected
+    assert rebuilt_rows == 1
+    assert decode_bitmap(rebuilt) == expected
+
+
+def test_lazy_streaks_match_nightly_job(monkeypatch):
+    """Serve streaks lazily and compare with what the nightly reset would store."""
+    from utils import leaderboard
+    from utils.progress import apply_daily_rules, utc_today
+
+    rng = random.Random(14)
+    today = utc_today()
+    days = 30
+    start = today - timedelta(days=days)
+
+    nightly = {}
+    lazy = {}
+    for index in range(300):
+        user_id = str(uuid.UUID(int=index))
+        nightly[user_id] = {"streak": 0, "last_lesson_date": None}
+        lazy[user_id] = {"streak": 0, "last_lesson_date": None}
+
+    for day in range(days + 1):
+        current = start + timedelta(days=day)
+        if day:
+            # The nightly job: reset every streak whose last lesson is before yesterday.
+            for profile in nightly.values():
+                if profile["last_lesson_date"] and profile["last_lesson_date"] < current - timedelta(days=1):
+                    profile["streak"] = 0
+        for user_id in rng.sample(sorted(nightly), rng.randint(0, 60)):
+            for profile in (nightly[user_id], lazy[user_id]):
+                profile["streak"] = next_streak(profile["streak"], profile["last_lesson_date"], current)
+                profile["last_lesson_date"] = current
+
+    for user_id, profile in lazy.items():
+        served = apply_daily_rules({"hearts": 5, **profile}, today)
+        assert served["streak"] == nightly[user_id]["streak"]
+
+    rows = [
+        {"id": user_id, "username": user_id, "xp": rng.randint(0, 900), "handicap": 0, **profile}
+        for user_id, profile in lazy.items()
+    ]
+
+    async def get_page(table, columns, after_id=None, limit=1000, filters=()):
+        return [dict(row) for row in rows if after_id is None or row["id"] > after_id][:limit]
+
+    monkeypatch.setattr(repository, "get_page", get_page)
+    asyncio.run(leaderboard.load())
+
+    for row in leaderboard.page(0, len(rows), ("username", "streak")):
+        assert row["streak"] == nightly[row["username"]]["streak"]
@@ -0,0 +1,140 @@
+import time
+from types import SimpleNamespace
+
+import jwt
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+import main
+import repository
+from auth import verify
+from connect import jwt_secret, supabase
+from utils import answerKey, leaderboard, lessonCache, queryLog
+
+
+USER_ID = "3f1c2a4e-0000-4000-8000-000000000001"
+LESSON_ID = "6d0c3a8e-0000-4000-8000-000000000001"
+QUESTION_ID = "6d0c3a8e-0000-4000-8000-000000000002"
+RIGHT_OPTION_ID = "6d0c3a8e-0000-4000-8000-000000000003"
+WRONG_OPTION_ID = "6d0c3a8e-0000-4000-8000-000000000004"
+
+LESSON = {
+    "id": LESSON_ID,
+    "title": "Relief",
+    "description": "",
+    "order_number": 1,
+    "questions": [{
+        "id": QUESTION_ID,
+        "question_text": "?",
+        "options": [
+            {"id": RIGHT_OPTION_ID, "question_id": QUESTION_ID, "option_text": "A", "is_correct": True, "option_order": 1},
+            {"id": WRONG_OPTION_ID, "question_id": QUESTION_ID, "option_text": "B", "is_correct": False, "option_order": 2}
+        ]
+    }]
+}
+PROFILE = {"id": USER_ID, "username": "player", "xp": 100, "streak": 1, "hearts": 5, "handicap": 10, "timezone": "UTC"}
+
+
+class FakeResponse:
+    def __init__(self, data, count=None):
+        self.data = data
+        self.count = count
+
+
+def fake_result(query):
+    if query.path == "/rpc/decrement_hearts":
+        return FakeResponse(4)
+    if query.path == "/rpc/complete_lesson":
+        return FakeResponse([{"xp_earned": 10, "new_streak": 2, "total_xp": 110, "lesson_date": "2024-01-01"}])
+    if query.path == "/profiles":
+        if query.http_method == "HEAD":
+            return FakeResponse(None, count=1)
+        if "id" in dict(query.params.multi_items()):
+            return FakeResponse(dict(PROFILE))
+        return FakeResponse([{"id": USER_ID, "username": "player", "xp": 100, "streak": 1, "handicap": 10, "last_lesson_date": None, "timezone": "UTC"}])
+    if query.path == "/lessons":
+        if "id" in dict(query.params.multi_items()):
+            return FakeResponse(LESSON)
+        if "questions" in query.params.get("select", ""):
+            return FakeResponse([LESSON])
+        return FakeResponse([{key: LESSON[key] for key in ("id", "title", "description", "order_number")}])
+    raise AssertionError(f"unexpected query {query.path}")
+
+
+@pytest.fixture
+def client(monkeypatch):
+    async def run_sync(fn, *args, **kwargs):
+        return fake_result(fn.__self__)
+
+    monkeypatch.setattr(repository, "run_sync", run_sync)
+    monkeypatch.setattr(queryLog, "enforce", True)
+    monkeypatch.setattr(leaderboard, "loaded", False)
+    monkeypatch.setattr(answerKey, "version", None)
+    lessonCache.invalidate()
+    token = jwt.encode({"sub": USER_ID, "aud": "authenticated", "exp": int(time.time()) + 3600}, jwt_secret, algorithm="HS256")
+    return TestClient(main.app, headers={"Authorization": f"Bearer {token}"})
+
+
+def test_routes_stay_within_budget(client):
+    # Cold caches and no leaderboard index, so every route takes its slowest path.
+    assert client.get(f"/v1/lessons/{LESSON_ID}").status_code == 200
+    assert client.get("/v1/dashboard").status_code == 200
+    assert client.get("/v1/leaderboard", params={"count": "exact"}).status_code == 200
+    answer = client.post(f"/v1/lessons/{LESSON_ID}/questions/{QUESTION_ID}/answer", json={"selected_option_id": WRONG_OPTION_ID})
+    assert answer.json()["hearts_remaining"] == 4
+    complete = client.post(f"/v1/lessons/{LESSON_ID}/complete", json={"accuracy": 100, "time_taken": 30, "mistakes": 0})
+    assert complete.status_code == 200
+
+
+def test_server_timing_lists_each_query(client):
+    response = client.get(f"/v1/lessons/{LESSON_ID}")
+
+    timing = response.headers["server-timing"]
+    assert 'desc="2 queries"' in timing
+    assert 'desc="profiles select"' in timing
+    assert 'desc="lessons select"' in timing
+
+    # The lesson is cached now, so only the profile is read.
+    assert 'desc="1 queries"' in client.get(f"/v1/lessons/{LESSON_ID}").headers["server-timing"]
+
+
+def test_auth_fallback_is_outside_budget(client, monkeypatch):
+    run_sync = repository.run_sync
+
+    async def run_sync_with_auth(fn, *args, **kwargs):
+        if fn.__name__ == "get_user":
+            return SimpleNamespace(user=SimpleNamespace(id=USER_ID))
+        return await run_sync(fn, *args, **kwargs)
+
+    # Without the secret every request checks its token with the auth server.
+    monkeypatch.setattr(repository, "run_sync", run_sync_with_auth)
+    monkeypatch.setattr(verify, "jwt_secret", None)
+
+    test_routes_stay_within_budget(client)
+    timing = client.get(f"/v1/lessons/{LESSON_ID}").headers["server-timing"]
+    assert 'desc="1 queries"' in timing
+    assert 'desc="1 dependency queries"' in timing
+
+
+def test_n_plus_one_fails_budget(monkeypatch):
+    async def run_sync(fn, *args, **kwargs):
+        return FakeResponse([])
+
+    monkeypatch.setattr(repository, "run_sync", run_sync)
+    monkeypatch.setattr(queryLog, "enforce", True)
+
+    app = FastAPI()
+    app.add_middleware(queryLog.QueryLogMiddleware)
+
+    @app.get("/questions")
+    @queryLog.budget(1)
+    async def questions():
+        for question_id in ("a", "b", "c"):
+            await repository.execute(supabase.table("options").select("*").eq("question_id", question_id))
+        return []
+
+    with pytest.raises(queryLog.QueryBudgetExceeded) as error:
+        TestClient(app).get("/questions")
+    assert "made 3 queries (budget 1)" in str(error.value)
+    assert "question_id=eq.b" in str(error.value)
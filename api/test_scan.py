@@ -0,0 +1,71 @@
+import asyncio
+import uuid
+from datetime import date, timedelta
+
+import repository
+from utils import dailyReset, scan
+
+
+ROW_CAP = 7
+
+
+def make_profiles(count: int):
+    return [
+        {"id": str(uuid.UUID(int=i)), "timezone": "UTC" if i % 3 else "Asia/Tokyo", "streak": i % 4, "last_lesson_date": date(2024, 1, 1 + i % 5).isoformat()}
+        for i in range(count)
+    ]
+
+
+def matches(row, filters):
+    tests = {"eq": lambda a, b: a == b, "neq": lambda a, b: a != b, "lt": lambda a, b: a < b, "gt": lambda a, b: a > b, "lte": lambda a, b: a <= b}
+    return all(tests[operator](row[column], value) for operator, column, value in filters)
+
+
+def fake_table(monkeypatch, profiles, requests):
+    async def get_page(table, columns, after_id=None, limit=1000, filters=()):
+        requests.append(limit)
+        rows = [row for row in profiles if (after_id is None or row["id"] > after_id) and matches(row, filters)]
+        # Like PostgREST's max-rows, quietly return fewer rows than asked for.
+        return [dict(row) for row in rows[:min(limit, ROW_CAP)]]
+
+    async def reset_stale_streaks(before, zone, after_id=None, through_id=None):
+        filters = [("eq", "timezone", zone), ("neq", "streak", 0), ("lt", "last_lesson_date", before.isoformat()), ("lte", "id", through_id)]
+        if after_id:
+            filters.append(("gt", "id", after_id))
+        rows = [row for row in profiles if matches(row, filters)]
+        for row in rows:
+            row["streak"] = 0
+        return len(rows)
+
+    monkeypatch.setattr(repository, "get_page", get_page)
+    monkeypatch.setattr(repository, "reset_stale_streaks", reset_stale_streaks)
+
+
+def test_scan_walks_past_row_cap(monkeypatch):
+    profiles = make_profiles(100)
+    requests = []
+    fake_table(monkeypatch, profiles, requests)
+
+    async def collect():
+        return [page async for page in scan.pages("profiles", page_size=10, report_every=0)]
+
+    pages = asyncio.run(collect())
+
+    assert [row["id"] for page in pages for row in page] == [row["id"] for row in profiles]
+    assert max(len(page) for page in pages) <= ROW_CAP
+    assert set(requests) == {10}
+
+
+def test_streak_reset_covers_whole_zone(monkeypatch):
+    profiles = make_profiles(100)
+    fake_table(monkeypatch, profiles, [])
+    monkeypatch.setattr(scan, "PAGE_SIZE", 5)
+    today = date(2024, 1, 5)
+    cutoff = (today - timedelta(days=1)).isoformat()
+
+    expected = sum(1 for row in profiles if row["timezone"] == "UTC" and row["streak"] and row["last_lesson_date"] < cutoff)
+    result = asyncio.run(dailyReset.check_and_reset_streaks("UTC", today))
+
+    assert result["rows_affected"] == expected > 0
+    assert not any(row["timezone"] == "UTC" and row["streak"] and row["last_lesson_date"] < cutoff for row in profiles)
+    assert any(row["timezone"] == "Asia/Tokyo" and row["streak"] and row["last_lesson_date"] < cutoff for row in profiles)
@@ -0,0 +1,178 @@
+import asyncio
+from datetime import date, timedelta
+
+from conftest import connect
+from utils.scheduler import FileLease
+
+
+TODAY = date(2026, 6, 1)
+
+
+def test_file_lease_runs_job_once_per_day(tmp_path):
+    first = FileLease(tmp_path)
+    second = FileLease(tmp_path)
+
+    async def scenario():
+        claimed = [await first.claim("reset_streaks", TODAY), await second.claim("reset_streaks", TODAY)]
+        await first.finish("reset_streaks", TODAY)
+        claimed.append(await second.claim("reset_streaks", TODAY))
+        claimed.append(await second.claim("reset_streaks", TODAY + timedelta(days=1)))
+        return claimed
+
+    assert asyncio.run(scenario()) == [True, False, False, True]
+
+
+def test_file_lease_failed_run_is_retried(tmp_path):
+    lease = FileLease(tmp_path)
+
+    async def scenario():
+        await lease.claim("reset_streaks", TODAY)
+        await lease.finish("reset_streaks", TODAY, completed=False)
+        return await lease.claim("reset_streaks", TODAY)
+
+    assert asyncio.run(scenario()) is True
+
+
+def test_claim_job_elects_one_worker(database):
+    async def scenario():
+        pool = await connect(database, min_size=8, max_size=8)
+        try:
+            claims = await asyncio.gather(*(
+                pool.fetchval("select claim_job('reset_streaks', $1, $2, 60)", TODAY, f"worker-{i}")
+                for i in range(8)
+            ))
+            winner = f"worker-{claims.index(True)}"
+            await pool.execute("select finish_job('reset_streaks', $1, $2)", TODAY, winner)
+            again = await pool.fetchval("select claim_job('reset_streaks', $1, 'worker-late', 60)", TODAY)
+            tomorrow = await pool.fetchval("select claim_job('reset_streaks', $1, 'worker-late', 60)", TODAY + timedelta(days=1))
+            return claims, again, tomorrow
+        finally:
+            await pool.close()
+
+    claims, again, tomorrow = asyncio.run(scenario())
+    assert claims.count(True) == 1
+    assert again is False
+    assert tomorrow is True
+
+
+def test_expired_lease_can_be_taken_over(database):
+    async def scenario():
+        pool = await connect(database, min_size=1, max_size=1)
+        try:
+            crashed = await pool.fetchval("select claim_job('reset_streaks', $1, 'crashed', 0)", TODAY)
+            await asyncio.sleep(0.01)
+            takeover = await pool.fetchval("select claim_job('reset_streaks', $1, 'survivor', 60)", TODAY)
+            return crashed, takeover
+        finally:
+            await pool.close()
+
+    assert asyncio.run(scenario()) == (True, True)
+
+
+def test_rolling_reset_handles_each_zone_once_per_local_day(tmp_path, monkeypatch):
+    import repository
+    from utils import dailyReset, progress, scheduler
+
+    calls = []
+
+    async def get_page(table, columns, after_id=None, limit=1000, filters=()):
+        return [] if after_id else [{"id": "00000000-0000-0000-0000-000000000001"}]
+
+    async def reset_stale_streaks(before, zone, after_id=None, through_id=None):
+        calls.append((zone, before))
+        return 1
+
+    monkeypatch.setattr(dailyReset, "ZONES", ["UTC", "America/New_York", "Asia/Kolkata"])
+    monkeypatch.setattr(repository, "get_page", get_page)
+    monkeypatch.setattr(repository, "reset_stale_streaks", reset_stale_streaks)
+    monkeypatch.setattr(scheduler, "lease", FileLease(tmp_path))
+    monkeypatch.setattr(dailyReset, "handled_on", {})
+    monkeypatch.setattr(dailyReset, "checked_at", None)
+
+    asyncio.run(dailyReset.run_due_resets())
+    asyncio.run(dailyReset.run_due_resets())
+
+    # A second worker with its own memory but the same lease directory.
+    monkeypatch.setattr(dailyReset, "handled_on", {})
+    monkeypatch.setattr(dailyReset, "checked_at", None)
+    asyncio.run(dailyReset.run_due_resets())
+
+    assert sorted(calls) == sorted(
+        (zone, progress.local_today(zone) - timedelta(days=1)) for zone in ("UTC", "America/New_York", "Asia/Kolkata")
+    )
+
+
+def test_zone_held_elsewhere_stays_due_until_it_runs(monkeypatch):
+    from utils import dailyReset, scheduler
+
+    claimable = []
+
+    async def run_once(job, run_on, fn):
+        if job not in claimable:
+            return False
+        await fn()
+        return True
+
+    async def check_and_reset_streaks(zone, local_today):
+        return {"rows_affected": 0, "duration": 0.0}
+
+    monkeypatch.setattr(scheduler, "run_once", run_once)
+    monkeypatch.setattr(dailyReset, "check_and_reset_streaks", check_and_reset_streaks)
+    monkeypatch.setattr(dailyReset, "ZONES", ["UTC"])
+    monkeypatch.setattr(dailyReset, "RETRY_SECONDS", 2 * 86400)
+    monkeypatch.setattr(dailyReset, "handled_on", {})
+    monkeypatch.setattr(dailyReset, "checked_at", None)
+
+    # Another worker holds the lease, then dies; the zone is claimed on a later pass.
+    asyncio.run(dailyReset.run_due_resets())
+    assert dailyReset.handled_on == {}
+    assert dailyReset.due_zones(dailyReset.checked_at) == ["UTC"]
+
+    claimable.append("reset_streaks:UTC")
+    asyncio.run(dailyReset.run_due_resets())
+    assert "UTC" in dailyReset.handled_on
+    assert dailyReset.due_zones(dailyReset.checked_at) == []
+
+
+def test_only_zones_past_recent_midnight_are_due(monkeypatch):
+    from datetime import datetime, timezone
+    from utils import dailyReset, progress
+
+    zones = ["UTC", "Asia/Kolkata", "America/New_York", "Pacific/Auckland"]
+    now = datetime.now(timezone.utc)
+    monkeypatch.setattr(dailyReset, "ZONES", zones)
+    monkeypatch.setattr(dailyReset, "handled_on", {})
+    monkeypatch.setattr(dailyReset, "checked_at", None)
+    assert dailyReset.due_zones(now) == zones
+
+    monkeypatch.setattr(dailyReset, "checked_at", now)
+    since = now - timedelta(seconds=dailyReset.RETRY_SECONDS)
+    assert dailyReset.due_zones(now) == [zone for zone in zones if progress.start_of_local_day(zone) >= since]
+
+
+def test_complete_lesson_uses_local_day(database):
+    import uuid
+    from utils.progress import local_today
+
+    zones = ["Pacific/Kiritimati", "Pacific/Pago_Pago", "UTC"]
+
+    async def scenario():
+        pool = await connect(database, min_size=1, max_size=1)
+        try:
+            lesson_id = await pool.fetchval("insert into lessons (title, order_number) values ('Rules', 1) returning id")
+            dates = {}
+            for index, zone in enumerate(zones):
+                user_id = uuid.uuid4()
+                await pool.execute("insert into auth.users (id) values ($1)", user_id)
+                await pool.execute(
+                    "insert into profiles (id, username, handicap, timezone) values ($1, $2, 0, $3)", user_id, f"tz{index}", zone
+                )
+                row = await pool.fetchrow("select * from complete_lesson($1, $2, 100, 60, 0)", user_id, lesson_id)
+                dates[zone] = row["lesson_date"]
+            return dates
+        finally:
+            await pool.close()
+
+    dates = asyncio.run(scenario())
+    for zone in zones:
+        assert dates[zone] == local_today(zone)
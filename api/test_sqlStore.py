@@ -0,0 +1,221 @@
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta, timezone
+
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+import repository
+from conftest import TEST_SCHEMA
+from connect import jwt_secret
+from fakeSupabase import FakeClient
+from storage.sqlStore import PostgresStore, SqlStore, SqliteStore
+from utils import answerKey, leaderboard, lessonCache, progress, queryLog
+
+
+def ids(prefix: int, count: int):
+    return [str(uuid.UUID(int=(prefix << 64) + i)) for i in range(count)]
+
+
+LESSONS = ids(1, 2)
+QUESTIONS = ids(2, 2)
+OPTIONS = ids(3, 3)
+OLD = datetime(2020, 1, 1, tzinfo=timezone.utc)
+
+
+@pytest.fixture(params=["sqlite", "postgres"])
+def store(request):
+    if request.param == "sqlite":
+        return SqliteStore(":memory:")
+    dsn = request.getfixturevalue("database")
+    return PostgresStore(dsn, server_settings={"search_path": f"{TEST_SCHEMA}, public"})
+
+
+def run(store, body):
+    async def main():
+        await store.open()
+        try:
+            return await body()
+        finally:
+            await store.close()
+    return asyncio.run(main())
+
+
+async def seed(store):
+    await store.insert_rows("lessons", [
+        {"id": LESSONS[0], "title": "Relief", "description": "", "order_number": 1},
+        {"id": LESSONS[1], "title": "Penalties", "description": "", "order_number": 2}
+    ])
+    await store.insert_rows("questions", [
+        {"id": QUESTIONS[1], "lesson_id": LESSONS[0], "question_text": "Second?", "question_order": 2},
+        {"id": QUESTIONS[0], "lesson_id": LESSONS[0], "question_text": "First?", "question_order": 1}
+    ])
+    await store.insert_rows("options", [
+        {"id": OPTIONS[1], "question_id": QUESTIONS[0], "option_text": "No", "is_correct": False, "option_order": 2},
+        {"id": OPTIONS[0], "question_id": QUESTIONS[0], "option_text": "Yes", "is_correct": True, "option_order": 1},
+        {"id": OPTIONS[2], "question_id": QUESTIONS[1], "option_text": "Yes", "is_correct": True, "option_order": 1}
+    ])
+
+
+async def add_profile(store, user_id: str, **values):
+    if isinstance(store, PostgresStore):
+        await store.fetch("auth", "insert", "insert into auth.users (id) values (?) on conflict do nothing", user_id)
+    profile = {"id": user_id, "username": values.pop("username", user_id[-6:]), "handicap": 10, **values}
+    return (await store.insert_profile(profile))[0]
+
+
+def test_incomplete_store_fails_when_created():
+    class NoCountStore(SqlStore):
+        async def fetch(self, target: str, operation: str, sql: str, *args) -> list:
+            return []
+
+    with pytest.raises(TypeError, match="execute_count"):
+        NoCountStore()
+
+
+def test_profiles_round_trip(store):
+    user_id = ids(4, 1)[0]
+
+    async def body():
+        inserted = await add_profile(store, user_id, username="alice", timezone="Asia/Tokyo")
+        assert inserted["hearts"] == 5 and inserted["progress_bitmap"] == "\\x"
+
+        assert await store.get_profile(user_id, "hearts, timezone") == {"hearts": 5, "timezone": "Asia/Tokyo"}
+        assert await store.username_exists("alice")
+        assert not await store.username_exists("bob")
+        assert await store.get_profile(ids(4, 2)[1]) is None
+
+        await store.update_profile(user_id, {"xp": 40, "last_lesson_date": "2024-03-01"})
+        profile = await store.get_profile(user_id)
+        assert (profile["xp"], profile["last_lesson_date"]) == (40, "2024-03-01")
+
+        with pytest.raises(ValueError):
+            await store.get_profile(user_id, "hearts; drop table profiles")
+
+    run(store, body)
+
+
+def test_updates_touch_updated_at(store):
+    user_id = ids(4, 1)[0]
+
+    async def body():
+        await add_profile(store, user_id, updated_at=OLD)
+        await store.decrement_hearts(user_id)
+        after_decrement = (await store.get_profile(user_id, "updated_at"))["updated_at"]
+        assert not after_decrement.startswith("2020")
+
+        await store.update_profile(user_id, {"updated_at": OLD, "xp": 10})
+        updated_at = (await store.get_profile(user_id, "updated_at"))["updated_at"]
+        assert not updated_at.startswith("2020")
+
+        # What the leaderboard refresh asks for: rows updated after a stamp it read.
+        since = datetime.fromisoformat(updated_at) - timedelta(seconds=1)
+        assert await store.get_page("profiles", "id", None, 10, (("gt", "updated_at", since.isoformat()),)) == [{"id": user_id}]
+        assert await store.get_page("profiles", "id", None, 10, (("gt", "updated_at", updated_at),)) == []
+
+    run(store, body)
+
+
+def test_lesson_content_hearts_and_completion(store):
+    user_id = ids(4, 1)[0]
+
+    async def body():
+        await seed(store)
+        await add_profile(store, user_id)
+
+        lesson = await store.get_lesson_content(LESSONS[0])
+        assert [question["id"] for question in lesson["questions"]] == QUESTIONS
+        assert [option["id"] for option in lesson["questions"][0]["options"]] == OPTIONS[:2]
+        assert lesson["questions"][0]["options"][0]["is_correct"] is True
+        assert (await store.get_lesson_content(LESSONS[1]))["questions"] == []
+        assert await store.get_lesson_content(ids(1, 3)[2]) is None
+
+        key = await store.get_answer_key()
+        assert sorted(option["id"] for lesson in key for question in lesson["questions"] for option in question["options"]) == sorted(OPTIONS)
+
+        assert [await store.decrement_hearts(user_id) for _ in range(6)] == [4, 3, 2, 1, 0, 0]
+        assert await store.decrement_hearts(ids(4, 2)[1]) is None
+
+        result = await store.complete_lesson(user_id, LESSONS[0], 90.5, 60, 2)
+        assert (result["xp_earned"], result["new_streak"], result["total_xp"]) == (90, 1, 90)
+        profile = await store.get_profile(user_id, "streak, progress_bitmap")
+        assert progress.decode_bitmap(profile["progress_bitmap"]) == 0b10
+        assert await store.complete_lesson(ids(4, 2)[1], LESSONS[0], 100, 30, 0) is None
+
+    run(store, body)
+
+
+def test_leaderboard_pages_and_maintenance_scan(store):
+    users = ids(5, 30)
+    yesterday = date.today() - timedelta(days=1)
+
+    async def body():
+        for i, user_id in enumerate(users):
+            await add_profile(store, user_id, xp=(i % 7) * 100, streak=i % 3, last_lesson_date=date(2024, 1, 1 + i % 5), timezone="UTC" if i % 2 else "Europe/Paris")
+
+        ranked = await store.get_leaderboard(0, 30, "id, xp")
+        assert [row["id"] for row in ranked] == [row["id"] for row in sorted(ranked, key=lambda row: (-row["xp"], row["id"]))]
+        assert await store.count_profiles() == 30
+
+        after = await store.get_leaderboard_after(ranked[9]["xp"], ranked[9]["id"], 10, "id")
+        assert [row["id"] for row in after] == [row["id"] for row in ranked[10:20]]
+
+        filters = (("eq", "timezone", "UTC"), ("neq", "streak", 0), ("lt", "last_lesson_date", "2024-01-04"))
+        page = await store.get_page("profiles", "id", None, 100, filters)
+        expected = [user_id for i, user_id in enumerate(users) if i % 2 and i % 3 and 1 + i % 5 < 4]
+        assert [row["id"] for row in page] == expected
+
+        reset = await store.reset_stale_streaks(date(2024, 1, 4), "UTC", None, expected[len(expected) // 2])
+        assert reset == len(expected) // 2 + 1
+        assert await store.reset_stale_streaks(yesterday, "UTC") == len([i for i in range(30) if i % 2 and i % 3]) - reset
+
+        with pytest.raises(ValueError):
+            await store.get_page("auth.users", "id")
+
+    run(store, body)
+
+
+def test_job_claims(store):
+    today = date.today()
+
+    async def body():
+        assert await store.claim_job("reset_streaks:UTC", today, "worker-1", 60)
+        assert not await store.claim_job("reset_streaks:UTC", today, "worker-2", 60)
+        await store.finish_job("reset_streaks:UTC", today, "worker-1")
+        assert not await store.claim_job("reset_streaks:UTC", today, "worker-2", 60)
+        assert await store.claim_job("reset_streaks:UTC", today + timedelta(days=1), "worker-2", 60)
+
+    run(store, body)
+
+
+def test_full_flow_on_sqlite(monkeypatch, tmp_path):
+    store = SqliteStore(str(tmp_path / "ruleshot.db"))
+    fake = FakeClient(jwt_secret=jwt_secret)
+
+    async def prepare():
+        await store.open()
+        await seed(store)
+
+    asyncio.run(prepare())
+    monkeypatch.setattr(repository, "supabase", fake)
+    monkeypatch.setattr(repository, "store", store)
+    monkeypatch.setattr(queryLog, "enforce", True)
+    monkeypatch.setattr(leaderboard, "loaded", False)
+    monkeypatch.setattr(answerKey, "version", None)
+    lessonCache.invalidate()
+    client = TestClient(main.app)
+
+    assert client.post("/v1/signup", json={"email": "sql@example.com", "password": "Password123!", "username": "sql", "handicap": 3}).status_code == 200
+    signin = client.post("/v1/signin", json={"email": "sql@example.com", "password": "Password123!"}).json()
+    client.headers["Authorization"] = f"Bearer {signin['session']['access_token']}"
+
+    assert client.get("/v1/dashboard").json()["next_lesson"]["id"] == LESSONS[0]
+    assert client.get(f"/v1/lessons/{LESSONS[0]}").json()["hearts"] == 5
+    wrong = client.post(f"/v1/lessons/{LESSONS[0]}/questions/{QUESTIONS[0]}/answer", json={"selected_option_id": OPTIONS[1]}).json()
+    assert wrong["hearts_remaining"] == 4
+    assert client.post(f"/v1/lessons/{LESSONS[0]}/complete", json={"accuracy": 50, "time_taken": 40, "mistakes": 1}).json()["total_xp"] == 95
+
+    dashboard = client.get("/v1/dashboard").json()
+    assert dashboard["next_lesson"]["id"] == LESSONS[1]
+    assert client.get("/v1/leaderboard").json()["leaderboard"][0]["username"] == "sql"
@@ -0,0 +1,52 @@
+import asyncio
+import time
+
+import jwt
+import pytest
+from fastapi import HTTPException
+
+from auth.verify import verify_token
+from connect import jwt_secret
+
+
+def make_token(**overrides):
+    claims = {
+        "sub": "3f1c2a4e-0000-4000-8000-000000000001",
+        "aud": "authenticated",
+        "role": "authenticated",
+        "exp": int(time.time()) + 3600
+    }
+    claims.update(overrides)
+    return jwt.encode(claims, jwt_secret, algorithm="HS256")
+
+
+def test_valid_token_verified_locally():
+    claims = asyncio.run(verify_token(make_token()))
+    assert claims["sub"] == "3f1c2a4e-0000-4000-8000-000000000001"
+
+
+def test_expired_token_rejected():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(verify_token(make_token(exp=int(time.time()) - 60)))
+    assert error.value.status_code == 401
+    assert "expired" in error.value.detail
+
+
+def test_wrong_audience_rejected():
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(verify_token(make_token(aud="anon-client")))
+    assert error.value.status_code == 401
+
+
+def test_bad_signature_rejected():
+    token = jwt.encode({"sub": "x", "aud": "authenticated", "exp": int(time.time()) + 60}, "another-secret-with-at-least-32-bytes", algorithm="HS256")
+    with pytest.raises(HTTPException) as error:
+        asyncio.run(verify_token(token))
+    assert error.value.status_code == 401
+
+
+def test_unknown_signing_key_is_undecided():
+    ec = pytest.importorskip("cryptography.hazmat.primitives.asymmetric.ec")
+    private_key = ec.generate_private_key(ec.SECP256R1())
+    token = jwt.encode({"sub": "x", "aud": "authenticated", "exp": int(time.time()) + 60}, private_key, algorithm="ES256", headers={"kid": "rotated-key"})
+    assert asyncio.run(verify_token(token)) is None
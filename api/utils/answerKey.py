@@ -0,0 +1,82 @@
+"""
+In-memory answer key for grading.
+
+Maps option_id -> (question_id, lesson_id, is_correct) and question_id -> the
+correct option, so submitAnswer can grade with a dict lookup. The key is
+loaded at startup and rebuilt whenever the lesson content version changes.
+"""
+import asyncio
+import time
+
+import repository
+from utils import lessonCache
+
+
+RELOAD_ON_MISS_SECONDS = 60
+
+
+class AnswerOption:
+    __slots__ = ("question_id", "lesson_id", "is_correct")
+
+    def __init__(self, question_id: str, lesson_id: str, is_correct: bool):
+        self.question_id = question_id
+        self.lesson_id = lesson_id
+        self.is_correct = is_correct
+
+
+options = {}
+correct_options = {}
+
+version = None
+loaded_at = 0.0
+lock = asyncio.Lock()
+
+
+async def load():
+    global options, correct_options, version, loaded_at
+
+    load_version = lessonCache.content_version
+    lessons = await repository.get_answer_key()
+
+    new_options = {}
+    new_correct_options = {}
+    for lesson in lessons:
+        for question in lesson.get("questions") or []:
+            for option in question.get("options") or []:
+                new_options[option["id"]] = AnswerOption(question["id"], lesson["id"], option["is_correct"])
+                if option["is_correct"]:
+                    new_correct_options[question["id"]] = option
+
+    options = new_options
+    correct_options = new_correct_options
+    version = load_version
+    loaded_at = time.monotonic()
+    print(f"Answer key loaded: {len(options)} options, {len(correct_options)} questions")
+
+
+async def reload(force: bool = False):
+    stale_loaded_at = loaded_at
+    async with lock:
+        # Another request may have reloaded while we waited for the lock;
+        # its key is as fresh as the one we would load.
+        if loaded_at != stale_loaded_at:
+            return
+        if force or version != lessonCache.content_version:
+            await load()
+
+
+async def lookup(option_id: str) -> AnswerOption:
+    if version != lessonCache.content_version:
+        await reload()
+
+    option = options.get(option_id)
+    if option is None and time.monotonic() - loaded_at > RELOAD_ON_MISS_SECONDS:
+        # Content may have been added since the last load.
+        await reload(force=True)
+        option = options.get(option_id)
+
+    return option
+
+
+def correct_option(question_id: str):
+    return correct_options.get(question_id)
@@ -0,0 +1,164 @@
+"""
+Negotiated response compression.
+
+CompressionMiddleware compresses JSON and text responses of at least
+MINIMUM_SIZE bytes with the best encoding the client accepts: brotli
+(Brotli is in requirements.txt) or gzip; an install without brotli falls
+back to gzip alone. Smaller bodies are sent as they are, since the headers
+and CPU outweigh the saving.
+
+Responses that already carry a Content-Encoding pass through untouched.
+The lesson route relies on this: lessonCache compresses each lesson body
+once per encoding at a higher level and serves those bytes directly.
+"""
+import gzip
+import os
+import time
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from utils import metrics
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+MINIMUM_SIZE = int(os.getenv("COMPRESSION_MINIMUM_SIZE", "1024"))
+
+# Preferred first when the client weights them equally.
+ENCODINGS = ("br", "gzip") if brotli else ("gzip",)
+
+# Levels for per-request compression, and for bodies compressed once and cached.
+LEVELS = {"br": 4, "gzip": 6}
+CACHED_LEVELS = {"br": 11, "gzip": 9}
+
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+bytes_in = metrics.Counter(
+    "ruleshot_compression_input_bytes_total",
+    "Response bytes before compression, by encoding.",
+    ("encoding",)
+)
+bytes_out = metrics.Counter(
+    "ruleshot_compression_output_bytes_total",
+    "Response bytes after compression, by encoding.",
+    ("encoding",)
+)
+cpu_seconds = metrics.Counter(
+    "ruleshot_compression_seconds_total",
+    "Time spent compressing responses, by encoding.",
+    ("encoding",)
+)
+
+
+@metrics.register
+def collect_metrics():
+    for counter in (bytes_in, bytes_out, cpu_seconds):
+        yield from counter.render()
+
+
+def negotiate(accept_encoding: str):
+    """The encoding to use for an Accept-Encoding header, or None to send the body as is."""
+    if not accept_encoding:
+        return None
+
+    weights = {}
+    for part in accept_encoding.split(","):
+        name, _, parameters = part.partition(";")
+        weight = 1.0
+        parameters = parameters.strip()
+        if parameters.startswith("q="):
+            try:
+                weight = float(parameters[2:])
+            except ValueError:
+                weight = 0.0
+        weights[name.strip().lower()] = weight
+
+    best, best_weight = None, 0.0
+    for encoding in ENCODINGS:
+        weight = weights.get(encoding, weights.get("*", 0.0))
+        if weight > best_weight:
+            best, best_weight = encoding, weight
+    return best
+
+
+def compress(body: bytes, encoding: str, level: int = None) -> bytes:
+    level = LEVELS[encoding] if level is None else level
+    start = time.perf_counter()
+    if encoding == "br":
+        compressed = brotli.compress(body, quality=level)
+    else:
+        # mtime=0 keeps the output identical for identical bodies.
+        compressed = gzip.compress(body, compresslevel=level, mtime=0)
+    cpu_seconds.inc((encoding,), time.perf_counter() - start)
+    bytes_in.inc((encoding,), len(body))
+    bytes_out.inc((encoding,), len(compressed))
+    return compressed
+
+
+def is_compressible(headers: Headers) -> bool:
+    content_type = headers.get("content-type", "")
+    return "content-encoding" not in headers and content_type.startswith(COMPRESSIBLE_TYPES)
+
+
+class CompressionMiddleware:
+    """ASGI middleware compressing responses of at least minimum_size bytes.
+
+    Compressible responses are buffered until their last body chunk, so
+    Content-Length can be set on the compressed body. Anything else is
+    forwarded chunk by chunk.
+    """
+
+    def __init__(self, app, minimum_size: int = None):
+        self.app = app
+        self.minimum_size = MINIMUM_SIZE if minimum_size is None else minimum_size
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        encoding = negotiate(Headers(scope=scope).get("accept-encoding"))
+        if encoding is None:
+            await self.app(scope, receive, send)
+            return
+
+        start_message = None
+        chunks = []
+        passthrough = False
+
+        async def compressing_send(message):
+            nonlocal start_message, passthrough
+            if passthrough:
+                await send(message)
+                return
+
+            if message["type"] == "http.response.start":
+                if not is_compressible(Headers(raw=message["headers"])):
+                    passthrough = True
+                    await send(message)
+                    return
+                start_message = message
+                return
+
+            if message["type"] != "http.response.body":
+                await send(message)
+                return
+
+            chunks.append(message.get("body", b""))
+            if message.get("more_body", False):
+                return
+
+            body = b"".join(chunks)
+            headers = MutableHeaders(raw=start_message["headers"])
+            headers.add_vary_header("Accept-Encoding")
+            if len(body) >= self.minimum_size:
+                body = compress(body, encoding)
+                headers["Content-Encoding"] = encoding
+                headers["Content-Length"] = str(len(body))
+            await send(start_message)
+            await send({"type": "http.response.body", "body": body})
+
+        await self.app(scope, receive, compressing_send)
@@ -0,0 +1,50 @@
+"""
+Conditional GET: ETag / If-None-Match and Last-Modified / If-Modified-Since.
+
+Routes compute their validator from state they already hold (the lesson
+cache, the leaderboard index, the profile row) and answer 304 Not Modified
+with no body when the client's copy is still current.
+"""
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+
+from fastapi import Response
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    """If-None-Match uses the weak comparison: W/"x" matches "x"."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+    return etag.removeprefix("W/") in candidates
+
+
+def http_date(moment: datetime) -> str:
+    return format_datetime(moment.astimezone(timezone.utc), usegmt=True)
+
+
+def not_modified_since(if_modified_since: str, last_modified: datetime) -> bool:
+    if not if_modified_since:
+        return False
+    try:
+        since = parsedate_to_datetime(if_modified_since)
+    except (TypeError, ValueError):
+        return False
+    if since.tzinfo is None:
+        return False
+    return last_modified.replace(microsecond=0) <= since
+
+
+def is_settled(last_modified: datetime) -> bool:
+    """Whether last_modified can be sent as a validator.
+
+    HTTP dates have one-second resolution, so a change later in the same
+    second would carry the same Last-Modified and never reach the client.
+    """
+    return last_modified.replace(microsecond=0) < datetime.now(timezone.utc).replace(microsecond=0)
+
+
+def not_modified(headers: dict) -> Response:
+    return Response(status_code=304, headers=headers)
@@ -1,45 +1,96 @@
-from connect import supabase
+import repository
 from datetime import datetime, timezone, timedelta
+from functools import partial
+from zoneinfo import available_timezones
+from utils import progress, scan, scheduler
 import asyncio
+import time
 
 
-async def reset_hearts_daily():
-    try:
-        supabase.table("profiles").update({"hearts": 5}).neq("hearts", 5).execute()
-        print(f"Hearts reset completed at {datetime.now(timezone.utc)}")
-    except Exception as e:
-        print(f"Error resetting hearts: {e}")
-
-
-async def check_and_reset_streaks():
-    try:
-        today = datetime.now(timezone.utc).date()
-        yesterday = today - timedelta(days=1)
-        
-        profiles = supabase.table("profiles").select("id, streak, last_lesson_date, streak_freezes_used").execute()
-        
-        for profile in profiles.data if profiles.data else []:
-            last_lesson_date = profile.get("last_lesson_date")
-            
-            if last_lesson_date:
-                last_date = datetime.fromisoformat(str(last_lesson_date)).date()
-                
-                if last_date < yesterday:
-                    supabase.table("profiles").update({
-                        "streak": 0
-                    }).eq("id", profile["id"]).execute()
-        
-        print(f"Streak check completed at {datetime.now(timezone.utc)}")
-    except Exception as e:
-        print(f"Error checking streaks: {e}")
+CHECK_INTERVAL_MINUTES = 15
+
+# Every zone a profile can be in: signup only accepts names zoneinfo knows.
+ZONES = sorted(available_timezones() | {progress.DEFAULT_TIMEZONE})
+
+# A zone another worker claimed stays due this long after its midnight, so
+# it is picked up again if that worker dies before finishing.
+RETRY_SECONDS = scheduler.LEASE_SECONDS + CHECK_INTERVAL_MINUTES * 60
+
+# Local date each time zone was last handled by this worker, so a zone is
+# only claimed once per local day.
+handled_on = {}
+
+# When this worker last looked for due zones; None before its first pass.
+checked_at = None
+
+
+async def check_and_reset_streaks(zone: str, local_today):
+    # Streaks already expire when served (progress.effective_streak) and are
+    # persisted by the next completion. This only writes the resets back so
+    # the stored column is accurate for anything that reads it directly.
+    # The zone is walked one id page at a time and each page's range is
+    # reset in its own statement, so no request or transaction grows with
+    # the table.
+    yesterday = local_today - timedelta(days=1)
+    filters = (
+        ("eq", "timezone", zone),
+        ("neq", "streak", 0),
+        ("lt", "last_lesson_date", yesterday.isoformat())
+    )
+
+    start = time.perf_counter()
+    reset = 0
+    after_id = None
+    async for page in scan.pages("profiles", "id", filters, label=f"Streak check for {zone}"):
+        through_id = page[-1]["id"]
+        reset += await repository.reset_stale_streaks(yesterday, zone, after_id, through_id)
+        after_id = through_id
+    duration = time.perf_counter() - start
+
+    print(f"Streak check for {zone} ({local_today}) completed: {reset} streaks reset in {duration:.2f}s")
+    return {"rows_affected": reset, "duration": duration}
+
+
+def due_zones(now: datetime) -> list:
+    """Zones whose local day began since this worker last handled them.
+
+    The first pass considers every zone, catching up on runs missed while no
+    worker was alive. After that only zones whose midnight fell within
+    RETRY_SECONDS are due; anything older is covered by the next day's run.
+    """
+    since = None if checked_at is None else now - timedelta(seconds=RETRY_SECONDS)
+    due = []
+    for zone in ZONES:
+        if handled_on.get(zone) == progress.local_today(zone):
+            continue
+        if since is not None and progress.start_of_local_day(zone) < since:
+            continue
+        due.append(zone)
+    return due
+
+
+async def run_due_resets():
+    """Reset streaks in every time zone that has crossed local midnight since its last run."""
+    global checked_at
+
+    now = datetime.now(timezone.utc)
+    for zone in due_zones(now):
+        local_today = progress.local_today(zone)
+        try:
+            if await scheduler.run_once(f"reset_streaks:{zone}", local_today, partial(check_and_reset_streaks, zone, local_today)):
+                handled_on[zone] = local_today
+        except Exception as e:
+            print(f"Error resetting streaks for {zone}: {e}")
+    checked_at = now
 
 
 async def daily_reset_task():
+    # Zones cross midnight on the hour, half hour or quarter hour, so waking
+    # every 15 minutes spreads the work in small batches over the whole day.
+    # The first pass also catches up on runs missed while no worker was alive.
     while True:
+        await run_due_resets()
+
         now = datetime.now(timezone.utc)
-        tomorrow = (now + timedelta(days=1)).replace(hour=0, minute=0, second=0, microsecond=0)
-        seconds_until_midnight = (tomorrow - now).total_seconds()
-        
-        await asyncio.sleep(seconds_until_midnight)
-        await reset_hearts_daily()
-        await check_and_reset_streaks()
\ No newline at end of file
+        next_check = now.replace(second=0, microsecond=0) + timedelta(minutes=CHECK_INTERVAL_MINUTES - now.minute % CHECK_INTERVAL_MINUTES)
+        await asyncio.sleep((next_check - now).total_seconds())
\ No newline at end of file
@@ -0,0 +1,208 @@
+"""
+In-process ranked leaderboard.
+
+Profiles are kept in a SortedList keyed by (-xp, id), so page-N, top-K and
+rank-of-user queries are O(log n) without touching the database. The index
+is loaded at startup and updated by signup and completeLesson in this
+worker. Every REFRESH_SECONDS it reads the profiles whose updated_at moved
+since the last read, to pick up changes made by other workers; a full
+reload every FULL_RELOAD_SECONDS drops deleted profiles. Streaks are stored
+as loaded and expired when served (see progress.effective_streak).
+
+Every change bumps generation, which with INSTANCE (distinct per process,
+so workers and restarts never share a tag) makes the weak ETag served
+with leaderboard pages.
+"""
+import asyncio
+import os
+import secrets
+import time
+from datetime import datetime, timedelta
+
+from sortedcontainers import SortedList
+
+from utils import progress, scan
+
+
+REFRESH_SECONDS = int(os.getenv("LEADERBOARD_REFRESH_SECONDS", "300"))
+FULL_RELOAD_SECONDS = int(os.getenv("LEADERBOARD_FULL_RELOAD_SECONDS", "21600"))
+PAGE_SIZE = 1000
+ENTRY_COLUMNS = ("id", "username", "xp", "streak", "handicap", "last_lesson_date", "timezone")
+COLUMNS = ", ".join(ENTRY_COLUMNS + ("updated_at",))
+
+# updated_at is the updating transaction's start time, so a row can commit
+# after a refresh with an earlier stamp. Each refresh re-reads this far back.
+UPDATE_SLACK_SECONDS = 60
+
+entries = {}
+ranking = SortedList()
+loaded = False
+
+# Changes upserted while load() or refresh() is scanning, by id; None otherwise.
+pending = None
+
+# Latest profiles.updated_at read, and when the last full load finished.
+updated_through = None
+full_loaded_at = 0.0
+
+INSTANCE = secrets.token_hex(4)
+generation = 0
+changed_at = 0.0
+
+
+def rank_key(entry: dict):
+    return (-entry["xp"], entry["id"])
+
+
+def changed():
+    global generation, changed_at
+    generation += 1
+    changed_at = time.time()
+
+
+def entry_of(row: dict) -> dict:
+    return {column: row.get(column) for column in ENTRY_COLUMNS}
+
+
+def latest(stamp, row: dict):
+    if row.get("updated_at") and (stamp is None or row["updated_at"] > stamp):
+        return row["updated_at"]
+    return stamp
+
+
+async def load():
+    global entries, ranking, loaded, pending, updated_through, full_loaded_at
+
+    pending = {}
+    try:
+        new_entries = {}
+        stamp = None
+        async for row in scan.rows("profiles", COLUMNS, page_size=PAGE_SIZE, label="Leaderboard load"):
+            new_entries[row["id"]] = entry_of(row)
+            stamp = latest(stamp, row)
+
+        # Pages scanned before an upsert landed don't have it; apply it again.
+        for user_id, changes in pending.items():
+            base = new_entries.get(user_id) or entries.get(user_id, {})
+            new_entries[user_id] = entry_of({**base, **changes})
+    finally:
+        pending = None
+
+    # A periodic refresh that finds nothing new keeps clients' ETags valid.
+    if new_entries != entries or not loaded:
+        changed()
+    entries = new_entries
+    ranking = SortedList(rank_key(entry) for entry in new_entries.values())
+    loaded = True
+    updated_through = stamp
+    full_loaded_at = time.monotonic()
+    print(f"Leaderboard loaded: {len(entries)} profiles")
+
+
+async def refresh():
+    """Apply the profiles updated since the last load or refresh."""
+    global pending, updated_through
+
+    if updated_through is None:
+        await load()
+        return
+
+    since = datetime.fromisoformat(updated_through) - timedelta(seconds=UPDATE_SLACK_SECONDS)
+    pending = {}
+    try:
+        rows = []
+        stamp = updated_through
+        async for row in scan.rows("profiles", COLUMNS, (("gt", "updated_at", since.isoformat()),), PAGE_SIZE, "Leaderboard refresh"):
+            rows.append(row)
+            stamp = latest(stamp, row)
+
+        # A change upserted here while the scan ran is newer than what it read.
+        fresh = [entry_of(row) for row in rows if row["id"] not in pending]
+    finally:
+        pending = None
+
+    for entry in fresh:
+        if entries.get(entry["id"]) != entry:
+            upsert(entry)
+    updated_through = stamp
+
+
+async def refresh_task():
+    while True:
+        await asyncio.sleep(REFRESH_SECONDS)
+        try:
+            if time.monotonic() - full_loaded_at >= FULL_RELOAD_SECONDS:
+                await load()
+            else:
+                await refresh()
+        except Exception as e:
+            print(f"Error refreshing leaderboard: {e}")
+
+
+def upsert(profile: dict):
+    if pending is not None:
+        pending[profile["id"]] = {**pending.get(profile["id"], {}), **profile}
+
+    old = entries.get(profile["id"])
+    if old is not None:
+        ranking.discard(rank_key(old))
+        profile = {**old, **profile}
+
+    entry = entry_of(profile)
+    entries[entry["id"]] = entry
+    ranking.add(rank_key(entry))
+    changed()
+
+
+def update(user_id: str, **changes):
+    if user_id in entries:
+        upsert({"id": user_id, **changes})
+
+
+def etag() -> str:
+    """Weak ETag for anything served from the index.
+
+    Streaks expire at local midnight without any change to the index, and
+    midnight falls on a quarter hour in every time zone, so the current
+    quarter hour is part of the tag.
+    """
+    return f'W/"{INSTANCE}.{generation}.{int(time.time() // 900)}"'
+
+
+def total() -> int:
+    return len(ranking)
+
+
+def present(row: dict, columns):
+    """A leaderboard row as served: requested columns only, streak expired lazily."""
+    served = {column: row[column] for column in columns}
+    if "streak" in served:
+        today = progress.local_today(row.get("timezone"))
+        served["streak"] = progress.effective_streak(row["streak"], row.get("last_lesson_date"), today)
+    return served
+
+
+def page(offset: int, limit: int, columns=("username", "xp", "streak", "handicap")):
+    return [present(entries[user_id], columns) for _, user_id in ranking.islice(offset, offset + limit)]
+
+
+def top(k: int, columns=("username", "xp", "streak")):
+    return page(0, k, columns)
+
+
+def position_after(xp: int, user_id: str) -> int:
+    """Index of the first entry ranked below (xp, user_id)."""
+    return ranking.bisect_right((-xp, user_id))
+
+
+def key_at(index: int):
+    negative_xp, user_id = ranking[index]
+    return -negative_xp, user_id
+
+
+def rank(user_id: str):
+    """1-based rank of a user, or None if they aren't on the leaderboard."""
+    entry = entries.get(user_id)
+    if entry is None:
+        return None
+    return ranking.index(rank_key(entry)) + 1
@@ -0,0 +1,155 @@
+"""
+In-process cache for lesson content.
+
+Lessons, questions and options only change when content is re-seeded, so the
+nested lesson is fetched once and kept together with its serialized JSON.
+The lesson catalog (every lesson's summary, keyed by order_number) is cached
+the same way. Every entry is tagged with the content version it was loaded
+under; calling invalidate() bumps the version (or drops one lesson) and the
+next request reloads it.
+
+Compressed responses are cached on the entry too, per encoding and hearts
+count (the only part of the lesson response that varies by user), so a hot
+lesson is compressed a handful of times per content version rather than on
+every request.
+
+The strong ETag of a lesson response is a hash of the lesson body plus the
+hearts count and encoding, so it is the same in every worker and changes
+exactly when the bytes sent would.
+"""
+import asyncio
+import hashlib
+import time
+
+import orjson
+
+import repository
+from utils import compression, metrics
+
+
+content_version = 1
+
+entries = {}
+pending = {}
+lesson_catalog = None
+
+hits = 0
+misses = 0
+
+
+class CachedLesson:
+    __slots__ = ("version", "lesson", "body", "digest", "compressed")
+
+    def __init__(self, version: int, lesson: dict):
+        self.version = version
+        self.lesson = lesson
+        self.body = orjson.dumps(lesson)
+        self.digest = hashlib.blake2b(self.body, digest_size=12).hexdigest()
+        # (encoding, hearts) -> compressed response body
+        self.compressed = {}
+
+    def response_body(self, hearts: int) -> bytes:
+        return b'{"lesson":' + self.body + b',"hearts":' + str(hearts).encode() + b'}'
+
+    def etag(self, hearts: int, encoding: str = None) -> str:
+        suffix = f".{encoding}" if encoding else ""
+        return f'"{self.digest}.{hearts}{suffix}"'
+
+    def compressed_body(self, hearts: int, encoding: str) -> bytes:
+        key = (encoding, hearts)
+        body = self.compressed.get(key)
+        if body is None:
+            body = compression.compress(self.response_body(hearts), encoding, compression.CACHED_LEVELS[encoding])
+            self.compressed[key] = body
+        return body
+
+
+class LessonCatalog:
+    __slots__ = ("version", "by_order", "mask", "loaded_at")
+
+    def __init__(self, version: int, lessons: list):
+        self.version = version
+        self.loaded_at = time.time()
+        self.by_order = {lesson["order_number"]: lesson for lesson in lessons}
+        # Bit n set for every order_number n in the catalog.
+        self.mask = 0
+        for order_number in self.by_order:
+            self.mask |= 1 << order_number
+
+
+async def load(lesson_id: str) -> CachedLesson:
+    version = content_version
+    lesson = await repository.get_lesson_content(lesson_id)
+    if not lesson:
+        return None
+
+    cached = CachedLesson(version, lesson)
+    if version == content_version:
+        entries[lesson_id] = cached
+    return cached
+
+
+async def get(lesson_id: str) -> CachedLesson:
+    global hits, misses
+
+    cached = entries.get(lesson_id)
+    if cached and cached.version == content_version:
+        hits += 1
+        return cached
+
+    misses += 1
+
+    # Concurrent misses for the same lesson share one database call.
+    task = pending.get(lesson_id)
+    if task is None:
+        task = asyncio.ensure_future(load(lesson_id))
+        pending[lesson_id] = task
+        task.add_done_callback(lambda _: pending.pop(lesson_id, None))
+
+    return await asyncio.shield(task)
+
+
+async def catalog() -> LessonCatalog:
+    global lesson_catalog
+
+    cached = lesson_catalog
+    if cached and cached.version == content_version:
+        return cached
+
+    version = content_version
+    cached = LessonCatalog(version, await repository.get_lessons())
+    if version == content_version:
+        lesson_catalog = cached
+    return cached
+
+
+def invalidate(lesson_id: str = None):
+    global content_version, lesson_catalog
+
+    if lesson_id is None:
+        content_version += 1
+        entries.clear()
+        lesson_catalog = None
+    else:
+        entries.pop(lesson_id, None)
+
+
+def stats() -> dict:
+    lookups = hits + misses
+    return {
+        "content_version": content_version,
+        "entries": len(entries),
+        "hits": hits,
+        "misses": misses,
+        "hit_ratio": hits / lookups if lookups else 0.0
+    }
+
+
+@metrics.register
+def collect_metrics():
+    yield "# TYPE ruleshot_lesson_cache_hits_total counter"
+    yield f"ruleshot_lesson_cache_hits_total {hits}"
+    yield "# TYPE ruleshot_lesson_cache_misses_total counter"
+    yield f"ruleshot_lesson_cache_misses_total {misses}"
+    yield "# TYPE ruleshot_lesson_cache_entries gauge"
+    yield f"ruleshot_lesson_cache_entries {len(entries)}"
@@ -0,0 +1,173 @@
+"""
+Prometheus metrics for the API.
+
+Request counts and latency are recorded per route template by
+MetricsMiddleware, and latency of every storage call per table and
+operation by track(). Everything is recorded on the event loop thread,
+so the counters are plain lists and dicts with no locking. They are per
+process: with several workers, each one serves its own numbers.
+
+render() returns the Prometheus text exposition format served at /metrics.
+"""
+import time
+from bisect import bisect_left
+
+from utils import queryLog
+
+
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+class Counter:
+    def __init__(self, name: str, help: str, labels: tuple):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.values = {}
+
+    def inc(self, label_values: tuple, amount: float = 1):
+        self.values[label_values] = self.values.get(label_values, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for label_values, value in sorted(self.values.items()):
+            yield f"{self.name}{format_labels(self.labels, label_values)} {value}"
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, labels: tuple, buckets: tuple = BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = buckets
+        # label values -> [count per bucket (last is +Inf), sum]
+        self.series = {}
+
+    def observe(self, label_values: tuple, seconds: float):
+        series = self.series.get(label_values)
+        if series is None:
+            series = self.series[label_values] = [[0] * (len(self.buckets) + 1), 0.0]
+        series[0][bisect_left(self.buckets, seconds)] += 1
+        series[1] += seconds
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for label_values, (counts, total) in sorted(self.series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ("+Inf",), counts):
+                cumulative += count
+                labels = format_labels(self.labels + ("le",), label_values + (str(bound),))
+                yield f"{self.name}_bucket{labels} {cumulative}"
+            labels = format_labels(self.labels, label_values)
+            yield f"{self.name}_sum{labels} {total}"
+            yield f"{self.name}_count{labels} {cumulative}"
+
+
+def format_labels(names: tuple, values: tuple) -> str:
+    pairs = ",".join(f'{name}="{escape(value)}"' for name, value in zip(names, values))
+    return "{" + pairs + "}"
+
+
+def escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+requests_total = Counter(
+    "ruleshot_http_requests_total",
+    "HTTP requests by route template and status.",
+    ("method", "route", "status")
+)
+request_duration = Histogram(
+    "ruleshot_http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ("method", "route")
+)
+upstream_duration = Histogram(
+    "ruleshot_upstream_request_duration_seconds",
+    "Storage call latency by table (or function) and operation.",
+    ("target", "operation")
+)
+upstream_errors = Counter(
+    "ruleshot_upstream_errors_total",
+    "Storage calls that raised, by table (or function) and operation.",
+    ("target", "operation")
+)
+
+METRICS = (requests_total, request_duration, upstream_duration, upstream_errors)
+
+# Functions yielding extra exposition lines, added by other modules with register().
+collectors = []
+
+
+def register(collector):
+    collectors.append(collector)
+    return collector
+
+
+def observe_upstream(target: str, operation: str, seconds: float, failed: bool = False):
+    upstream_duration.observe((target, operation), seconds)
+    if failed:
+        upstream_errors.inc((target, operation))
+
+
+async def track(target: str, operation: str, awaitable, filters: str = ""):
+    """Await one upstream call, recording it in the metrics and the request's query log."""
+    start = time.perf_counter()
+    try:
+        result = await awaitable
+    except Exception:
+        seconds = time.perf_counter() - start
+        observe_upstream(target, operation, seconds, failed=True)
+        queryLog.record(target, operation, filters, seconds)
+        raise
+    seconds = time.perf_counter() - start
+    observe_upstream(target, operation, seconds)
+    queryLog.record(target, operation, filters, seconds)
+    return result
+
+
+def render() -> str:
+    lines = []
+    for metric in METRICS:
+        lines.extend(metric.render())
+
+    for collector in collectors:
+        lines.extend(collector())
+    return "\n".join(lines) + "\n"
+
+
+class MetricsMiddleware:
+    """ASGI middleware recording count and latency per route template.
+
+    The matched route is read from the scope after the app has run, so
+    /v1/lessons/{lesson_id} is one series however many lessons there are.
+    Requests that match no route are grouped under "unmatched".
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter()
+        status = 500
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            route = scope.get("route")
+            template = getattr(route, "path", None) or "unmatched"
+            method = scope["method"]
+            request_duration.observe((method, template), time.perf_counter() - start)
+            requests_total.inc((method, template, status))
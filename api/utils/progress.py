@@ -0,0 +1,128 @@
+"""
+XP, streak, heart and progress rules.
+
+complete_lesson and decrement_hearts (supabase/functions/) apply these rules
+inside the database; this module is the reference implementation the SQL
+is tested against.
+
+Hearts refill lazily: a profile whose hearts_refilled_on is before today has
+a full set of hearts, whatever profiles.hearts says. The refill is written
+back by the next decrement.
+
+Streaks expire lazily too: a streak whose last_lesson_date is before
+yesterday is served as 0. complete_lesson persists the reset on the next
+completion, so nothing has to scan profiles at midnight for correctness.
+
+"Today" is always the user's local date in profiles.timezone (an IANA name,
+UTC by default), both here and in the SQL functions.
+
+Progress is a bitmap with bit n set when the lesson with order_number n has
+been completed (profiles.progress_bitmap, see progress_bitmap.sql).
+"""
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+
+
+MAX_HEARTS = 5
+DEFAULT_TIMEZONE = "UTC"
+
+
+def utc_today() -> date:
+    return datetime.now(timezone.utc).date()
+
+
+def is_valid_timezone(name: str) -> bool:
+    try:
+        ZoneInfo(name)
+        return True
+    except (ZoneInfoNotFoundError, ValueError, TypeError):
+        return False
+
+
+def local_today(timezone_name: str = None) -> date:
+    try:
+        return datetime.now(ZoneInfo(timezone_name or DEFAULT_TIMEZONE)).date()
+    except (ZoneInfoNotFoundError, ValueError):
+        return utc_today()
+
+
+def start_of_local_day(timezone_name: str = None) -> datetime:
+    """Midnight today in the given time zone, when hearts refill and streaks expire."""
+    try:
+        zone = ZoneInfo(timezone_name or DEFAULT_TIMEZONE)
+    except (ZoneInfoNotFoundError, ValueError):
+        zone = timezone.utc
+    return datetime.combine(datetime.now(zone).date(), datetime.min.time(), zone)
+
+
+def calculate_xp(mistakes: int) -> int:
+    return max(0, 100 - (mistakes * 5))
+
+
+def next_streak(current_streak: int, last_lesson_date, today: date) -> int:
+    if not last_lesson_date:
+        return 1
+
+    last_date = datetime.fromisoformat(str(last_lesson_date)).date()
+    days_diff = (today - last_date).days
+
+    if days_diff == 1:
+        return current_streak + 1
+    if days_diff > 1:
+        return 1
+    return current_streak
+
+
+
+def effective_hearts(hearts: int, hearts_refilled_on, today: date) -> int:
+    if not hearts_refilled_on or datetime.fromisoformat(str(hearts_refilled_on)).date() < today:
+        return MAX_HEARTS
+    return hearts
+
+
+def effective_streak(streak: int, last_lesson_date, today: date) -> int:
+    if last_lesson_date and datetime.fromisoformat(str(last_lesson_date)).date() < today - timedelta(days=1):
+        return 0
+    return streak
+
+
+def apply_daily_rules(profile: dict, today: date = None) -> dict:
+    """Serve a profile row with hearts refilled and expired streaks reset.
+
+    Drops hearts_refilled_on, which is bookkeeping rather than profile data.
+    """
+    if not profile:
+        return profile
+
+    today = today or local_today(profile.get("timezone"))
+    if "hearts" in profile:
+        refilled_on = profile.pop("hearts_refilled_on", None)
+        profile["hearts"] = effective_hearts(profile["hearts"], refilled_on, today)
+    if "streak" in profile and "last_lesson_date" in profile:
+        profile["streak"] = effective_streak(profile["streak"], profile["last_lesson_date"], today)
+    return profile
+
+
+def decode_bitmap(value) -> int:
+    """profiles.progress_bitmap as an int; PostgREST sends bytea as a "\\x..." hex string."""
+    if not value:
+        return 0
+    if isinstance(value, str):
+        value = bytes.fromhex(value[2:] if value.startswith("\\x") else value)
+    return int.from_bytes(value, "little")
+
+
+def set_bit(bitmap: int, order_number: int) -> int:
+    return bitmap | (1 << order_number)
+
+
+def completed_count(bitmap: int) -> int:
+    return bitmap.bit_count()
+
+
+def first_incomplete(bitmap: int, catalog_mask: int):
+    """Lowest order_number in the catalog whose bit isn't set, or None."""
+    remaining = catalog_mask & ~bitmap
+    if not remaining:
+        return None
+    return (remaining & -remaining).bit_length() - 1
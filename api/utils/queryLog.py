@@ -0,0 +1,129 @@
+"""
+Per-request log of upstream calls.
+
+QueryLogMiddleware starts an empty log for every request in a context
+variable; metrics.track appends each storage call to it (target,
+operation, filters, duration). Tasks started by the request copy the
+context, so calls made under asyncio.gather land in the same log.
+
+Each response carries a Server-Timing header summarising the calls. Routes
+declare how many calls they may make with @budget(n) in main.py. Going over
+budget prints a warning, or raises QueryBudgetExceeded when enforce is set,
+which the tests do so a new N+1 pattern fails the suite.
+
+Calls made inside outside_budget() (the auth dependency's fallback to the
+auth server) are logged separately and don't count against any budget.
+"""
+import os
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+
+DEBUG = os.getenv("QUERY_LOG_DEBUG") == "1"
+MAX_TIMING_ENTRIES = 20
+
+enforce = os.getenv("QUERY_BUDGET_ENFORCE") == "1"
+
+current = ContextVar("query_log", default=None)
+exempt = ContextVar("query_log_exempt", default=False)
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+class QueryCall:
+    __slots__ = ("target", "operation", "filters", "seconds")
+
+    def __init__(self, target: str, operation: str, filters: str, seconds: float):
+        self.target = target
+        self.operation = operation
+        self.filters = filters
+        self.seconds = seconds
+
+    def __repr__(self):
+        parts = [self.target, self.operation, self.filters, f"({self.seconds * 1000:.1f}ms)"]
+        return " ".join(part for part in parts if part)
+
+
+class QueryLog:
+    def __init__(self):
+        self.calls = []
+        self.exempt_calls = []
+
+    def total_seconds(self) -> float:
+        return sum(call.seconds for call in self.calls)
+
+    def server_timing(self) -> str:
+        entries = [f'db;dur={self.total_seconds() * 1000:.1f};desc="{len(self.calls)} queries"']
+        if self.exempt_calls:
+            seconds = sum(call.seconds for call in self.exempt_calls)
+            entries.append(f'deps;dur={seconds * 1000:.1f};desc="{len(self.exempt_calls)} dependency queries"')
+        for index, call in enumerate(self.calls[:MAX_TIMING_ENTRIES]):
+            entries.append(f'q{index};dur={call.seconds * 1000:.1f};desc="{call.target} {call.operation}"')
+        return ", ".join(entries)
+
+
+def record(target: str, operation: str, filters: str, seconds: float):
+    log = current.get()
+    if log is not None:
+        calls = log.exempt_calls if exempt.get() else log.calls
+        calls.append(QueryCall(target, operation, filters, seconds))
+
+
+@contextmanager
+def outside_budget():
+    """Log the calls made inside apart from the route's, for dependencies every route shares."""
+    token = exempt.set(True)
+    try:
+        yield
+    finally:
+        exempt.reset(token)
+
+
+def budget(max_queries: int):
+    """Declare the most upstream calls a route may make per request."""
+    def decorate(route):
+        route.query_budget = max_queries
+        return route
+    return decorate
+
+
+def check_budget(route: str, max_queries, log: QueryLog):
+    if max_queries is None or len(log.calls) <= max_queries:
+        return
+
+    message = f"{route} made {len(log.calls)} queries (budget {max_queries}): {log.calls}"
+    if enforce:
+        raise QueryBudgetExceeded(message)
+    print(f"Query budget exceeded: {message}")
+
+
+class QueryLogMiddleware:
+    """ASGI middleware that logs each request's upstream calls and checks its budget."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        log = QueryLog()
+        token = current.set(log)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                route = scope.get("route")
+                path = getattr(route, "path", scope["path"])
+                check_budget(path, getattr(getattr(route, "endpoint", None), "query_budget", None), log)
+                if DEBUG:
+                    print(f"{scope['method']} {path}: {len(log.calls)} queries in {log.total_seconds() * 1000:.1f}ms {log.calls}")
+                message["headers"] = list(message.get("headers", [])) + [(b"server-timing", log.server_timing().encode("latin-1"))]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current.reset(token)
@@ -0,0 +1,57 @@
+"""
+Paged table scans for maintenance jobs.
+
+Walks a table in id order with keyset paging (id > last id seen), so only
+one page is ever held in memory and every request is an index seek, however
+large the table grows. The scan only stops on an empty page: a page shorter
+than page_size may just be PostgREST's row cap, not the end of the table.
+"""
+import os
+import time
+
+import repository
+
+
+PAGE_SIZE = int(os.getenv("SCAN_PAGE_SIZE", "1000"))
+REPORT_EVERY = 50
+
+
+async def pages(table: str, columns: str = "id", filters=(), page_size: int = None, label: str = None, report_every: int = REPORT_EVERY):
+    """Yield lists of rows from table in id order.
+
+    filters are (operator, column, value) tuples, e.g. ("eq", "timezone", "UTC").
+    Progress is printed every report_every pages (0 to disable), and once
+    more at the end of any scan long enough to have reported.
+    """
+    page_size = page_size or PAGE_SIZE
+    if "id" not in [column.strip() for column in columns.split(",")]:
+        columns = f"id, {columns}"
+    label = label or f"Scan of {table}"
+
+    start = time.perf_counter()
+    scanned = 0
+    page_count = 0
+    after_id = None
+
+    while True:
+        page = await repository.get_page(table, columns, after_id, page_size, filters)
+        if not page:
+            break
+
+        scanned += len(page)
+        page_count += 1
+        after_id = page[-1]["id"]
+        yield page
+
+        if report_every and page_count % report_every == 0:
+            print(f"{label}: {scanned} rows in {page_count} pages ({time.perf_counter() - start:.1f}s)")
+
+    if report_every and page_count >= report_every:
+        print(f"{label} finished: {scanned} rows in {page_count} pages ({time.perf_counter() - start:.2f}s)")
+
+
+async def rows(table: str, columns: str = "id", filters=(), page_size: int = None, label: str = None, report_every: int = REPORT_EVERY):
+    """Yield single rows from table in id order; see pages()."""
+    async for page in pages(table, columns, filters, page_size, label, report_every):
+        for row in page:
+            yield row
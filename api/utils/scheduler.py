@@ -0,0 +1,105 @@
+"""
+Run each scheduled job on exactly one worker.
+
+Every worker runs the scheduling loop, but before a job runs the worker has
+to claim it for the day. The claim fails if the job already completed for
+that day (the persisted watermark) or another worker holds the lease, so with
+`uvicorn --workers 8` the job still runs once. Because the watermark is
+persisted, a job missed while the API was down runs on the next startup.
+
+SCHEDULER_LOCK selects the lease:
+    file      fcntl lock + JSON watermark in SCHEDULER_STATE_DIR (one host)
+    postgres  claim_job/finish_job RPCs (supabase/functions/scheduled_jobs.sql)
+"""
+import fcntl
+import json
+import os
+import socket
+import tempfile
+from datetime import date
+from pathlib import Path
+
+import repository
+
+
+LOCK_BACKEND = os.getenv("SCHEDULER_LOCK", "file")
+STATE_DIR = Path(os.getenv("SCHEDULER_STATE_DIR", Path(tempfile.gettempdir()) / "ruleshot-scheduler"))
+LEASE_SECONDS = int(os.getenv("SCHEDULER_LEASE_SECONDS", "3600"))
+
+HOLDER = f"{socket.gethostname()}:{os.getpid()}"
+
+
+class FileLease:
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.held = {}
+
+    def file_name(self, job: str) -> str:
+        # Job names can contain time zones such as America/New_York.
+        return job.replace("/", "__")
+
+    def watermark_path(self, job: str) -> Path:
+        return self.directory / f"{self.file_name(job)}.json"
+
+    def last_run_on(self, job: str):
+        try:
+            return date.fromisoformat(json.loads(self.watermark_path(job).read_text())["last_run_on"])
+        except (FileNotFoundError, KeyError, ValueError):
+            return None
+
+    async def claim(self, job: str, run_on: date) -> bool:
+        self.directory.mkdir(parents=True, exist_ok=True)
+        lock_file = open(self.directory / f"{self.file_name(job)}.lock", "a+")
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return False
+
+        last_run_on = self.last_run_on(job)
+        if last_run_on and last_run_on >= run_on:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+            return False
+
+        self.held[job] = lock_file
+        return True
+
+    async def finish(self, job: str, run_on: date, completed: bool = True):
+        lock_file = self.held.pop(job, None)
+        if lock_file is None:
+            return
+
+        try:
+            if completed:
+                temporary = self.watermark_path(job).with_suffix(".tmp")
+                temporary.write_text(json.dumps({"last_run_on": run_on.isoformat(), "holder": HOLDER}))
+                temporary.replace(self.watermark_path(job))
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+            lock_file.close()
+
+
+class PostgresLease:
+    async def claim(self, job: str, run_on: date) -> bool:
+        return await repository.claim_job(job, run_on, HOLDER, LEASE_SECONDS)
+
+    async def finish(self, job: str, run_on: date, completed: bool = True):
+        await repository.finish_job(job, run_on, HOLDER, completed)
+
+
+lease = PostgresLease() if LOCK_BACKEND == "postgres" else FileLease(STATE_DIR)
+
+
+async def run_once(job: str, run_on: date, fn) -> bool:
+    """Run fn if this worker wins the claim for (job, run_on). Returns whether it ran."""
+    if not await lease.claim(job, run_on):
+        return False
+
+    completed = False
+    try:
+        await fn()
+        completed = True
+    finally:
+        await lease.finish(job, run_on, completed)
+    return True
@@ -4,9 +4,7 @@ def createDashboardPage(tk, root, requests, session):
     for widget in root.winfo_children():
         widget.destroy()
     
-    response = requests.get("http://127.0.0.1:8000/v1/dashboard", headers={
-        "Authorization": f"Bearer {session.access_token}"
-    })
+    response = session.get(requests, "http://127.0.0.1:8000/v1/dashboard")
     
     if response.status_code != 200:
         tk.Label(root, text="Failed to load dashboard data.").pack(pady=20)
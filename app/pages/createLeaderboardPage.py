@@ -6,9 +6,7 @@ def createLeaderboardPage(tk, root, requests, session):
     
     tk.Label(root, text="Leaderboard", font=("Arial", 16, "bold")).pack(pady=10)
     
-    response = requests.get("http://127.0.0.1:8000/v1/leaderboard?page=1&per_page=20", headers={
-        "Authorization": f"Bearer {session.access_token}"
-    })
+    response = session.get(requests, "http://127.0.0.1:8000/v1/leaderboard?page=1&per_page=20")
     
     if response.status_code != 200:
         tk.Label(root, text="Failed to load leaderboard data.").pack(pady=20)
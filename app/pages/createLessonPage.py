@@ -7,9 +7,7 @@ def createLessonPage(tk, root, requests, session, lesson_id):
     for widget in root.winfo_children():
         widget.destroy()
     
-    response = requests.get(f"http://127.0.0.1:8000/v1/lessons/{lesson_id}", headers={
-        "Authorization": f"Bearer {session.access_token}"
-    })
+    response = session.get(requests, f"http://127.0.0.1:8000/v1/lessons/{lesson_id}")
     
     if response.status_code != 200:
         error_detail = response.json().get('detail', 'Failed to load lesson')
@@ -1,4 +1,18 @@
 from tkinter import messagebox
+from session import local_timezone
+
+
+def sync_timezone(requests, session):
+    """Move the profile to this machine's time zone, so days and streaks follow the player's clock."""
+    timezone = local_timezone()
+    if not timezone or not session.profile or session.profile.get("timezone") == timezone:
+        return
+
+    response = requests.patch("http://127.0.0.1:8000/v1/profile", json={"timezone": timezone}, headers={
+        "Authorization": f"Bearer {session.access_token}"
+    })
+    if response.status_code == 200:
+        session.profile = response.json()
 
 
 def createLoginPage(tk, root, requests, session):
@@ -34,6 +48,7 @@ def createLoginPage(tk, root, requests, session):
             session.refresh_token = data.get("session", {}).get("refresh_token")
             session.user_id = data.get("user", {}).get("id")
             session.profile = data.get("profile")
+            sync_timezone(requests, session)
             result = session
             login_window.destroy()
         else:
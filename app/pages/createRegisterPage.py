@@ -1,4 +1,5 @@
 from tkinter import messagebox
+from session import local_timezone
 
 def createRegisterPage(tk, root, requests, session):
     register_window = tk.Toplevel(root)
@@ -44,7 +45,8 @@ def createRegisterPage(tk, root, requests, session):
             "email": email,
             "username": username,
             "handicap": handicap,
-            "password": password
+            "password": password,
+            "timezone": local_timezone()
         })
 
         if response.status_code == 200:
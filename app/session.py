@@ -1,6 +1,48 @@
+try:
+    from tzlocal import get_localzone_name
+except ImportError:
+    get_localzone_name = None
+
+
+def local_timezone():
+    """This machine's IANA time zone name (e.g. "Europe/London"), or None if it can't be told."""
+    if get_localzone_name is None:
+        return None
+    try:
+        return get_localzone_name()
+    except Exception:
+        return None
+
+
 class Session:
     email = None
     access_token = None
     refresh_token = None
     user_id = None
-    profile = None
\ No newline at end of file
+    profile = None
+
+    def __init__(self):
+        # url -> last response that came with an ETag or Last-Modified.
+        self.responses = {}
+
+    def get(self, requests, url):
+        """GET url, revalidating the copy from the last visit.
+
+        Sends the stored ETag / Last-Modified back; on 304 Not Modified the
+        stored response is returned, so the page renders without the body
+        being downloaded again.
+        """
+        headers = {"Authorization": f"Bearer {self.access_token}"}
+        cached = self.responses.get((self.user_id, url))
+        if cached is not None:
+            if "ETag" in cached.headers:
+                headers["If-None-Match"] = cached.headers["ETag"]
+            if "Last-Modified" in cached.headers:
+                headers["If-Modified-Since"] = cached.headers["Last-Modified"]
+
+        response = requests.get(url, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            return cached
+        if response.status_code == 200 and ("ETag" in response.headers or "Last-Modified" in response.headers):
+            self.responses[(self.user_id, url)] = response
+        return response